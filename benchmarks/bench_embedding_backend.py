@@ -0,0 +1,157 @@
+"""
+LinkSell Embedding 后端基准测试 (Embedding Backend Benchmark)
+
+职责：
+- 对比 PyTorch (SentenceTransformer) 与 ONNX Runtime (FP32 / int8 量化) 三种后端
+- 指标：模型加载耗时、单条查询延迟 (P50/P95)、批量吞吐 (条/秒)、进程峰值 RSS、
+  与 PyTorch 向量的一致性 (逐条余弦相似度、检索 Top-10 重合率)
+
+说明：
+- 每个后端在独立子进程中运行，RSS 互不干扰，也能看出 ONNX 后端不加载 torch 的内存差异
+- 需要先执行 `python src/main.py export-onnx` 导出 ONNX 模型，并能加载 PyTorch 模型作为基准
+
+用法：
+    python benchmarks/bench_embedding_backend.py --onnx-path data/models/minilm-onnx --corpus 2000
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# [环境配置] 确保可以导入 src 模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+
+BACKENDS = {
+    "torch": None,
+    "onnx-fp32": "model.onnx",
+    "onnx-int8": "model_qint8.onnx",
+}
+
+
+def worker(backend: str, model: str, onnx_path: str, texts_file: str, out_file: str, batch_size: int):
+    """[子进程] 加载一个后端，测延迟/吞吐/RSS，并把全部向量写入 out_file (.npy)"""
+    with open(texts_file, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    corpus, queries = payload["corpus"], payload["queries"]
+
+    t0 = time.perf_counter()
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(model, device="cpu")
+    else:
+        from src.services.embedding_backends import OnnxEncoder
+        encoder = OnnxEncoder(onnx_path, file_name=BACKENDS[backend])
+    load_s = time.perf_counter() - t0
+
+    encoder.encode(queries[:5])  # 预热
+    latencies = []
+    query_vecs = []
+    for q in queries:
+        t0 = time.perf_counter()
+        query_vecs.append(encoder.encode(q))
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    corpus_vecs = encoder.encode(corpus, batch_size=batch_size)
+    throughput = len(corpus) / (time.perf_counter() - t0)
+
+    np.save(out_file, np.vstack([np.asarray(corpus_vecs), np.stack(query_vecs)]).astype(np.float32))
+    latencies.sort()
+    print(json.dumps({
+        "load_s": load_s,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "throughput": throughput,
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def build_texts(corpus_size: int, query_count: int) -> dict:
+    from bench_vector_batch import synth_records
+    from src.services.vector_service import VectorService
+
+    records = synth_records(corpus_size)
+    corpus = [VectorService._format_record(None, r) for r in records]
+    queries = [f"{r['project_opportunity']['project_name']} 的预算和进展" for r in records[:query_count]]
+    return {"corpus": corpus, "queries": queries}
+
+
+def normalize(m: np.ndarray) -> np.ndarray:
+    return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-9, None)
+
+
+def agreement(base: np.ndarray, other: np.ndarray, corpus_size: int, k: int = 10) -> dict:
+    """逐条余弦相似度 + 每个查询 Top-k 近邻集合的重合率"""
+    base_n, other_n = normalize(base), normalize(other)
+    cosine = (base_n * other_n).sum(axis=1)
+    overlaps = []
+    for qi in range(corpus_size, len(base)):
+        top_base = set(np.argsort(-base_n[:corpus_size] @ base_n[qi])[:k])
+        top_other = set(np.argsort(-other_n[:corpus_size] @ other_n[qi])[:k])
+        overlaps.append(len(top_base & top_other) / k)
+    return {"cosine_mean": float(cosine.mean()), "cosine_min": float(cosine.min()),
+            "topk_overlap": float(np.mean(overlaps))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding 后端基准测试")
+    parser.add_argument("--model", default="paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--onnx-path", default="data/models/minilm-onnx")
+    parser.add_argument("--corpus", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--texts-file", help=argparse.SUPPRESS)
+    parser.add_argument("--out-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.model, args.onnx_path, args.texts_file, args.out_file, args.batch_size)
+        return
+
+    backends = ["torch"] + [b for b, f in BACKENDS.items()
+                            if f and os.path.exists(os.path.join(args.onnx_path, f))]
+    if len(backends) == 1:
+        print(f"未找到 ONNX 模型 ({args.onnx_path})，请先执行 python src/main.py export-onnx")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_file = os.path.join(tmp, "texts.json")
+        with open(texts_file, "w", encoding="utf-8") as f:
+            json.dump(build_texts(args.corpus, args.queries), f, ensure_ascii=False)
+
+        results, vectors = {}, {}
+        for backend in backends:
+            out_file = os.path.join(tmp, f"{backend}.npy")
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", backend, "--model", args.model,
+                 "--onnx-path", args.onnx_path, "--texts-file", texts_file, "--out-file", out_file,
+                 "--batch-size", str(args.batch_size)],
+                capture_output=True, text=True, cwd=ROOT
+            )
+            if proc.returncode != 0:
+                print(f"[{backend}] 运行失败:\n{proc.stderr[-2000:]}")
+                continue
+            results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+            vectors[backend] = np.load(out_file)
+
+    print(f"[语料 {args.corpus} 条 | 查询 {args.queries} 条 | 批大小 {args.batch_size} | CPU {os.cpu_count()} 核]")
+    print(f"{'后端':<10} {'加载(s)':>8} {'P50(ms)':>8} {'P95(ms)':>8} {'吞吐(条/s)':>11} {'RSS(MB)':>8} "
+          f"{'余弦均值':>8} {'余弦最小':>8} {'Top10重合':>9}")
+    for backend, r in results.items():
+        agree = agreement(vectors["torch"], vectors[backend], args.corpus) if "torch" in vectors else {}
+        print(f"{backend:<10} {r['load_s']:8.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['throughput']:11.1f} "
+              f"{r['rss_mb']:8.0f} {agree.get('cosine_mean', float('nan')):8.4f} "
+              f"{agree.get('cosine_min', float('nan')):8.4f} {agree.get('topk_overlap', float('nan')):9.1%}")
+
+
+if __name__ == "__main__":
+    main()
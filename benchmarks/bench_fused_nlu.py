@@ -0,0 +1,206 @@
+"""
+LinkSell 融合 NLU 基准测试 (Fused NLU Benchmark)
+
+职责：
+- 用一组带标注的用户话术 (benchmarks/nlu_utterances.jsonl) 对比两种理解方式：
+  分步 (classify_intent + extract_search_term，两次 LLM 往返) 与融合 (understand_input，一次往返)
+- 报告意图准确率、搜索词准确率、每轮 LLM 调用次数与 NLU 阶段耗时 (P50/P95)
+- 在只读话术 (GET / LIST / OTHER) 上通过 ConversationalEngine.handle_user_input 测端到端单轮耗时
+
+用法：
+    python benchmarks/bench_fused_nlu.py                           # 真实 LLM (读取 config/config.ini 的 [doubao])
+    python benchmarks/bench_fused_nlu.py --offline --rtt-ms 400    # 模拟 LLM：按标注答案回复，每次调用固定耗时
+
+说明：
+- 离线模式的回复即标注答案，准确率恒为 100%，只用于观察调用次数对延迟的影响
+- 基准在临时目录中运行 (SQLite 存储 + 几条种子商机)，不加载向量模型、不启用 LLM 响应缓存
+"""
+
+import argparse
+import configparser
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import llm_service
+
+ROOT = Path(__file__).resolve().parent.parent
+UTTERANCES = Path(__file__).resolve().parent / "nlu_utterances.jsonl"
+SEARCH_INTENTS = ("GET", "LIST", "REPLACE", "DELETE")
+READ_ONLY_INTENTS = ("GET", "LIST", "OTHER")
+
+SEED_PROJECTS = [
+    ("沈阳轴承厂技改项目", "张三", "3", "80万"),
+    ("大连港口智慧园区", "李四", "2", "300万"),
+    ("鞍山钢铁数据中台", "张三", "4", "150万"),
+    ("铁西医院信息化", "王五", "1", "60万"),
+    ("营口石化安全运维平台", "李四", "3", "120万"),
+]
+
+
+class OracleArk:
+    """[离线替身] 按标注答案回复，每次调用固定耗时 rtt_ms"""
+
+    def __init__(self, gold: dict, rtt_ms: float):
+        self.gold = gold
+        self.rtt = rtt_ms / 1000
+        self.prompts = {name: llm_service.load_prompt(name)
+                        for name in ("classify_intent", "extract_search_term", "understand_input")}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, temperature):
+        time.sleep(self.rtt)
+        system, text = messages[0]["content"], messages[1]["content"]
+        item = self.gold.get(text, {"intent": "RECORD", "search_term": ""})
+        if system == self.prompts["classify_intent"]:
+            reply = json.dumps({"intent": item["intent"], "content": text}, ensure_ascii=False)
+        elif system == self.prompts["extract_search_term"]:
+            reply = item["search_term"] or "Unknown"
+        else:
+            reply = json.dumps({"intent": item["intent"], "content": text,
+                                "search_term": item["search_term"], "filters": {}}, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+def load_utterances() -> list:
+    with open(UTTERANCES, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def term_ok(predicted, gold: str, text: str) -> bool:
+    """搜索词是否正确：无具体目标时，空字符串或原样返回整句都视为正确"""
+    predicted = (predicted or "").strip()
+    if not gold:
+        return predicted in ("", text)
+    return predicted.upper() == gold.upper()
+
+
+def pct(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+
+def prepare_workdir(tmp: str, api_key: str, endpoint_id: str):
+    shutil.copytree(ROOT / "config" / "prompts", Path(tmp) / "config" / "prompts")
+    config = configparser.ConfigParser()
+    config["doubao"] = {"api_key": api_key, "analyze_endpoint": endpoint_id}
+    config["storage"] = {"backend": "sqlite", "sqlite_path": "data/linksell.db"}
+    config["vector"] = {"index_queue": "", "daemon_socket": ""}
+    config["llm_cache"] = {"path": ""}
+    with open(Path(tmp) / "config" / "config.ini", "w", encoding="utf-8") as f:
+        config.write(f)
+
+
+def run(utterances: list, repeat: int):
+    from src.core.conversational_engine import ConversationalEngine
+
+    # 向量服务创建失败时 Controller 退回关键字检索，基准只测 NLU 与检索分发
+    with patch("src.core.controller.VectorService", side_effect=RuntimeError("基准测试不加载向量模型")):
+        engine = ConversationalEngine()
+    ctrl = engine.controller
+    for name, rep, stage, budget in SEED_PROJECTS:
+        ctrl.overwrite_opportunity({"id": name, "sales_rep": rep, "project_opportunity": {
+            "project_name": name, "opportunity_stage": stage, "budget": budget}})
+
+    calls = {"n": 0}
+    real_chat = llm_service._chat
+
+    def counting_chat(*args, **kwargs):
+        calls["n"] += 1
+        return real_chat(*args, **kwargs)
+
+    def two_call(text):
+        result = ctrl.identify_intent(text)
+        term = ctrl.extract_search_term(result["content"]) if result["intent"] in SEARCH_INTENTS else ""
+        return result["intent"], term
+
+    def fused(text):
+        result = ctrl.understand(text)
+        return result["intent"], result["search_term"]
+
+    report = {}
+    with patch.object(llm_service, "_chat", counting_chat):
+        for label, fn in (("分步 (2 次调用)", two_call), ("融合 (1 次调用)", fused)):
+            times, intent_hits, term_hits, term_total = [], 0, 0, 0
+            calls["n"] = 0
+            for _ in range(repeat):
+                for item in utterances:
+                    started = time.perf_counter()
+                    intent, term = fn(item["text"])
+                    times.append(time.perf_counter() - started)
+                    intent_hits += intent == item["intent"]
+                    if item["intent"] in SEARCH_INTENTS:
+                        term_total += 1
+                        term_hits += term_ok(term, item["search_term"], item["text"])
+            n = repeat * len(utterances)
+            report[label] = (intent_hits / n, term_hits / max(term_total, 1), calls["n"] / n,
+                             pct(times, 0.5), pct(times, 0.95))
+
+        turns = [u for u in utterances if u["intent"] in READ_ONLY_INTENTS]
+        turn_times = {}
+        for label, flag in (("分步 (2 次调用)", False), ("融合 (1 次调用)", True)):
+            ctrl.fused_nlu = flag
+            samples = []
+            calls["n"] = 0
+            for _ in range(repeat):
+                for item in turns:
+                    engine.current_opp_id = None
+                    started = time.perf_counter()
+                    engine.handle_user_input(item["text"])
+                    samples.append(time.perf_counter() - started)
+            turn_times[label] = (calls["n"] / len(samples), pct(samples, 0.5), pct(samples, 0.95))
+    ctrl.store.close()
+
+    print(f"[{len(utterances)} 条话术 x {repeat} 轮]")
+    print("  方式              意图准确率  搜索词准确率  LLM 调用/轮  NLU P50 (ms)  NLU P95 (ms)")
+    for label, (intent_acc, term_acc, per_turn, p50, p95) in report.items():
+        print(f"  {label:<14} {intent_acc:9.1%} {term_acc:12.1%} {per_turn:11.2f} {p50:13.1f} {p95:13.1f}")
+    print(f"  端到端单轮 (只读话术 {len(turns)} 条，含检索与渲染)")
+    for label, (per_turn, p50, p95) in turn_times.items():
+        print(f"  {label:<14} LLM 调用/轮 {per_turn:5.2f} | P50 {p50:8.1f} ms | P95 {p95:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="融合 NLU 基准测试")
+    parser.add_argument("--repeat", type=int, default=1, help="每条话术重复的轮数")
+    parser.add_argument("--offline", action="store_true", help="用按标注答案回复的模拟 LLM 替代真实 API")
+    parser.add_argument("--rtt-ms", type=float, default=400.0, help="离线模式下每次 LLM 调用的模拟耗时")
+    args = parser.parse_args()
+
+    utterances = load_utterances()
+    config = configparser.ConfigParser()
+    config.read(ROOT / "config" / "config.ini")
+    api_key = config.get("doubao", "api_key", fallback="")
+    endpoint_id = config.get("doubao", "analyze_endpoint", fallback="")
+    if args.offline:
+        api_key, endpoint_id = "offline", "ep-offline"
+    elif not api_key or "YOUR_" in api_key or not endpoint_id:
+        parser.error("config/config.ini 中未配置 [doubao] api_key / analyze_endpoint，可使用 --offline")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_workdir(tmp, api_key, endpoint_id)
+        os.chdir(tmp)
+        try:
+            if args.offline:
+                oracle = OracleArk({u["text"]: u for u in utterances}, args.rtt_ms)
+                with patch.object(llm_service.ArkClientFactory, "get_client", return_value=oracle):
+                    run(utterances, args.repeat)
+            else:
+                run(utterances, args.repeat)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+LinkSell 关键字索引基准测试 (Keyword Index Benchmark)
+
+职责：
+- 构造 N 条合成商机摘要，对比线性双向包含扫描与 NgramIndex 的查询耗时
+- 报告建索引耗时、单次查询 P50/P99 以及增量同步耗时
+
+用法：
+    python benchmarks/bench_keyword_index.py --size 100000 --queries 500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.search_index import NgramIndex
+
+CITIES = "沈阳大连鞍山抚顺本溪丹东锦州营口阜新辽阳盘锦铁岭朝阳葫芦岛北京上海天津重庆"
+TOPICS = ["机床", "轴承", "港口", "钢铁", "石化", "电力", "医院", "学校", "物流", "数据中心", "智慧园区", "水务"]
+SUFFIX = ["项目", "一期", "二期", "改造工程", "采购", "信息化", "升级"]
+
+
+def synth_entries(size: int, rng: random.Random) -> list:
+    entries = []
+    for i in range(size):
+        city = CITIES[rng.randrange(0, len(CITIES) - 1, 2):][:2]
+        name = f"{city}{rng.choice(TOPICS)}{rng.choice(SUFFIX)}{i}"
+        entries.append({"file_path": f"data/opportunities/{name}.json", "id": str(i), "mtime": float(i),
+                        "project_name": name, "sales_rep": "张三",
+                        "customer_name": rng.choice("王李张刘陈") + "经理", "company": f"{city}{rng.choice(TOPICS)}集团"})
+    return entries
+
+
+def linear(entries, keyword):
+    k_low = keyword.lower()
+    return [e for e in entries
+            if k_low in e["project_name"].lower() or (len(e["project_name"]) > 2 and e["project_name"].lower() in k_low)]
+
+
+def timed(fn, queries):
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="关键字索引基准测试")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    entries = synth_entries(args.size, rng)
+    queries = [e["project_name"][:rng.randint(3, 8)] for e in rng.sample(entries, args.queries // 2)] + \
+              [f"查看{rng.choice(entries)['project_name']}详情" for _ in range(args.queries // 2)]
+
+    index = NgramIndex()
+    t0 = time.perf_counter()
+    index.sync(entries)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    # 增量同步：1% 条目发生变化
+    for e in rng.sample(entries, max(1, args.size // 100)):
+        e["mtime"] += 1
+    t0 = time.perf_counter()
+    changed = index.sync(entries)
+    sync_ms = (time.perf_counter() - t0) * 1000
+
+    lin = timed(lambda q: linear(entries, q), queries[:50])
+    idx = timed(index.match, queries)
+
+    print(f"商机数: {args.size}")
+    print(f"建索引: {build_ms:.0f} ms | 增量同步 {changed} 条: {sync_ms:.1f} ms")
+    print(f"线性扫描  P50 {lin[0]:.3f} ms  P99 {lin[1]:.3f} ms")
+    print(f"倒排索引  P50 {idx[0]:.3f} ms  P99 {idx[1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
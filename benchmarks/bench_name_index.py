@@ -0,0 +1,155 @@
+"""
+LinkSell 项目名向量索引基准测试 (Name Index Benchmark)
+
+职责：
+- 对比旧方案 (项目名 vs 整段商机内容向量，L2 阈值 1.2) 与项目名/别名索引 (余弦相似度) 的查重效果
+- 用带已知答案的变体查询 (缩写、省略地名、加"项目"后缀、错别字) 测 Recall@1，
+  用库中不存在的项目名测误报率，并扫描一组余弦阈值供校准 [vector] name_match_threshold
+- 同时给出两种方案的查询延迟 (P50)
+
+用法：
+    python benchmarks/bench_name_index.py --size 2000
+    python benchmarks/bench_name_index.py --size 2000 --offline   # 字符 n-gram 哈希向量替代真实模型
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+CITIES = ["杭州", "苏州", "成都", "武汉", "西安", "南京", "青岛", "厦门", "长沙", "合肥"]
+ORGS = ["市第一人民医院", "城投集团", "轨道交通公司", "农商银行", "电力公司", "自来水公司", "教育局", "港务集团"]
+SYSTEMS = ["智慧病房系统", "数据中台", "供应链平台", "安全运维平台", "客服中心", "财务共享中心", "视频监控平台"]
+PHASES = ["", "一期", "二期", "升级改造"]
+
+
+class NgramEncoder:
+    """[离线替身] 字符 1-gram + 2-gram 哈希到 384 维并归一化，相似度近似反映字面重合度"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def _one(self, text):
+        vec = np.zeros(384, dtype=np.float32)
+        grams = list(text) + [text[i:i + 2] for i in range(len(text) - 1)]
+        for g in grams:
+            vec[int(hashlib.md5(g.encode("utf-8")).hexdigest(), 16) % 384] += 1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        if isinstance(texts, str):
+            return self._one(texts)
+        return np.stack([self._one(t) for t in texts])
+
+
+def synth_projects(n: int, rng: random.Random) -> list:
+    names = set()
+    while len(names) < n:
+        names.add(rng.choice(CITIES) + rng.choice(ORGS) + rng.choice(SYSTEMS) + rng.choice(PHASES))
+    return [{
+        "id": f"p{i}",
+        "sales_rep": f"销售{i % 10}",
+        "summary": f"客户计划建设{name}，关注交付周期与本地化部署",
+        "customer_info": {"name": f"客户{i}", "company": name[:6]},
+        "project_opportunity": {"project_name": name, "budget": f"{i % 300}万"},
+        "key_points": ["价格敏感", "需要等保三级"],
+    } for i, name in enumerate(sorted(names))]
+
+
+def variants(name: str, rng: random.Random) -> list:
+    """一个项目名的几种常见口头说法"""
+    out = [name + "项目", name[2:]]
+    for org in ORGS:
+        if org in name:
+            out.append(name.replace(org, org[:2]))
+    if len(name) > 4:
+        i = rng.randrange(1, len(name) - 1)
+        out.append(name[:i] + name[i + 1:])
+    return out
+
+
+def p50(samples: list) -> float:
+    return statistics.median(samples) * 1000
+
+
+def run(size: int, queries_per_name: int, seed: int):
+    from src.services.vector_service import VectorService, normalize_name
+
+    rng = random.Random(seed)
+    records = synth_projects(size, rng)
+    sample = rng.sample(records, min(200, len(records)))
+    positives = [(q, r["id"]) for r in sample for q in variants(r["project_opportunity"]["project_name"], rng)[:queries_per_name]]
+    known = {r["project_opportunity"]["project_name"] for r in records}
+    negatives = []
+    while len(negatives) < 100:
+        name = rng.choice(CITIES) + rng.choice(["铁路局", "体育中心", "图书馆"]) + rng.choice(["门禁系统", "会员平台"])
+        if name not in known:
+            negatives.append(name)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        svc = VectorService(db_path=os.path.join(tmp, "vector_db"))
+        svc._ensure_initialized(timeout=600)
+        svc.add_records(records)
+
+        def old_lookup(q):
+            # 与旧版 search_projects 相同：原始名称直接编码，取元数据 + 距离
+            res = svc.collection.query(query_embeddings=[svc.model.encode(q).tolist()], n_results=3,
+                                       include=["metadatas", "distances"])
+            return [(rid, d) for rid, d in zip(res["ids"][0], res["distances"][0]) if d <= 1.2]
+
+        def new_lookup(q):
+            return [(m["id"], m["score"]) for m in svc.search_projects(q, top_k=3, threshold=-1)]
+
+        old_t, new_t, old_hits, new_top = [], [], 0, []
+        for q, rid in positives:
+            t0 = time.perf_counter()
+            old = old_lookup(q)
+            old_t.append(time.perf_counter() - t0)
+            old_hits += bool(old) and old[0][0] == rid
+            t0 = time.perf_counter()
+            new = new_lookup(q)
+            new_t.append(time.perf_counter() - t0)
+            new_top.append((new[0][0] == rid, new[0][1]) if new else (False, -1.0))
+        neg_old = sum(bool(old_lookup(q)) for q in negatives)
+        neg_top = [(new_lookup(q) or [(None, -1.0)])[0][1] for q in negatives]
+
+    print(f"[{size} 个项目 | {len(positives)} 条变体查询 | {len(negatives)} 条库外查询] 名称归一化示例: "
+          f"{normalize_name('杭州 城投集团·数据中台（一期）')}")
+    print(f"  旧方案 (内容向量, L2<=1.2)   Recall@1 {old_hits / len(positives):6.1%} | 误报率 "
+          f"{neg_old / len(negatives):6.1%} | P50 {p50(old_t):6.2f} ms")
+    print(f"  项目名索引 (余弦)            查询 P50 {p50(new_t):6.2f} ms")
+    print("  阈值   Recall@1   误报率")
+    for threshold in (0.5, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95):
+        recall = sum(ok and score >= threshold for ok, score in new_top) / len(new_top)
+        false_pos = sum(score >= threshold for score in neg_top) / len(neg_top)
+        print(f"  {threshold:4.2f}   {recall:7.1%}   {false_pos:7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="项目名向量索引基准测试")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--queries-per-name", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--offline", action="store_true", help="使用字符 n-gram 哈希向量替代真实模型")
+    args = parser.parse_args()
+
+    if args.offline:
+        with patch("src.services.vector_service.SentenceTransformer", NgramEncoder):
+            run(args.size, args.queries_per_name, args.seed)
+    else:
+        run(args.size, args.queries_per_name, args.seed)
+
+
+if __name__ == "__main__":
+    main()
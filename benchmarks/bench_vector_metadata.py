@@ -0,0 +1,123 @@
+"""
+LinkSell 向量库精简元数据基准测试 (Slim Metadata Benchmark)
+
+职责：
+- 构造旧版集合 (每条元数据内嵌完整 json_data)，测量向量库磁盘占用与 search / search_projects 延迟
+- 执行 v1 -> v2 元数据迁移后再测一次，对比前后差异
+- 默认使用真实 Embedding 模型；--offline 时改用确定性哈希向量
+
+用法：
+    python benchmarks/bench_vector_metadata.py --size 5000 --logs 20
+    python benchmarks/bench_vector_metadata.py --size 5000 --logs 20 --offline
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_vector_batch import HashEncoder  # noqa: E402
+
+
+def synth_records(n: int, logs: int) -> list:
+    return [{
+        "id": f"bench-{i}",
+        "sales_rep": f"销售{i % 20}",
+        "summary": f"第{i}次拜访，客户关注交付周期与售后服务",
+        "customer_info": {"name": f"客户{i}", "company": f"公司{i % 500}"},
+        "project_opportunity": {"project_name": f"基准项目{i}", "budget": f"{i % 300}万", "opportunity_stage": i % 4 + 1},
+        "key_points": ["价格敏感", "需要本地化部署"],
+        "record_logs": [{"time": f"2024-05-{d % 28 + 1:02d} 10:00", "recorder": f"销售{i % 20}",
+                         "content": f"第{d}次跟进：客户反馈方案需要调整，约定下周再次沟通报价与交付细节。"}
+                        for d in range(logs)],
+    } for i in range(n)]
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def vacuum(path: Path):
+    """迁移前先 VACUUM，保证前后体积在同样紧凑的状态下比较 (迁移本身结束时也会 VACUUM)"""
+    conn = sqlite3.connect(str(path / "chroma.sqlite3"))
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def measure(svc, queries: list, hydrate=None, rounds: int = 3) -> dict:
+    search_ms, project_ms = [], []
+    for _ in range(rounds):
+        for q in queries:
+            t0 = time.perf_counter()
+            svc.search(q, top_k=5, hydrate=hydrate)
+            search_ms.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            svc.search_projects(q, top_k=3, threshold=-1)
+            project_ms.append((time.perf_counter() - t0) * 1000)
+    return {"search": statistics.median(search_ms), "projects": statistics.median(project_ms)}
+
+
+def run(size: int, logs: int):
+    from src.services.vector_service import VectorService
+
+    records = synth_records(size, logs)
+    by_id = {r["id"]: r for r in records}
+    queries = [f"基准项目{i}" for i in range(0, size, max(1, size // 20))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "vector_db"
+        svc = VectorService(db_path=str(db_path))
+        svc._ensure_initialized(timeout=600)
+
+        # 1. 按旧版结构写入 (元数据内嵌完整 JSON)
+        for start in range(0, size, 1000):
+            chunk = records[start:start + 1000]
+            texts = [svc._format_record(r) for r in chunk]
+            metas = [dict(svc._record_metadata(r), json_data=json.dumps(r, ensure_ascii=False), record_type="商机")
+                     for r in chunk]
+            svc.collection.upsert(ids=[r["id"] for r in chunk], documents=texts, metadatas=metas,
+                                  embeddings=svc._encode_batch(texts, 64).tolist())
+        svc.collection.modify(metadata={"schema_version": 1})
+        before = measure(svc, queries)
+        vacuum(db_path)
+        size_before = dir_size(db_path)
+
+        # 2. 迁移为精简元数据，检索结果改为按 ID 还原
+        t0 = time.perf_counter()
+        migrated = svc._migrate_metadata()
+        migrate_s = time.perf_counter() - t0
+        after = measure(svc, queries, hydrate=by_id.get)
+        size_after = dir_size(db_path)
+
+    print(f"[{size} 条 x {logs} 条小记] 迁移 {migrated} 条，用时 {migrate_s:.1f}s")
+    print(f"  向量库体积        {size_before / 1e6:8.1f} MB -> {size_after / 1e6:8.1f} MB "
+          f"({1 - size_after / size_before:.0%} 减少)")
+    print(f"  search P50        {before['search']:8.2f} ms -> {after['search']:8.2f} ms")
+    print(f"  search_projects P50 {before['projects']:6.2f} ms -> {after['projects']:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="向量库精简元数据基准测试")
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--logs", type=int, default=20, help="每条商机的小记条数")
+    parser.add_argument("--offline", action="store_true", help="使用哈希向量替代真实模型")
+    args = parser.parse_args()
+
+    if args.offline:
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            run(args.size, args.logs)
+    else:
+        run(args.size, args.logs)
+
+
+if __name__ == "__main__":
+    main()
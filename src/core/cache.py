@@ -0,0 +1,91 @@
+"""
+LinkSell 商机缓存 (Opportunity Cache)
+
+职责：
+- 缓存已加载的商机正文，避免重复读取/解析存储
+- 按近似字节数限制内存占用，超出预算时按 LRU 淘汰
+- 提供命中/未命中/淘汰/占用字节等诊断指标
+
+特点：
+- **One Entry Per Key**: 每个存储 Key 只保留一个版本，版本戳 (mtime) 变化即视为失效并原地替换
+- **O(1) LRU**: 基于 OrderedDict，命中时 move_to_end，淘汰时 popitem(last=False)
+- **Immutable Snapshot**: 缓存内保存的是 pickle 快照，每次读取都反序列化出一份独立副本，
+  调用方随意修改 (包括嵌套字段) 都不会污染缓存
+"""
+
+import pickle
+from collections import OrderedDict
+from threading import Lock
+
+
+class OpportunityCache:
+    """
+    [核心类] 带字节预算的 LRU 缓存
+    字节数以 pickle 快照长度计，与实际对象内存成正比 (约为其 1/3 ~ 1/5)，用作近似预算足够。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # {key: (stamp, blob)}
+        self._lock = Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, stamp):
+        """[读取] 版本戳一致时返回独立副本，否则返回 None (记为未命中)"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] != stamp:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            blob = item[1]
+        return pickle.loads(blob)
+
+    def put(self, key: str, stamp, data: dict):
+        """[写入] 存入快照；单条超过总预算时不缓存"""
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(blob)
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (stamp, blob)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, old_blob) = self._entries.popitem(last=False)
+                self._bytes -= len(old_blob)
+                self.evictions += 1
+
+    def _discard(self, key):
+        item = self._entries.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[1])
+
+    def invalidate(self, key: str = None):
+        """[失效] 指定 Key 失效，或 None 清空全部"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._discard(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """[诊断] 缓存统计"""
+        total = self.hits + self.misses
+        return {
+            "cache_size": len(self._entries),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_evictions": self.evictions,
+            "cache_bytes": self._bytes,
+            "cache_max_bytes": self.max_bytes,
+            "hit_rate_pct": round(self.hits / total * 100, 2) if total > 0 else 0
+        }
@@ -18,17 +18,29 @@ import re
 import os
 import glob
 import uuid
-import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from threading import Lock
 from rich import print
 
 from src.services.llm_service import (
     polish_text, classify_intent, query_sales_data, summarize_text,
-    architect_analyze
+    architect_analyze, extract_search_term, normalize_input, understand_input,
+    configure_response_cache, response_cache_stats, CACHEABLE_FUNCTIONS
 )
-from src.services.asr_service import transcribe_audio
-from src.services.vector_service import VectorService
+from src.services.llm_cache import LLMResponseCache
+from src.services.vector_service import VectorService, vector_options
+from src.services.vector_daemon import RemoteVectorService
+from src.services.storage_service import create_store, OpportunitySummary
+from src.core.migrations import MigrationRunner
+from src.core.index_queue import IndexQueue
+from src.core.cache import OpportunityCache
+from src.core.search_index import NgramIndex, FullTextIndex
+from src.core.filter_index import FilterIndex, SORT_FIELDS, parse_list_filters, filters_from_nlu
+from src.core.normalization import normalize_record
+
+# 向量引擎加载期间检索结果只含关键字/全文匹配时，附在回复后的提示
+PARTIAL_SEARCH_NOTE = "（语义检索加载中，当前为关键字匹配结果）"
 
 class LinkSellController:
     """
@@ -60,7 +72,12 @@ class LinkSellController:
         # 3. LLM 服务配置 (豆包大模型)
         self.api_key = self.config.get("doubao", "api_key", fallback=None)
         self.endpoint_id = self.config.get("doubao", "analyze_endpoint", fallback=None)
+        # 融合 NLU：一次调用完成意图识别 + 搜索词提取 (false = 分两次调用)
+        self.fused_nlu = self.config.getboolean("doubao", "fused_nlu", fallback=True)
         
+        # 3.1 LLM 响应缓存：意图识别等低温度短输入调用重复出现时直接复用回复
+        self._setup_llm_cache()
+
         # 4. ASR 服务配置 (火山引擎语音识别)
         self.asr_app_id = self.config.get("asr", "app_id", fallback=None)
         self.asr_token = self.config.get("asr", "access_token", fallback=None)
@@ -74,67 +91,88 @@ class LinkSellController:
         if self.config.has_section("opportunity_stages"):
             self.stage_map = {k: v for k, v in self.config.items("opportunity_stages")}
 
-        # 6. 初始化本地数据目录
+        # 6. 初始化本地数据目录与存储后端 (JSON 文件 / SQLite)
         self.data_dir = Path("data/opportunities")
         self.data_dir.mkdir(parents=True, exist_ok=True)
-
-        # ===== [PHASE 3 数据迁移] 强制合并 sales_rep =====
-        # 遍历所有文件，将 recorder 字段迁移至 sales_rep 并删除 recorder
-        # 确保系统彻底摆脱旧字段的干扰
-        migrated_count = 0
-        json_files = list(self.data_dir.glob("*.json"))
-        for fp in json_files:
-            try:
-                with open(fp, "r", encoding="utf-8") as f:
-                    d = json.load(f)
-                
-                changed = False
-                # 迁移逻辑：如果存在 recorder
-                if "recorder" in d:
-                    rec_val = d["recorder"]
-                    # 如果 sales_rep 为空或不存在，则迁移过去
-                    if not d.get("sales_rep"):
-                        d["sales_rep"] = rec_val
-                    # 无论如何，删除 recorder
-                    del d["recorder"]
-                    changed = True
-                
-                # 再次确认 sales_rep 存在，防止丢失
-                if not d.get("sales_rep"):
-                    d["sales_rep"] = self.default_recorder # 使用默认值补全
-
-                if changed:
-                    with open(fp, "w", encoding="utf-8") as f:
-                        json.dump(d, f, ensure_ascii=False, indent=2)
-                    migrated_count += 1
-            except Exception as e:
-                print(f"[Migration Warning] Failed to migrate {fp.name}: {e}")
-        
-        if migrated_count > 0:
-            print(f"🧹 [System] 已完成旧数据清洗，迁移了 {migrated_count} 个文件的销售字段。")
+        self.store = create_store(self.config, data_dir=self.data_dir)
+
+        # ===== [PHASE 3 数据迁移] 版本化一次性迁移 =====
+        # 已完成的迁移记录在状态文件中，完全迁移过的存储启动时不再遍历任何商机
+        migrator = MigrationRunner(self.store, context={"default_sales_rep": self.default_sales_rep})
+        workers = self.config.getint("storage", "migration_workers", fallback=4)
+        result = migrator.run_pending(max_workers=workers)
+        if result["applied"]:
+            print(f"🧹 [System] 已执行数据迁移 {', '.join(result['applied'])}，更新了 {result['migrated']} 条商机。")
+        if result.get("failed"):
+            print(f"⚠️ [System] {len(result['failed'])} 条商机迁移失败，迁移将在下次启动时重试。")
 
         # 7. 初始化本地向量库 (Vector DB)
+        #    向量守护进程 (main.py vector-daemon) 在运行时只做轻量客户端，不在本进程加载模型
         try:
-            self.vector_service = VectorService()
+            socket_path = self.config.get("vector", "daemon_socket", fallback="data/vector_daemon.sock")
+            self.vector_service = RemoteVectorService.connect(socket_path)
+            if self.vector_service is not None:
+                print(f"🔗 [VectorService] 已连接向量守护进程 ({socket_path})")
+            else:
+                self.vector_service = VectorService(**vector_options(self.config))
         except Exception as e:
             # 容错处理：如果向量库挂了，系统降级为普通文件扫描模式，不影响主流程
             print(f"[yellow]警告：本地向量模型加载失败({e})，将回退到普通查询模式。[/yellow]")
             self.vector_service = None
 
+        # 8. 向量索引写后队列：保存商机只登记任务，编码与写入向量库由后台线程批量完成
+        self.index_queue = None
+        queue_path = self.config.get("vector", "index_queue", fallback="data/index_queue.db")
+        if self.vector_service and queue_path:
+            try:
+                self.index_queue = IndexQueue(
+                    self.store, self.vector_service, db_path=queue_path,
+                    batch_size=self.config.getint("vector", "index_batch_size", fallback=64)
+                )
+            except Exception as e:
+                print(f"[yellow]警告：向量索引队列不可用({e})，保存时将同步写入向量库。[/yellow]")
+        # 检索前等待此前的保存进入向量库 ("读己之写")，超时后照常检索
+        self.read_your_writes = self.config.getboolean("vector", "read_your_writes", fallback=True)
+        self.read_your_writes_timeout = self.config.getfloat("vector", "read_your_writes_timeout", fallback=10)
+        # 向量引擎加载期间的检索：默认不等待，直接返回关键字/索引结果并标记为部分结果
+        self.wait_for_engine = self.config.getboolean("vector", "wait_for_engine", fallback=False)
+        self.last_search_partial = False  # 最近一次检索是否在向量引擎加载期间降级 (未含语义结果)
+        self._deferred = set()  # 加载期间登记、尚未执行的预热检索 {(类型, 查询)}
+        self._deferred_lock = Lock()
+        self._deferred_executor = None
+
         # ===== [PHASE 2 优化] 商机数据缓存系统 =====
         # 问题：get_all_opportunities() 每次加载所有 JSON 文件，100+ 商机时严重拖慢
-        # 解决：基于 mtime 的 LRU 缓存，只在文件修改时重新加载
-        self._opp_cache = {}  # {(file_path, mtime): data}
-        self._opp_cache_lock = Lock()
-        self._cache_hits = 0
-        self._cache_misses = 0
+        # 解决：每个 Key 一个条目的 LRU 缓存 (按字节预算淘汰)，只在商机修改时重新加载
+        cache_mb = self.config.getfloat("cache", "max_mb", fallback=64)
+        self._opp_cache = OpportunityCache(max_bytes=int(cache_mb * 1024 * 1024))
 
         # ===== [PHASE 2 优化] ID 查找索引 =====
         # 问题：get_opportunity_by_id() 对所有商机进行两次线性搜索 (O(n))
-        # 解决：构建内存索引实现 O(1) 查找
+        # 解决：基于存储清单 (Manifest) 构建内存索引实现 O(1) 查找，全程不读商机正文
         self._id_index = {}  # {id: file_path}
         self._temp_id_index = {}  # {temp_id: file_path}
+        self._path_temp_index = {}  # {file_path: temp_id}
+        self._summaries = []  # [OpportunitySummary]，按修改时间倒序，供列表投影使用
+        self._summary_index = {}  # {file_path: OpportunitySummary}
+        self._stamp_index = {}  # {file_path: (mtime, size)}，供全文索引增量同步
         self._index_dirty = True  # 标记索引需要重建
+        self._index_generation = None  # 构建索引时的清单版本号
+
+        # ===== [PHASE 2 优化] 关键字倒排索引 =====
+        # 问题：search_opportunities 对每条商机做双向包含判断 (O(n))
+        # 解决：项目名/客户/公司的字符 n-gram 倒排索引，随 ID 索引一起增量同步
+        self.keyword_index = NgramIndex(use_jieba=self.config.getboolean("search", "use_jieba", fallback=False))
+
+        # ===== [PHASE 2 优化] 全文索引 =====
+        # 问题：带条件的 LIST 请求对每条商机执行 json.dumps 再做子串匹配，耗时与语料总字节数成正比
+        # 解决：BM25 倒排索引 + 每条商机一份缓存的小写全文，首次使用时构建，之后只重新加载变化的商机
+        self.fulltext_index = FullTextIndex()
+        self._fulltext_synced = False  # 全文索引是否已与当前 ID 索引对齐
+
+        # ===== [PHASE 2 优化] 结构化字段二级索引 =====
+        # 阶段/销售 (等值) 与 预算/时间节点 (范围) 的二级索引，随 ID 索引一起增量同步
+        self.filter_index = FilterIndex()
 
     # ==================== 配置校验 ====================
 
@@ -142,6 +180,25 @@ class LinkSellController:
         """[校验] 检查 LLM 配置是否有效"""
         return bool(self.api_key and self.endpoint_id and "YOUR_" not in self.api_key)
 
+    def _setup_llm_cache(self):
+        """[初始化] 按 [llm_cache] 配置启用 LLM 响应缓存；path 留空或 functions 为空则关闭"""
+        path = self.config.get("llm_cache", "path", fallback="data/llm_cache.db")
+        functions = self.config.get("llm_cache", "functions", fallback=",".join(CACHEABLE_FUNCTIONS))
+        functions = [f.strip() for f in functions.split(",") if f.strip()]
+        if not path or not functions:
+            configure_response_cache(None)
+            return
+        try:
+            cache = LLMResponseCache(
+                path,
+                ttl_s=self.config.getfloat("llm_cache", "ttl_hours", fallback=168) * 3600,
+                max_entries=self.config.getint("llm_cache", "max_entries", fallback=5000),
+            )
+            configure_response_cache(cache, functions)
+        except Exception as e:
+            print(f"[yellow]警告：LLM 响应缓存不可用({e})，将直接调用 LLM。[/yellow]")
+            configure_response_cache(None)
+
     def validate_asr_config(self):
         """[校验] 检查 ASR 配置是否有效"""
         return bool(self.asr_app_id and self.asr_token and "YOUR_" not in self.asr_token)
@@ -152,6 +209,7 @@ class LinkSellController:
         """[ASR] 音频转文字"""
         if not self.validate_asr_config():
             raise ValueError("ASR Configuration Invalid")
+        from src.services.asr_service import transcribe_audio
         return transcribe_audio(audio_file, self.asr_app_id, self.asr_token, self.asr_resource, debug=debug)
 
     def polish(self, text):
@@ -197,6 +255,10 @@ class LinkSellController:
             elif any(k in text for k in ["改", "更新", "换"]):
                 intent = "REPLACE"
         
+        return {"intent": self._check_intent(intent, text), "content": content}
+
+    def _check_intent(self, intent, text):
+        """[NLU] 意图白名单校验 + 闲聊误判修正"""
         # 3. 意图白名单校验
         valid_intents = ["CREATE", "LIST", "GET", "REPLACE", "DELETE", "RECORD", "MERGE", "OTHER"]
         if intent not in valid_intents:
@@ -208,38 +270,38 @@ class LinkSellController:
             biz_keywords = ["项目", "商机", "单子", "客户", "聊", "谈", "预算", "进度", "跟进", "详情", "档案", "会议", "一期", "二期"]
             if len(text) > 8 or any(k in text for k in biz_keywords):
                 intent = "RECORD"
-        
-        return {"intent": intent, "content": content}
+        return intent
+
+    def understand(self, text):
+        """
+        [NLU] 一次 LLM 调用完成意图识别、搜索词提取与结构化过滤条件提取
+        返回: {"intent": "...", "content": "...", "search_term": ..., "filters": {...}}
+        search_term 为 None 表示未提取 (融合调用失败退回 identify_intent 时)，调用方按需再提取。
+        """
+        if self.validate_llm_config():
+            result = understand_input(text, self.api_key, self.endpoint_id)
+            if result is not None:
+                intent = self._check_intent(result["intent"], text)
+                filters = {}
+                # 只有 LIST 才用得到过滤条件；其余意图不触发二级索引构建
+                if intent == "LIST" and result["filters"]:
+                    self._ensure_index()
+                    filters = filters_from_nlu(result["filters"], self.stage_map,
+                                               self.filter_index.values("sales_rep"))
+                return {
+                    "intent": intent,
+                    "content": result["content"],
+                    "search_term": result["search_term"],
+                    "filters": filters,
+                }
+        return dict(self.identify_intent(text), search_term=None, filters={})
 
     def extract_search_term(self, text):
         """
         [NLU] 提取核心搜索词
         例如："查看沈阳轴承厂详情" -> "沈阳轴承厂"
         """
-        from volcenginesdkarkruntime import Ark
-        
-        client = Ark(api_key=self.api_key)
-        prompt_path = Path("config/prompts/extract_search_term.txt")
-        if not prompt_path.exists(): return text
-        
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            sys_prompt = f.read()
-
-        try:
-            completion = client.chat.completions.create(
-                model=self.endpoint_id,
-                messages=[
-                    {"role": "system", "content": sys_prompt},
-                    {"role": "user", "content": text},
-                ],
-                temperature=0.1, 
-            )
-            term = completion.choices[0].message.content.strip()
-            if "Unknown" in term: return text
-            # 清洗结果，去除可能的引号
-            return term.replace('"', '').replace("'", '').replace('`', '').strip()
-        except:
-            return text
+        return extract_search_term(text, self.api_key, self.endpoint_id)
 
     def normalize_input(self, text, context_type="EMPTY_CHECK"):
         """
@@ -247,39 +309,13 @@ class LinkSellController:
         用于在填空或选择场景下，将用户的口语转化为标准值。
         """
         if not text or not text.strip(): return ""
-        
-        from volcenginesdkarkruntime import Ark
-        client = Ark(api_key=self.api_key)
-        prompt_path = Path("config/prompts/normalize_input.txt")
-        if not prompt_path.exists(): return text
-        
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            sys_prompt = f.read()
-            
-        user_msg = f"Context Type: {context_type}\nUser Input: {text}"
-
-        try:
-            completion = client.chat.completions.create(
-                model=self.endpoint_id,
-                messages=[
-                    {"role": "system", "content": sys_prompt},
-                    {"role": "user", "content": user_msg},
-                ],
-                temperature=0.1,
-            )
-            normalized = completion.choices[0].message.content.strip()
-            if "[[NULL]]" in normalized:
-                return ""
-            return normalized
-        except:
-            return text
+        return normalize_input(text, context_type, self.api_key, self.endpoint_id)
 
     # ==================== 数据操作 (CRUD) ====================
 
     def _get_safe_filename(self, project_name):
-        """[工具] 生成安全的文件名 (过滤非法字符)"""
-        safe_name = re.sub(r'[\\/:*?"<>|]', '_', project_name)
-        return self.data_dir / f"{safe_name}.json"
+        """[工具] 生成安全的存储 Key (过滤非法字符)"""
+        return Path(self.store.key_for(project_name))
 
     def calculate_changes(self, old_data: dict, new_data: dict) -> list:
         """
@@ -346,11 +382,21 @@ class LinkSellController:
 
         return changes
 
-    def list_opportunities(self, filter_func=None):
+    def list_opportunities(self, filter_func=None, fields=None):
         """
         [查询] 获取商机列表
         filter_func: 过滤器函数 lambda x: bool
+        fields: 投影字段 (见 OpportunitySummary.FIELDS)。指定后直接从摘要表返回精简字典，
+                不加载商机正文；为 None 时返回完整商机。
         """
+        if fields is not None:
+            unknown = set(fields) - set(OpportunitySummary.FIELDS)
+            if unknown:
+                raise ValueError(f"不支持的投影字段: {', '.join(sorted(unknown))}")
+            self._ensure_index()
+            rows = (rec.project(fields) for rec in self._summaries)
+            return [row for row in rows if not filter_func or filter_func(row)]
+
         all_data = self.get_all_opportunities()
         if not filter_func:
             return all_data
@@ -366,31 +412,28 @@ class LinkSellController:
         [搜索] 关键字模糊匹配
         返回格式: [{"name": "...", "id": "...", "sales_rep": "..."}]
         """
-        def keyword_filter(data):
-            p_name = data.get("project_opportunity", {}).get("project_name", "")
-            if not p_name: p_name = data.get("project_name", "")
-            # 双向包含逻辑
-            k_low = keyword.lower(); p_low = p_name.lower()
-            return (k_low in p_low) or (len(p_name) > 2 and p_low in k_low)
-            
+        self._ensure_index()
         matches = []
-        for p in self.list_opportunities(keyword_filter):
-            p_name = p.get("project_opportunity", {}).get("project_name", "")
-            if not p_name: p_name = p.get("project_name", "")
+        # 双向包含逻辑由倒排索引完成，结果按相关度排序，不读取任何商机正文
+        for p in self.keyword_index.match(keyword):
             matches.append({
-                "name": p_name,
-                "sales_rep": p.get("sales_rep", "未知"),
-                "id": p.get("id")
+                "name": p["project_name"],
+                "sales_rep": p["sales_rep"] or "未知",
+                "id": p["id"]
             })
         return matches
 
-    def find_potential_matches(self, project_name):
+    def find_potential_matches(self, project_name, read_your_writes=None, wait_for_engine=None):
         """
         [搜索] 混合搜索 (Keyword + Vector)
         用于在用户输入一个项目名时，找到所有可能的候选项目。
 
         [性能优化] 精确匹配时早终止，避免运行完整的搜索流程
+        [降级] 向量引擎仍在加载且不等待 (wait_for_engine，默认取配置) 时只返回关键字结果，
+        候选带 "partial": True 且 last_search_partial 为 True；同一检索登记到后台，就绪后预热
+        (加载失败时与引擎不可用相同，照常回退，不标记为部分结果)
         """
+        self.last_search_partial = False
         candidates = {} # 使用字典去重，Key 为项目名
         clean_search = project_name.strip().lower()
 
@@ -404,9 +447,27 @@ class LinkSellController:
             if name.strip().lower() == clean_search:
                 return [candidates[name]]
 
+        # 1.5 客户姓名/公司匹配 - 仅当项目名关键字无结果时补充
+        if not kw_matches:
+            self._ensure_index()
+            for field in ("customer_name", "company"):
+                for entry in self.keyword_index.match(project_name, field=field):
+                    name = entry["project_name"]
+                    if name and name not in candidates:
+                        candidates[name] = {"name": name, "source": "客户/公司匹配",
+                                            "sales_rep": entry["sales_rep"] or "未知", "id": entry["id"]}
+
         # 2. 向量搜索 (语义近似) - 仅当无精确匹配时执行
-        if self.vector_service:
-            vec_matches = self.vector_service.search_projects(project_name)
+        if self.vector_service and self._vector_loading(wait_for_engine):
+            self.last_search_partial = True
+            self._defer_vector_query("projects", project_name)
+        elif self.vector_service:
+            self._await_index(read_your_writes)
+            try:
+                vec_matches = self.vector_service.search_projects(project_name)
+            except Exception as e:
+                print(f"[yellow]警告：项目名语义匹配不可用({e})。[/yellow]")
+                vec_matches = []
             for vm in vec_matches:
                 p_name = vm["project_name"]
 
@@ -439,31 +500,83 @@ class LinkSellController:
         if contained_match:
             return [contained_match]
 
+        if self.last_search_partial:
+            return [dict(c, partial=True) for c in candidates.values()]
         return list(candidates.values())
 
-    def handle_query(self, query_text):
-        """[RAG] 处理基于知识库的问答"""
+    def handle_query(self, query_text, read_your_writes=None, wait_for_engine=None):
+        """
+        [RAG] 处理基于知识库的问答
+
+        参数:
+        - read_your_writes: 检索前是否等待写后队列处理完此前的保存 (None = 取配置 [vector] read_your_writes)
+        - wait_for_engine: 向量引擎加载中时是否等待 (None = 取配置 [vector] wait_for_engine)；
+          不等待时改用关键字/全文索引命中的商机作为上下文，last_search_partial 置为 True，回答末尾附提示
+        """
         if not self.validate_llm_config():
             return "__ERROR_CONFIG__"
             
-        # 1. 检索相关文档 (Top 5)
-        if self.vector_service:
-            history = self.vector_service.search(query_text, top_k=5)
-        else:
-            # Fallback: 读取最近修改的 10 个文件
+        # 1. 检索相关片段 (小记/需求/关键点 Top 8)，片段索引为空时退回整条商机 (Top 5)
+        #    ChromaDB 不可用时向量服务自动改用内置平铺索引，只有 Embedding 模型也无法加载才走文件回退
+        history = None
+        self.last_search_partial = False
+        if self.vector_service and self._vector_loading(wait_for_engine):
+            self.last_search_partial = True
+            self._defer_vector_query("chunks", query_text)
+            history = self._keyword_context(query_text)
+        elif self.vector_service:
+            self._await_index(read_your_writes)
+            try:
+                chunks = self.vector_service.search_chunks(query_text, top_k=8, hydrate=self._hydrate_record)
+                if chunks:
+                    history = self._chunk_context(chunks)
+                else:
+                    history = self.vector_service.search(query_text, top_k=5, hydrate=self._hydrate_record)
+            except Exception as e:
+                print(f"[yellow]警告：向量检索不可用({e})，回退到最近商机。[/yellow]")
+        if history is None:
+            # Fallback: 读取最近修改的 10 条商机
             history = []
-            files = sorted(self.data_dir.glob("*.json"), key=os.path.getmtime, reverse=True)[:10]
-            for fp in files:
-                try:
-                    with open(fp, "r", encoding="utf-8") as f:
-                        history.append(json.load(f))
-                except: pass
+            for key in self.store.keys()[:10]:
+                data = self.store.load(key)
+                if data: history.append(data)
         
         if not history:
             return "__EMPTY_DB__"
             
         # 2. 调用 LLM 生成回答
-        return query_sales_data(query_text, history, self.api_key, self.endpoint_id)
+        answer = query_sales_data(query_text, history, self.api_key, self.endpoint_id)
+        return f"{answer}\n\n{PARTIAL_SEARCH_NOTE}" if self.last_search_partial else answer
+
+    def _keyword_context(self, query_text, limit=5):
+        """[RAG 降级] 关键字倒排索引 + 全文索引命中的商机 (向量引擎加载期间使用)；无命中返回 None"""
+        ids = [m["id"] for m in self.search_opportunities(query_text)]
+        ids += [p["id"] for p in self.search_fulltext(query_text, fields=("id",))]
+        history = []
+        for rid in dict.fromkeys(i for i in ids if i):
+            data = self._hydrate_record(rid)
+            if data:
+                history.append(data)
+            if len(history) >= limit:
+                break
+        return history or None
+
+    def _chunk_context(self, chunks):
+        """[RAG] 片段按所属商机归组 (保持相关度顺序)，只带项目名/销售/阶段与命中的片段正文"""
+        grouped = {}
+        for hit in chunks:
+            rid = hit["record_id"]
+            if rid not in grouped:
+                summary = self._summary_index.get(self._id_index.get(rid))
+                grouped[rid] = {
+                    "id": rid,
+                    "project_name": hit["project_name"],
+                    "sales_rep": hit["sales_rep"],
+                    "stage": summary.stage if summary else None,
+                    "excerpts": []
+                }
+            grouped[rid]["excerpts"].append(hit["text"])
+        return list(grouped.values())
 
     def get_missing_fields(self, data):
         """[工具] 检查商机数据的必填字段缺失情况"""
@@ -658,19 +771,13 @@ class LinkSellController:
                     save_data.pop("_file_path", None)
                     save_data["updated_at"] = datetime.datetime.now().isoformat()
                     
-                    new_file_path.parent.mkdir(parents=True, exist_ok=True)
-                    with open(new_file_path, "w", encoding="utf-8") as f:
-                        json.dump(save_data, f, ensure_ascii=False, indent=2)
+                    self.store.write(str(new_file_path), save_data)
                     
-                    if old_file_path.exists():
-                        os.remove(old_file_path)
+                    if self.store.exists(str(old_file_path)):
+                        self.store.remove(str(old_file_path))
                     
                     # 更新向量库
-                    if self.vector_service:
-                        real_id = updated_data.get("id")
-                        if real_id:
-                            self.vector_service.delete_record(real_id)
-                            self.vector_service.add_record(real_id, save_data)
+                    self._index_record(updated_data.get("id"), save_data)
                     
                     updated_data["_file_path"] = str(new_file_path)
                     
@@ -707,10 +814,8 @@ class LinkSellController:
         proj_name = proj_info.get("project_name", record.get("project_name", "未命名项目"))
         file_path = self._get_safe_filename(proj_name)
         
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                try: target_proj = json.load(f)
-                except: target_proj = {}
+        if self.store.exists(str(file_path)):
+            target_proj = self.store.load(str(file_path)) or {}
         else:
             target_proj = {
                 "id": record.get("id") or str(int(now.timestamp())),
@@ -721,6 +826,8 @@ class LinkSellController:
         # 清理临时字段
         record.pop("_temp_id", None)
         record.pop("_file_path", None)
+        # 旧字段 recorder 已由一次性迁移清理，新写入同样不再保留
+        record.pop("recorder", None)
         
         target_proj.update(record) 
         if "project_opportunity" not in target_proj: target_proj["project_opportunity"] = {}
@@ -733,65 +840,53 @@ class LinkSellController:
         target_proj["record_logs"].append(new_log_entry)
         
         target_proj["updated_at"] = now.isoformat()
+
+        # 预算/时间节点规范化 (数值 + ISO 日期，与原文并存)
+        normalize_record(target_proj, today=now.date())
         
-        # 4. 写入文件
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(target_proj, f, ensure_ascii=False, indent=2)
+        # 4. 写入存储
+        self.store.write(str(file_path), target_proj)
+        self.invalidate_cache(str(file_path))
             
         record_id = target_proj.get("id")
 
-        # 5. 更新向量库
-        if self.vector_service:
-            try:
-                self.vector_service.add_record(record_id, target_proj)
-            except: pass
+        # 5. 更新向量库 (失败不影响保存，可通过 `main.py vector-sync` 修复)
+        try:
+            self._index_record(record_id, target_proj)
+        except Exception as e:
+            print(f"[yellow]⚠️ 向量库同步失败({e})，可稍后执行 vector-sync 修复。[/yellow]")
             
         return record_id, str(file_path)
 
     # ===== [PHASE 2 优化] 缓存辅助方法 =====
 
-    def _load_opportunity_cached(self, file_path: Path) -> dict:
+    def _load_opportunity_cached(self, file_path) -> dict:
         """
-        [性能优化] 带缓存的商机文件加载
+        [性能优化] 带缓存的商机加载
 
-        基于文件修改时间 (mtime) 的智能缓存：
-        - 如果文件未修改，直接返回缓存
-        - 如果文件已修改或不在缓存，重新加载
+        基于存储版本戳 (mtime) 的智能缓存：
+        - 如果商机未修改，直接返回缓存
+        - 如果商机已修改或不在缓存，重新加载并替换旧条目
 
+        返回的是独立副本，调用方可放心修改。
         预期收益：后续加载 10-100x 提速
         """
+        key = str(file_path)
         try:
-            mtime = file_path.stat().st_mtime
-            cache_key = (str(file_path), mtime)
-
-            # 检查缓存
-            with self._opp_cache_lock:
-                if cache_key in self._opp_cache:
-                    self._cache_hits += 1
-                    return self._opp_cache[cache_key].copy()
-
-                self._cache_misses += 1
-
-            # 缓存未命中 - 从磁盘加载
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            # LRU 淘汰：保持缓存在 1000 条以下
-            with self._opp_cache_lock:
-                if len(self._opp_cache) > 1000:
-                    # 移除最旧的 20% 条目
-                    sorted_keys = sorted(
-                        self._opp_cache.keys(),
-                        key=lambda k: self._opp_cache.get(k, {}).get('_cache_time', 0)
-                    )
-                    for k in sorted_keys[:200]:
-                        self._opp_cache.pop(k, None)
-
-                # 存入缓存
-                data['_cache_time'] = time.time()
-                self._opp_cache[cache_key] = data
-
-            return data.copy()
+            mtime = self.store.stamp(key)
+            if mtime is None:
+                return None
+
+            data = self._opp_cache.get(key, mtime)
+            if data is not None:
+                return data
+
+            # 缓存未命中 - 从存储加载
+            data = self.store.load(key)
+            if data is None:
+                return None
+            self._opp_cache.put(key, mtime, data)
+            return data
         except Exception as e:
             return None
 
@@ -802,80 +897,186 @@ class LinkSellController:
         参数：
             file_path: 指定文件路径失效，或 None 清空全部缓存
         """
-        with self._opp_cache_lock:
-            if file_path:
-                # 移除匹配此文件路径的所有条目（不同 mtime）
-                keys_to_remove = [k for k in self._opp_cache.keys() if k[0] == str(file_path)]
-                for k in keys_to_remove:
-                    self._opp_cache.pop(k, None)
-            else:
-                # 清空全部缓存
-                self._opp_cache.clear()
+        self._opp_cache.invalidate(str(file_path) if file_path else None)
 
         # [PHASE 2] 同时标记 ID 索引为 dirty
         self._index_dirty = True
 
     def get_cache_stats(self) -> dict:
-        """[诊断] 获取缓存性能统计"""
-        total = self._cache_hits + self._cache_misses
-        hit_rate = (self._cache_hits / total * 100) if total > 0 else 0
+        """[诊断] 获取缓存性能统计 (命中/未命中/淘汰/占用字节)，含查询向量缓存与 LLM 响应缓存"""
+        stats = self._opp_cache.stats()
+        if self.vector_service:
+            stats.update(self.vector_service.query_cache_stats())
+        if self.index_queue is not None:
+            stats.update(self.index_queue.stats())
+        stats.update(response_cache_stats())
+        return stats
 
-        return {
-            "cache_size": len(self._opp_cache),
-            "cache_hits": self._cache_hits,
-            "cache_misses": self._cache_misses,
-            "hit_rate_pct": round(hit_rate, 2)
-        }
+    # ===== 向量索引 (写后队列) =====
+
+    def _index_record(self, record_id, data) -> bool:
+        """[向量库] 商机写入后更新向量索引：启用写后队列时只登记任务立即返回，否则同步写入。返回是否已提交"""
+        if not self.vector_service or not record_id:
+            return False
+        if self.index_queue is not None:
+            self.index_queue.enqueue(record_id)
+        else:
+            self.vector_service.add_record(record_id, data)
+        return True
+
+    def _unindex_record(self, record_id):
+        """[向量库] 商机删除后移除向量索引"""
+        if not self.vector_service or not record_id:
+            return
+        if self.index_queue is not None:
+            self.index_queue.enqueue(record_id, op="delete")
+        else:
+            self.vector_service.delete_record(record_id)
+
+    def _vector_loading(self, wait_for_engine=None) -> bool:
+        """[向量库] 本次检索是否走降级：引擎仍在加载且调用方不等待 (加载失败不算，按引擎不可用照常回退)"""
+        if wait_for_engine is None:
+            wait_for_engine = self.wait_for_engine
+        return not wait_for_engine and self.vector_service.is_loading()
+
+    def vector_loading(self) -> bool:
+        """[状态] 向量引擎是否仍在后台加载 (LIST 等只走关键字/全文索引的检索据此提示)"""
+        return bool(self.vector_service) and self.vector_service.is_loading()
+
+    def _defer_vector_query(self, kind, query):
+        """
+        [降级] 加载期间的检索登记到后台单线程，引擎就绪后执行一次作为预热
+        (模型首次前向、查询向量缓存、索引页)；结果不保留，用户再次检索时直接命中已预热的引擎
+        """
+        key = (kind, query)
+        with self._deferred_lock:
+            if key in self._deferred or len(self._deferred) >= 128:
+                return
+            self._deferred.add(key)
+            if self._deferred_executor is None:
+                self._deferred_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="linksell-deferred")
+        self._deferred_executor.submit(self._run_deferred, kind, query)
+
+    def _run_deferred(self, kind, query):
+        try:
+            self.vector_service._ensure_initialized(timeout=600)
+            if kind == "projects":
+                self.vector_service.search_projects(query)
+            else:
+                self.vector_service.search_chunks(query, top_k=8)
+        except Exception:
+            pass  # 仅为预热：加载失败由下一次正式检索提示
+        finally:
+            with self._deferred_lock:
+                self._deferred.discard((kind, query))
+
+    def startup_report(self) -> dict:
+        """[诊断] 向量引擎启动各阶段耗时 (模型加载 / 向量库打开 / 索引准备 / 首次查询)"""
+        if not self.vector_service:
+            return {"status": "Disabled"}
+        return self.vector_service.startup_report()
+
+    def _await_index(self, read_your_writes=None):
+        """[向量库] 读己之写：等待写后队列处理完调用前已登记的任务 (超时只提示，不阻断检索)"""
+        if self.index_queue is None:
+            return
+        if read_your_writes is None:
+            read_your_writes = self.read_your_writes
+        if read_your_writes and not self.index_queue.wait(timeout=self.read_your_writes_timeout):
+            print(f"[yellow]⚠️ 向量索引仍有 {self.index_queue.depth()} 条待处理，检索结果可能未包含最新修改。[/yellow]")
 
     def _rebuild_index(self):
         """
         [性能优化] 重建 ID 查找索引
 
-        扫描所有文件构建 ID 到文件路径的映射，
-        将后续 get_opportunity_by_id 从 O(n) 优化为 O(1)
+        直接读取存储清单 (Manifest) 构建 ID / 临时 ID 到存储 Key 的映射，
+        不打开任何商机正文，将后续 get_opportunity_by_id 优化为 O(1)
         """
         self._id_index.clear()
         self._temp_id_index.clear()
+        self._path_temp_index.clear()
+        self._summary_index.clear()
+        self._stamp_index.clear()
+        summaries = []
 
-        files = sorted(self.data_dir.glob("*.json"), key=os.path.getmtime, reverse=True)
+        self._index_generation = self.store.generation()
+        entries = self.store.summaries()
+        for idx, entry in enumerate(entries):
+            key = entry["file_path"]
 
-        for idx, fp in enumerate(files):
-            try:
-                with open(fp, "r", encoding="utf-8") as f:
-                    data = json.load(f)
+            # 索引真实 ID
+            if entry.get("id") is not None:
+                self._id_index[entry["id"]] = key
+
+            # 索引临时 ID (基于顺序)
+            self._temp_id_index[str(idx + 1)] = key
+            self._path_temp_index[key] = str(idx + 1)
+            summaries.append(OpportunitySummary(entry, str(idx + 1)))
+            self._summary_index[key] = summaries[-1]
+            self._stamp_index[key] = (entry.get("mtime"), entry.get("size"))
 
-                    # 索引真实 ID
-                    if "id" in data:
-                        self._id_index[str(data["id"])] = str(fp)
+        self._summaries = summaries
 
-                    # 索引临时 ID (基于顺序)
-                    self._temp_id_index[str(idx + 1)] = str(fp)
-            except:
-                pass
+        # 关键字索引增量同步：只重新切分有变化的商机
+        self.keyword_index.sync(entries)
+        self.filter_index.sync(entries)
 
         self._index_dirty = False
+        self._fulltext_synced = False
+
+    def _ensure_index(self):
+        """[PHASE 2] 重建索引（如果需要，包括其他进程修改了存储）"""
+        if self._index_dirty or self._index_generation != self.store.generation():
+            self._rebuild_index()
+
+    def _ensure_fulltext_index(self):
+        """[PHASE 2] 全文索引增量同步：只加载版本戳变化的商机 (直接读存储，不挤占正文缓存)"""
+        self._ensure_index()
+        if not self._fulltext_synced:
+            self.fulltext_index.sync(self._stamp_index, self.store.load)
+            self._fulltext_synced = True
+
+    def search_fulltext(self, term, fields=("id", "project_name", "stage", "sales_rep")):
+        """
+        [搜索] 全文检索
+        命中规则与旧版一致 (小写查询串包含于商机完整 JSON 中)，结果按 BM25 得分降序、
+        同分按最近修改排序，返回摘要投影。
+        """
+        self._ensure_fulltext_index()
+        ranked = self.fulltext_index.search(term)
+        ranked.sort(key=lambda x: (-x[1], int(self._path_temp_index.get(x[0], 0))))
+        return [self._summary_index[key].project(fields) for key, _ in ranked if key in self._summary_index]
 
     def get_all_opportunities(self):
-        """[查询] 扫描目录获取所有商机文件 - 使用缓存优化"""
+        """[查询] 遍历存储获取所有商机 - 使用缓存优化"""
         all_data = []
-        files = sorted(self.data_dir.glob("*.json"), key=os.path.getmtime, reverse=True)
 
-        for idx, fp in enumerate(files):
+        # 排序与临时 ID 来自清单，不再逐个 stat/排序目录
+        for idx, key in enumerate(self.store.keys()):
             # [PHASE 2] 使用缓存加载
-            data = self._load_opportunity_cached(fp)
+            data = self._load_opportunity_cached(key)
             if data:
                 # 注入临时 ID 供 CLI 使用
                 data["_temp_id"] = str(idx + 1)
-                data["_file_path"] = str(fp)
+                data["_file_path"] = key
                 all_data.append(data)
 
         return all_data
 
+    def _hydrate_record(self, record_id):
+        """[RAG] 向量检索命中 -> 完整商机 (经缓存加载，去掉 _file_path 等内部字段)"""
+        self._ensure_index()
+        file_path = self._id_index.get(str(record_id))
+        if not file_path:
+            return None
+        data = self._load_opportunity_cached(file_path)
+        if data is None:
+            return None
+        return {k: v for k, v in data.items() if not k.startswith("_")}
+
     def get_opportunity_by_id(self, record_id):
         """[查询] 根据 ID (真实ID 或 临时ID) 获取商机 - O(1) 索引查找"""
-        # [PHASE 2] 重建索引（如果需要）
-        if self._index_dirty:
-            self._rebuild_index()
+        self._ensure_index()
 
         record_id_str = str(record_id)
 
@@ -889,15 +1090,11 @@ class LinkSellController:
             return None
 
         # 使用缓存加载
-        data = self._load_opportunity_cached(Path(file_path))
+        data = self._load_opportunity_cached(file_path)
         if data:
-            # 注入元数据
-            # 需要找到临时 ID（根据文件顺序）
-            all_files = sorted(self.data_dir.glob("*.json"), key=os.path.getmtime, reverse=True)
-            for idx, fp in enumerate(all_files):
-                if str(fp) == file_path:
-                    data["_temp_id"] = str(idx + 1)
-                    break
+            # 注入元数据 (临时 ID 直接来自清单索引)
+            if file_path in self._path_temp_index:
+                data["_temp_id"] = self._path_temp_index[file_path]
             data["_file_path"] = file_path
 
         return data
@@ -910,11 +1107,11 @@ class LinkSellController:
         file_path = Path(target.get("_file_path", ""))
         real_id = target.get("id")
         
-        if file_path.exists():
+        if self.store.exists(str(file_path)):
             try:
-                os.remove(file_path)
-                if self.vector_service and real_id:
-                    self.vector_service.delete_record(real_id)
+                self.store.remove(str(file_path))
+                self.invalidate_cache(str(file_path))
+                self._unindex_record(real_id)
                 return True
             except Exception as e:
                 print(f"Delete error: {{e}}")
@@ -955,25 +1152,26 @@ class LinkSellController:
         save_data.pop("recorder", None)
         
         save_data["updated_at"] = datetime.datetime.now().isoformat()
+        # 预算/时间节点规范化 (复制内层字典，避免修改调用方数据)
+        save_data["project_opportunity"] = dict(save_data["project_opportunity"])
+        normalize_record(save_data)
         
         try:
             # 1. 写入新文件
-            with open(new_file_path, "w", encoding="utf-8") as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2)
+            self.store.write(str(new_file_path), save_data)
             
             print(f"✅ 商机已保存至: {new_file_path}")
             
             # 2. 如果重命名了，删除旧文件
-            if old_file_path_str and Path(old_file_path_str).exists():
+            if old_file_path_str and self.store.exists(old_file_path_str):
                 old_file_path = Path(old_file_path_str)
                 if old_file_path.resolve() != new_file_path.resolve():
-                    os.remove(old_file_path)
+                    self.store.remove(old_file_path_str)
                     print(f"🗑️ 已删除旧文件: {old_file_path}")
             
             # 3. 同步向量库
-            if self.vector_service:
-                self.vector_service.add_record(save_data.get("id"), save_data)
-                print(f"📚 已保存至向量库 (ID: {save_data.get('id')})")
+            if self._index_record(save_data.get("id"), save_data):
+                print(f"📚 已提交向量库 (ID: {save_data.get('id')})")
 
             # 4. [PHASE 2] 使缓存失效
             self.invalidate_cache(str(new_file_path))
@@ -1035,19 +1233,21 @@ class LinkSellController:
         
         return None, candidates, "ambiguous"
 
-    def process_list_request(self, content):
-        """[业务逻辑] 处理 List 请求"""
-        search_term = self.extract_search_term(content) or ""
+    def process_list_request(self, content, search_term=None):
+        """[业务逻辑] 处理 List 请求 (search_term 已由融合 NLU 提取时不再调用 LLM)"""
+        if search_term is None:
+            search_term = self.extract_search_term(content)
+        search_term = search_term or ""
+        self.last_search_partial = self.vector_loading()
         clean_term = search_term.upper().replace("`", "").replace("'", "").replace('"', "")
         
         is_full_list = not clean_term or clean_term in ["ALL", "未知", "UNKNOWN", "商机", "项目", "列表", "全部", "所有"]
         
         if is_full_list:
-            results = self.list_opportunities()
+            results = self.list_opportunities(fields=("id", "project_name", "stage", "sales_rep"))
         else:
-            def simple_filter(data):
-                return search_term.lower() in json.dumps(data, ensure_ascii=False).lower()
-            results = self.list_opportunities(simple_filter)
+            # 全文索引检索：按相关度排序，耗时与命中数成正比
+            results = self.search_fulltext(search_term)
             
         return {
             "results": results,
@@ -1055,6 +1255,87 @@ class LinkSellController:
             "search_term": search_term if not is_full_list else "全部"
         }
 
+    def query_opportunities(self, filters=None, sort_by=None, descending=False, limit=None,
+                            fields=("id", "project_name", "stage", "sales_rep")):
+        """
+        [查询] 结构化查询 (等值 + 范围 + 排序)，全程走二级索引与摘要投影，不读取商机正文
+        filters: 见 FilterIndex.select，如 {"stage": "3", "sales_rep": "张三", "budget": (500000, None)}
+        sort_by: budget / timeline / stage，None 表示按最近修改排序；缺失取值的商机始终排在最后
+        """
+        if sort_by is not None and sort_by not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort_by}")
+        self._ensure_index()
+        selected = self.filter_index.select(filters or {})
+        keys = list(self._summary_index) if selected is None else [k for k in selected if k in self._summary_index]
+
+        recency = lambda k: int(self._path_temp_index.get(k, 0))
+        if sort_by is None:
+            keys.sort(key=recency, reverse=descending)
+        else:
+            def sort_value(k):
+                v = self.filter_index.value(k, sort_by)
+                if sort_by == "stage":
+                    v = int(v) if v and v.isdigit() else None
+                return v
+            present = [k for k in keys if sort_value(k) is not None]
+            missing = sorted((k for k in keys if sort_value(k) is None), key=recency)
+            present.sort(key=recency)
+            present.sort(key=sort_value, reverse=descending)
+            keys = present + missing
+
+        if limit is not None:
+            keys = keys[:limit]
+        return [self._summary_index[k].project(fields) for k in keys]
+
+    def pipeline_summary(self, filters=None) -> dict:
+        """
+        [统计] 按阶段汇总商机数量与预算总额 (元)，直接使用规范化后的 budget_value，无需再问 LLM
+        返回: {"3": {"count": 5, "budget_total": 3500000.0, "budget_missing": 1}, ...}
+        """
+        self._ensure_index()
+        selected = self.filter_index.select(filters or {})
+        keys = self._summary_index if selected is None else selected
+        summary = {}
+        for key in keys:
+            stage = self.filter_index.value(key, "stage") or ""
+            budget = self.filter_index.value(key, "budget")
+            row = summary.setdefault(stage, {"count": 0, "budget_total": 0.0, "budget_missing": 0})
+            row["count"] += 1
+            if budget is None:
+                row["budget_missing"] += 1
+            else:
+                row["budget_total"] += budget
+        return summary
+
+    def parse_list_filters(self, content, with_rest=False):
+        """
+        [NLU] 规则提取结构化过滤条件 (阶段/销售/预算/时间节点)，识别不到时返回空字典
+        with_rest=True 时返回 (条件, 条件之外剩余的关键字)
+        """
+        self._ensure_index()
+        return parse_list_filters(content, self.stage_map, self.filter_index.values("sales_rep"),
+                                  with_rest=with_rest)
+
+    def process_structured_list(self, filters, sort_by=None, descending=False, keyword=None):
+        """
+        [业务逻辑] 直接执行结构化过滤的 List 请求，返回格式同 process_list_request
+        keyword: 条件之外的关键字 ("P3阶段的医院项目" 中的 "医院")，与全文检索结果取交集；
+                 关键字在全部商机中都没有命中时视为规则未识别的虚词，忽略而不是返回空结果
+        """
+        self.last_search_partial = self.vector_loading()
+        results = self.query_opportunities(filters, sort_by=sort_by, descending=descending)
+        labels = {"stage": "阶段", "sales_rep": "销售", "budget": "预算", "timeline": "时间节点"}
+        terms = [labels[f] for f in filters if f in labels]
+        matched = {r["id"] for r in self.search_fulltext(keyword, fields=("id",))} if keyword else set()
+        if matched:
+            results = [r for r in results if r["id"] in matched]
+            terms.append(keyword)
+        return {
+            "results": results,
+            "message": f"📋 找到 {len(results)} 条商机" if results else "暂未找到相关商机。",
+            "search_term": "、".join(terms)
+        }
+
     def get_missing_fields_notification(self, data):
         """[工具] 生成缺失字段提示"""
         missing = self.get_missing_fields(data)
@@ -13,7 +13,7 @@
 
 import json
 from functools import lru_cache
-from src.core.controller import LinkSellController
+from src.core.controller import LinkSellController, PARTIAL_SEARCH_NOTE
 
 
 # ===== [PHASE 1 优化] 报告格式化缓存 =====
@@ -173,6 +173,14 @@ class ConversationalEngine:
                 stage_name = self.controller.stage_map.get(stage, stage)
                 sales = opp.get("sales_rep", "-")
                 lines.append(f"- `ID: {pid}` | **{p_name}** | {stage_name} | {sales}")
+            elif "stage" in opp:
+                # 摘要投影 (list_opportunities(fields=...)) 的精简记录
+                pid = opp.get("id", "?")
+                p_name = opp.get("project_name") or "未知项目"
+                stage = str(opp.get("stage") or "-")
+                stage_name = self.controller.stage_map.get(stage, stage)
+                sales = opp.get("sales_rep") or "-"
+                lines.append(f"- `ID: {pid}` | **{p_name}** | {stage_name} | {sales}")
             else:
                 pid = opp.get("id", "?")
                 p_name = opp.get("name", "未知")
@@ -189,22 +197,26 @@ class ConversationalEngine:
         [核心入口] 统一处理用户输入
         流程: 识别意图 -> 分发到对应的 handle_xxx 方法 -> 返回结果
         """
-        # 1. 意图识别
-        intent_result = self.controller.identify_intent(user_input)
+        # 1. 意图识别 (融合 NLU 同时给出搜索词与过滤条件，查看/删除/修改不再单独调用 LLM 提取搜索词)
+        if self.controller.fused_nlu:
+            intent_result = self.controller.understand(user_input)
+        else:
+            intent_result = self.controller.identify_intent(user_input)
         intent = intent_result.get("intent", "UNKNOWN")
         content = intent_result.get("content", user_input)
+        search_term = intent_result.get("search_term")
 
         # 2. 意图分发
         if intent == "GET":
-            return self.handle_get(content)
+            return self.handle_get(content, search_term=search_term)
         elif intent == "LIST":
-            return self.handle_list(content)
+            return self.handle_list(content, search_term=search_term, filters=intent_result.get("filters"))
         elif intent == "CREATE":
             return self.handle_create(content)
         elif intent == "REPLACE":
-            return self.handle_replace(content)
+            return self.handle_replace(content, search_term=search_term)
         elif intent == "DELETE":
-            return self.handle_delete(content)
+            return self.handle_delete(content, search_term=search_term)
         elif intent == "RECORD":
             return self.handle_record(content)
         elif intent == "MERGE":
@@ -218,13 +230,14 @@ class ConversationalEngine:
 
     # ==================== 业务处理器 ====================
 
-    def _search_and_resolve(self, content: str, use_context: bool = True):
+    def _search_and_resolve(self, content: str, use_context: bool = True, search_term: str = None):
         """
         [内部逻辑] 搜索解析器
         根据用户输入的内容，尝试找到对应的商机。
-        支持上下文 (Context) 优先匹配。
+        支持上下文 (Context) 优先匹配。search_term 为 None 时调用 LLM 提取。
         """
-        search_term = self.controller.extract_search_term(content)
+        if search_term is None:
+            search_term = self.controller.extract_search_term(content)
 
         # 策略 1: 上下文优先
         # 如果是模糊指令 (如 "查看详情") 且当前锁定了商机，直接返回当前商机
@@ -237,12 +250,14 @@ class ConversationalEngine:
         final_term = search_term if search_term else content
         return self.controller.find_potential_matches(final_term)
 
-    def handle_get(self, content: str) -> dict:
+    def handle_get(self, content: str, search_term: str = None) -> dict:
         """[GET] 处理查看详情意图"""
-        candidates = self._search_and_resolve(content)
+        candidates = self._search_and_resolve(content, search_term=search_term)
+        # 向量引擎仍在加载时只有关键字结果，提示用户语义匹配稍后可用
+        partial_note = PARTIAL_SEARCH_NOTE if self.controller.last_search_partial else ""
 
         if not candidates:
-            return {"type": "error", "message": f"找不到与 '{content}' 相关的商机。"}
+            return {"type": "error", "message": f"找不到与 '{content}' 相关的商机。{partial_note}"}
 
         # 精确匹配：锁定并展示详情
         if len(candidates) == 1:
@@ -258,21 +273,32 @@ class ConversationalEngine:
         # 模糊匹配：展示列表供选择
         return {
             "type": "list",
-            "message": "找到多个匹配结果，请提供更精准的名称或直接使用 ID：",
+            "message": f"找到多个匹配结果，请提供更精准的名称或直接使用 ID：{partial_note}",
             "report_text": self._format_list(candidates)
         }
 
-    def handle_list(self, content: str) -> dict:
-        """[LIST] 处理列表查询意图"""
-        result_pkg = self.controller.process_list_request(content)
+    def handle_list(self, content: str, search_term: str = None, filters: dict = None) -> dict:
+        """[LIST] 处理列表查询意图 (search_term / filters 为融合 NLU 的结果，可选)"""
+        # 能识别出结构化条件 (阶段/销售/预算/时间) 时直接走二级索引，无需 LLM 提取搜索词
+        # 条件之外还有关键字 ("P3阶段的医院项目") 时与全文检索结果取交集
+        # 规则解析优先，规则识别不到时再用融合 NLU 给出的条件与搜索词
+        rule_filters, keyword = self.controller.parse_list_filters(content, with_rest=True)
+        if not rule_filters and filters:
+            rule_filters = filters
+            keyword = search_term if search_term and search_term.upper() != "ALL" else ""
+        if rule_filters:
+            result_pkg = self.controller.process_structured_list(rule_filters, keyword=keyword or None)
+        else:
+            result_pkg = self.controller.process_list_request(content, search_term=search_term)
         results = result_pkg["results"]
+        partial_note = PARTIAL_SEARCH_NOTE if self.controller.last_search_partial else ""
         return {
             "type": "list",
-            "message": result_pkg["message"],
+            "message": result_pkg["message"] + partial_note,
             "report_text": self._format_list(results)
         }
 
-    def handle_replace(self, content: str) -> dict:
+    def handle_replace(self, content: str, search_term: str = None) -> dict:
         """[REPLACE] 处理修改意图"""
         # 1. 优先检查当前锁定上下文
         target = None
@@ -281,7 +307,7 @@ class ConversationalEngine:
         
         # 2. 如果没有锁定，才尝试去搜索
         if not target:
-            candidates = self._search_and_resolve(content, use_context=False)
+            candidates = self._search_and_resolve(content, use_context=False, search_term=search_term)
             if not candidates:
                 return {"type": "error", "message": "找不到要修改的目标，请先查询并锁定一个商机，或在指令中包含准确的项目名称。"}
             if len(candidates) > 1:
@@ -312,9 +338,9 @@ class ConversationalEngine:
                 }
         return {"type": "error", "message": "修改保存失败。"}
 
-    def handle_delete(self, content: str) -> dict:
+    def handle_delete(self, content: str, search_term: str = None) -> dict:
         """[DELETE] 处理删除意图"""
-        candidates = self._search_and_resolve(content)
+        candidates = self._search_and_resolve(content, search_term=search_term)
 
         if not candidates:
             return {"type": "error", "message": "找不到要删除的目标。"}
@@ -0,0 +1,363 @@
+"""
+LinkSell 结构化过滤引擎 (Structured Filter Engine)
+
+职责：
+- 为 阶段 / 销售 / 预算 / 时间节点 建立二级索引，随存储清单 (Manifest) 增量维护
+- 执行 等值 + 范围 + 排序 的组合查询，供 Controller.query_opportunities 使用
+- 从自然语言中规则化提取结构化过滤条件 ("P3 阶段张三超过50万的单子")，不调用 LLM
+
+特点：
+- **Equality**: 阶段、销售走哈希表 {值: {Key}}，O(1) 取候选集
+- **Range**: 预算 (元)、时间节点 (ISO 日期) 走有序数组 + 二分查找，O(log n + 命中数)
+- **Smallest First**: 多个条件时从最小候选集开始求交集
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from threading import RLock
+
+from src.core.normalization import parse_amount, parse_date
+
+EQUALITY_FIELDS = ("stage", "sales_rep")
+RANGE_FIELDS = ("budget", "timeline")
+SORT_FIELDS = RANGE_FIELDS + ("stage",)
+
+
+def _entry_values(entry: dict) -> dict:
+    """
+    [工具] 从清单条目提取可索引的规范化取值
+    优先使用写入时规范化的 budget_value / timeline_date；尚未回填的旧条目退回解析原文 (仅绝对日期)。
+    """
+    budget = entry.get("budget_value")
+    timeline = entry.get("timeline_date")
+    return {
+        "stage": entry.get("stage") or "",
+        "sales_rep": entry.get("sales_rep") or "",
+        "budget": budget if budget is not None else parse_amount(entry.get("budget")),
+        "timeline": timeline if timeline is not None else parse_date(entry.get("timeline")),
+    }
+
+
+class FilterIndex:
+    """
+    [核心类] 结构化字段二级索引
+    文档键为存储 Key (即 _file_path)。
+    """
+
+    # 单次同步变更超过该条数时整体重建有序数组
+    BULK_THRESHOLD = 256
+
+    def __init__(self):
+        self._lock = RLock()
+        self._values = {}                                            # {doc_key: {field: value}}
+        self._stamps = {}                                            # {doc_key: 版本戳}
+        self._equality = {f: defaultdict(set) for f in EQUALITY_FIELDS}  # {field: {value: {doc_key}}}
+        self._sorted = {f: ([], []) for f in RANGE_FIELDS}             # {field: (有序取值, 对应 doc_key)}
+
+    def __len__(self):
+        return len(self._values)
+
+    # ---------- 维护 ----------
+
+    @staticmethod
+    def _stamp(entry: dict) -> tuple:
+        return (entry.get("mtime"),) + tuple(entry.get(f) for f in EQUALITY_FIELDS + RANGE_FIELDS) \
+            + (entry.get("budget_value"), entry.get("timeline_date"))
+
+    def add(self, doc_key: str, entry: dict, _bulk: bool = False):
+        """[维护] 新增或替换一条商机 (_bulk=True 时暂不维护有序数组，由调用方统一重建)"""
+        values = _entry_values(entry)
+        with self._lock:
+            self.remove(doc_key, _bulk=_bulk)
+            self._values[doc_key] = values
+            self._stamps[doc_key] = self._stamp(entry)
+            for field in EQUALITY_FIELDS:
+                self._equality[field][values[field]].add(doc_key)
+            if _bulk:
+                return
+            for field in RANGE_FIELDS:
+                value = values[field]
+                if value is None:
+                    continue
+                vals, keys = self._sorted[field]
+                pos = bisect_right(vals, value)
+                vals.insert(pos, value)
+                keys.insert(pos, doc_key)
+
+    def remove(self, doc_key: str, _bulk: bool = False):
+        """[维护] 移除一条商机"""
+        with self._lock:
+            values = self._values.pop(doc_key, None)
+            self._stamps.pop(doc_key, None)
+            if values is None:
+                return
+            for field in EQUALITY_FIELDS:
+                bucket = self._equality[field].get(values[field])
+                if bucket is not None:
+                    bucket.discard(doc_key)
+                    if not bucket:
+                        del self._equality[field][values[field]]
+            if _bulk:
+                return
+            for field in RANGE_FIELDS:
+                value = values[field]
+                if value is None:
+                    continue
+                vals, keys = self._sorted[field]
+                lo, hi = bisect_left(vals, value), bisect_right(vals, value)
+                pos = keys.index(doc_key, lo, hi)
+                del vals[pos]
+                del keys[pos]
+
+    def _rebuild_sorted(self):
+        for field in RANGE_FIELDS:
+            pairs = sorted((v[field], k) for k, v in self._values.items() if v[field] is not None)
+            self._sorted[field] = ([p[0] for p in pairs], [p[1] for p in pairs])
+
+    def sync(self, entries: list) -> int:
+        """
+        [增量同步] 与清单条目对齐，只处理版本戳变化的条目；返回变更条数
+        变更较多 (如首次构建) 时改为整体排序重建有序数组，避免逐条插入的 O(n^2)。
+        """
+        with self._lock:
+            seen = set()
+            changed = []
+            for entry in entries:
+                doc_key = entry["file_path"]
+                seen.add(doc_key)
+                if self._stamps.get(doc_key) != self._stamp(entry):
+                    changed.append(entry)
+            removed = [k for k in self._values if k not in seen]
+
+            bulk = len(changed) + len(removed) > self.BULK_THRESHOLD
+            for entry in changed:
+                self.add(entry["file_path"], entry, _bulk=bulk)
+            for doc_key in removed:
+                self.remove(doc_key, _bulk=bulk)
+            if bulk:
+                self._rebuild_sorted()
+        return len(changed) + len(removed)
+
+    # ---------- 查询 ----------
+
+    def value(self, doc_key: str, field: str):
+        """[查询] 某条商机的规范化取值"""
+        values = self._values.get(doc_key)
+        return values.get(field) if values else None
+
+    def values(self, field: str) -> list:
+        """[查询] 某等值字段的全部取值 (如全部销售姓名)"""
+        return [v for v in self._equality[field] if v]
+
+    def _range_bounds(self, field: str, lo, hi) -> tuple:
+        vals, _ = self._sorted[field]
+        start = bisect_left(vals, lo) if lo is not None else 0
+        end = bisect_right(vals, hi) if hi is not None else len(vals)
+        return start, max(start, end)
+
+    def _matches(self, doc_key: str, filters: dict) -> bool:
+        values = self._values[doc_key]
+        for field, wanted in filters.items():
+            value = values[field]
+            if field in EQUALITY_FIELDS:
+                if value not in wanted:
+                    return False
+            else:
+                lo, hi = wanted
+                if value is None or (lo is not None and value < lo) or (hi is not None and value > hi):
+                    return False
+        return True
+
+    def select(self, filters: dict):
+        """
+        [查询] 返回满足全部条件的 Key 集合；没有任何条件时返回 None (表示全部)
+        filters 格式：
+        - 等值字段 (stage / sales_rep): 单个值或值列表
+        - 范围字段 (budget / timeline): (下限, 上限)，任一端为 None 表示不限；
+          budget 单位为元，timeline 为 "YYYY-MM-DD"
+        只物化最小的候选集 (等值桶或二分得到的区间)，其余条件逐条校验，耗时与最小候选集成正比。
+        """
+        unknown = set(filters) - set(EQUALITY_FIELDS) - set(RANGE_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的过滤字段: {', '.join(sorted(unknown))}")
+
+        normalized = {}
+        for field, wanted in filters.items():
+            if wanted is None:
+                continue
+            if field in EQUALITY_FIELDS:
+                normalized[field] = {str(v) for v in ([wanted] if isinstance(wanted, (str, int)) else wanted)}
+            else:
+                normalized[field] = tuple(wanted)
+        if not normalized:
+            return None
+
+        with self._lock:
+            # 估算每个条件的候选集大小，挑最小的物化
+            best_field, best_size = None, None
+            for field, wanted in normalized.items():
+                if field in EQUALITY_FIELDS:
+                    size = sum(len(self._equality[field].get(v, ())) for v in wanted)
+                else:
+                    start, end = self._range_bounds(field, *wanted)
+                    size = end - start
+                if best_size is None or size < best_size:
+                    best_field, best_size = field, size
+
+            wanted = normalized.pop(best_field)
+            if best_field in EQUALITY_FIELDS:
+                candidates = set()
+                for v in wanted:
+                    candidates |= self._equality[best_field].get(v, set())
+            else:
+                start, end = self._range_bounds(best_field, *wanted)
+                candidates = self._sorted[best_field][1][start:end]
+            return {k for k in candidates if self._matches(k, normalized)}
+
+
+# ==================== 自然语言 -> 结构化条件 ====================
+
+_AMOUNT = r"(\d+(?:\.\d+)?\s*(?:亿|万|w|千|k|元))"
+_BUDGET_PATTERNS = (
+    (re.compile(r"(?:超过|大于|高于|多于|不低于|不少于|至少|>=?|≥)\s*" + _AMOUNT, re.I), "min"),
+    (re.compile(_AMOUNT + r"\s*(?:以上|及以上|起)", re.I), "min"),
+    (re.compile(r"(?:低于|小于|少于|不超过|不高于|至多|<=?|≤)\s*" + _AMOUNT, re.I), "max"),
+    (re.compile(_AMOUNT + r"\s*(?:以下|以内|及以下)", re.I), "max"),
+)
+_BUDGET_BETWEEN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(亿|万|w|千|k|元)?\s*(?:到|至|-|~|～)\s*(\d+(?:\.\d+)?)\s*(亿|万|w|千|k|元)", re.I
+)
+_DATE = r"(\d{4}\s*[-/.年]\s*\d{1,2}(?:\s*[-/.月]\s*\d{1,2}\s*[日号]?|\s*月)?)"
+_TIMELINE_PATTERNS = (
+    (re.compile(_DATE + r"\s*(?:之前|以前|前)"), "max"),
+    (re.compile(_DATE + r"\s*(?:之后|以后|后)"), "min"),
+)
+_STAGE_PATTERNS = (
+    re.compile(r"(?<![a-z])P\s*([1-9])", re.I),
+    re.compile(r"阶段\s*([1-9])"),
+    re.compile(r"第\s*([1-9一二三四五六七八九])\s*阶段"),
+)
+_CN_DIGITS = {"一": "1", "二": "2", "三": "3", "四": "4", "五": "5", "六": "6", "七": "7", "八": "8", "九": "9"}
+
+
+# 条件之外不构成检索意图的虚词/功能词 (用于判断剩余文本中是否还有关键字)
+_LIST_FILLER = re.compile(
+    r"中的|里的|的|阶段|项目|商机|单子|活儿|负责人|负责|销售|名下|手上|手里|跟进|在跟|跟的|列出|显示|查看|查询|"
+    r"搜索|找一下|看看|所有|全部|有哪些|哪些|一共|总共|有几个|有几条|有多少个?|多少个|几个|几条|预算|时间节点|"
+    r"[，,。.、？?！!:：\s]"
+)
+# 排序指令 ("按预算从高到低"、"按时间排序")：不是检索关键字，整体去掉
+_LIST_SORT = re.compile(
+    r"(?:(?:按照?|以)[^，,。？?！!\s]{0,6}?)?(?:从高到低|从低到高|从大到小|从小到大|由高到低|由低到高|"
+    r"降序|升序|倒序|正序|排序|排列|排一下)"
+)
+
+
+def _list_filter_rest(text: str, stage_map: dict, reps: list) -> str:
+    """[规则解析] 去掉已识别的条件与虚词后剩余的关键字，如 "P3阶段的医院项目" -> "医院" """
+    rest = text
+    for pattern in _STAGE_PATTERNS + (_BUDGET_BETWEEN,) + tuple(p for p, _ in _BUDGET_PATTERNS + _TIMELINE_PATTERNS):
+        rest = pattern.sub(" ", rest)
+    labels = [re.sub(r"^P\d+\s*", "", name or "", flags=re.I).strip() for name in (stage_map or {}).values()]
+    for word in sorted(filter(None, labels + list(reps)), key=len, reverse=True):
+        rest = rest.replace(word, " ")
+    rest = _LIST_SORT.sub(" ", rest)
+    return _LIST_FILLER.sub("", rest)
+
+
+def parse_list_filters(text: str, stage_map: dict = None, sales_reps=(), with_rest: bool = False):
+    """
+    [规则解析] 从 LIST 请求中提取结构化过滤条件
+    stage_map: {"3": "P3 商务谈判"}，用于识别阶段名称；sales_reps: 已知销售姓名。
+    未识别到任何条件时返回空字典 (调用方应退回关键字/全文检索)。
+    with_rest=True 时返回 (条件, 剩余关键字)，剩余关键字非空说明还需按关键字过滤 ("P3阶段的医院项目")。
+    """
+    if not text:
+        return ({}, "") if with_rest else {}
+    filters = {}
+
+    # 1. 阶段：P3 / 阶段3 / 第三阶段 / 阶段名称 ("商务谈判")
+    stages = []
+    for pattern in _STAGE_PATTERNS:
+        for m in pattern.finditer(text):
+            stages.append(_CN_DIGITS.get(m.group(1), m.group(1)))
+    for code, name in (stage_map or {}).items():
+        label = re.sub(r"^P\d+\s*", "", name or "", flags=re.I).strip()
+        if label and label in text:
+            stages.append(str(code))
+    if stages:
+        filters["stage"] = sorted(set(stages))
+
+    # 2. 销售：文本中出现的已知销售姓名
+    reps = sorted({r for r in sales_reps if r and len(r) >= 2 and r in text})
+    if reps:
+        filters["sales_rep"] = reps
+
+    # 3. 预算区间 (必须带单位，避免把 "3个月" 之类误当金额)
+    lo = hi = None
+    m = _BUDGET_BETWEEN.search(text)
+    if m:
+        unit = m.group(2) or m.group(4)
+        lo, hi = parse_amount(m.group(1) + unit), parse_amount(m.group(3) + m.group(4))
+    for pattern, bound in _BUDGET_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            if bound == "min":
+                lo = parse_amount(m.group(1))
+            else:
+                hi = parse_amount(m.group(1))
+    if lo is not None or hi is not None:
+        filters["budget"] = (lo, hi)
+
+    # 4. 时间节点
+    lo = hi = None
+    for pattern, bound in _TIMELINE_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            if bound == "min":
+                lo = parse_date(m.group(1))
+            else:
+                hi = parse_date(m.group(1))
+    if lo is not None or hi is not None:
+        filters["timeline"] = (lo, hi)
+
+    if with_rest:
+        return filters, _list_filter_rest(text, stage_map, reps)
+    return filters
+
+
+def filters_from_nlu(raw: dict, stage_map: dict = None, sales_reps=()) -> dict:
+    """
+    [规范化] 把 LLM 融合解析返回的过滤条件转为 FilterIndex.select 的格式
+    raw: {"stage": ["P3"], "sales_rep": ["张三"], "budget_min": "50万", "budget_max": null,
+          "timeline_after": "2024-06", "timeline_before": null}
+    只保留能识别的阶段与已知销售 (防止模型编造)，金额/日期用与规则解析相同的解析器。
+    """
+    if not isinstance(raw, dict):
+        return {}
+    filters = {}
+
+    stages = set()
+    for item in raw.get("stage") or []:
+        text = str(item).strip()
+        if text.isdigit():
+            if not stage_map or text in stage_map:
+                stages.add(text)
+        else:
+            stages.update(parse_list_filters(text, stage_map).get("stage", []))
+    if stages:
+        filters["stage"] = sorted(stages)
+
+    known = set(sales_reps)
+    reps = sorted({str(r).strip() for r in raw.get("sales_rep") or [] if str(r).strip() in known})
+    if reps:
+        filters["sales_rep"] = reps
+
+    for field, parse, lo_key, hi_key in (("budget", parse_amount, "budget_min", "budget_max"),
+                                         ("timeline", parse_date, "timeline_after", "timeline_before")):
+        lo, hi = parse(raw.get(lo_key)), parse(raw.get(hi_key))
+        if lo is not None or hi is not None:
+            filters[field] = (lo, hi)
+
+    return filters
@@ -0,0 +1,229 @@
+"""
+LinkSell 向量索引写后队列 (Write-behind Index Queue)
+
+职责：
+- 保存/改名/删除商机时只登记一条 (商机 ID, 版本号) 任务，立即返回，不等待模型加载与编码
+- 后台线程按批取出任务：从主存储读取商机最新内容后批量写入向量库，已删除的商机从向量库移除
+- 提供 "读己之写" 等待 (wait)：检索前可等到此前的写入都已进入向量库
+- 暴露队列深度、最老任务的滞后时间、失败次数等指标
+
+特点：
+- **Deduplicated**: 每个商机 ID 只保留一条任务 (最新版本号)，连续保存多次只编码一次
+- **Durable**: 任务存放在 SQLite (WAL)，进程退出或崩溃后下次启动继续处理
+- **Version-checked**: 任务处理完成时仅删除版本号未变的任务，处理期间再次保存的商机不会丢失更新
+- **Back-off**: 向量库不可用 (模型加载中/失败) 时保留任务，按指数退避重试
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class IndexQueue:
+    """[写后队列] 商机 -> 向量库的异步索引任务"""
+
+    # 失败重试的退避区间 (秒)
+    RETRY_MIN = 1.0
+    RETRY_MAX = 60.0
+
+    def __init__(self, store, vector_service, db_path="data/index_queue.db", batch_size: int = 64,
+                 init_timeout: float = 600.0, start: bool = True):
+        """
+        参数:
+        - store: 主存储 (OpportunityStore)，任务处理时按 ID 读取商机最新内容
+        - vector_service: 向量服务
+        - db_path: 任务表 (SQLite) 路径
+        - batch_size: 每批最多处理的任务数 (同时作为模型编码批大小)
+        - init_timeout: 等待向量引擎就绪的最长时间 (秒)，超时按失败退避重试
+        - start: 是否立即启动后台线程 (测试中可手动调用 drain_once)
+        """
+        self.store = store
+        self.vector_service = vector_service
+        self.batch_size = batch_size
+        self.init_timeout = init_timeout
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS index_jobs (
+                record_id   TEXT PRIMARY KEY,
+                version     INTEGER NOT NULL,
+                op          TEXT NOT NULL,
+                enqueued_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_index_jobs_version ON index_jobs(version);
+            """
+        )
+        self._conn.commit()
+
+        self._cond = threading.Condition()
+        # 内存镜像 {record_id: (version, op, enqueued_at)}，与任务表一致
+        self._pending = {
+            rid: (version, op, at)
+            for rid, version, op, at in self._conn.execute(
+                "SELECT record_id, version, op, enqueued_at FROM index_jobs")
+        }
+        self._version = max((v for v, _, _ in self._pending.values()), default=0)
+        # 被覆盖过的任务记下最早未处理的版本号，wait(version) 不会因覆盖而提前返回
+        self._first = {}
+        self._stopped = False
+        self._retry_at = 0.0
+        self._backoff = self.RETRY_MIN
+
+        self.processed = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_batch_ms = 0.0
+
+        self._thread = None
+        if start:
+            self.start()
+
+    # ---------- 生产者 ----------
+
+    def enqueue(self, record_id, op: str = "upsert") -> int:
+        """[登记] 商机需要 (重新) 索引 / 删除；同一 ID 的旧任务被覆盖。返回任务版本号"""
+        if op not in ("upsert", "delete"):
+            raise ValueError(f"未知的索引操作: {op}")
+        rid = str(record_id)
+        with self._cond:
+            self._version += 1
+            version = self._version
+            now = time.time()
+            # 覆盖旧任务时保留最早的登记时间，滞后指标反映真实等待时长
+            if rid in self._pending:
+                enqueued_at = self._pending[rid][2]
+                self._first.setdefault(rid, self._pending[rid][0])
+            else:
+                enqueued_at = now
+            self._conn.execute(
+                "INSERT OR REPLACE INTO index_jobs (record_id, version, op, enqueued_at) VALUES (?, ?, ?, ?)",
+                (rid, version, op, enqueued_at)
+            )
+            self._conn.commit()
+            self._pending[rid] = (version, op, enqueued_at)
+            self._cond.notify_all()
+        return version
+
+    # ---------- 消费者 ----------
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="linksell-index-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """[停止] 结束后台线程 (未处理的任务留在任务表中，下次启动继续)"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and (not self._pending or time.time() < self._retry_at):
+                    delay = self._retry_at - time.time() if self._pending else None
+                    self._cond.wait(timeout=delay)
+                if self._stopped:
+                    return
+            self.drain_once()
+
+    def _take_batch(self) -> list:
+        with self._cond:
+            jobs = sorted(self._pending.items(), key=lambda item: item[1][0])[:self.batch_size]
+            return [(rid, version, op) for rid, (version, op, _) in jobs]
+
+    def _load(self, record_id):
+        key = self.store.find_key(record_id)
+        return self.store.load(key) if key else None
+
+    def drain_once(self) -> int:
+        """[处理] 取一批任务写入向量库；返回完成的任务数 (失败时为 0，任务保留待重试)"""
+        jobs = self._take_batch()
+        if not jobs:
+            return 0
+        started = time.perf_counter()
+        try:
+            records, deletes = [], []
+            for rid, _, op in jobs:
+                data = self._load(rid) if op == "upsert" else None
+                if data is None:
+                    deletes.append(rid)  # 删除任务，或登记后商机已被删除
+                else:
+                    records.append(dict(data, id=rid))
+            if records:
+                self.vector_service.add_records(records, batch_size=self.batch_size, timeout=self.init_timeout)
+            if deletes:
+                self.vector_service.delete_records(deletes, timeout=self.init_timeout)
+        except Exception as e:
+            with self._cond:
+                self.failures += 1
+                self.last_error = str(e)
+                self._retry_at = time.time() + self._backoff
+                self._backoff = min(self._backoff * 2, self.RETRY_MAX)
+                self._cond.notify_all()
+            print(f"⚠️ [IndexQueue] 向量索引失败 ({e})，{len(jobs)} 条任务稍后重试。")
+            return 0
+
+        with self._cond:
+            done = [(rid, version) for rid, version, _ in jobs if self._pending.get(rid, (None,))[0] == version]
+            self._conn.executemany("DELETE FROM index_jobs WHERE record_id = ? AND version = ?", done)
+            self._conn.commit()
+            for rid, _ in done:
+                del self._pending[rid]
+                self._first.pop(rid, None)
+            self.processed += len(done)
+            self.last_error = None
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+            self._backoff = self.RETRY_MIN
+            self._retry_at = 0.0
+            self._cond.notify_all()
+        return len(done)
+
+    # ---------- 读己之写 ----------
+
+    def wait(self, version: int = None, timeout: float = 10.0) -> bool:
+        """
+        [等待] 阻塞到版本号 <= version 的任务全部处理完 (默认为调用时已登记的全部任务)
+        返回是否在超时前完成；超时不抛异常，调用方照常检索 (可能读到旧数据)。
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            target = self._version if version is None else version
+            while any(self._first.get(rid, v) <= target for rid, (v, _, _) in self._pending.items()):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+            return True
+
+    # ---------- 指标 ----------
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        """[诊断] 队列深度、最老任务滞后秒数、累计完成/失败次数"""
+        with self._cond:
+            oldest = min((at for _, _, at in self._pending.values()), default=None)
+            return {
+                "index_queue_depth": len(self._pending),
+                "index_queue_lag_s": round(time.time() - oldest, 3) if oldest is not None else 0.0,
+                "index_queue_processed": self.processed,
+                "index_queue_failures": self.failures,
+                "index_queue_last_batch_ms": round(self.last_batch_ms, 2),
+                "index_queue_last_error": self.last_error,
+            }
+
+    def close(self):
+        self.stop()
+        with self._cond:
+            self._conn.close()
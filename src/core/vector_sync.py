@@ -0,0 +1,171 @@
+"""
+LinkSell 向量库一致性检查与修复 (Vector Sync)
+
+职责：
+- 按 ID + 内容指纹比对商机存储 (JSON/SQLite) 与向量库 (ChromaDB)
+- 找出 缺失 (存储有、向量库无)、过期 (指纹不一致，或有小记/需求却不在片段索引中)、
+  孤儿 (向量库有、存储无) 三类差异
+- 只重新向量化缺失/过期的商机，批量清理孤儿；或执行全量重建
+
+特点：
+- **Incremental**: 默认只处理差异，每批写入后即持久化，中断后重跑自然从剩余差异继续
+- **Resumable Full Rebuild**: 全量重建时用检查点文件记录剩余 ID，中断后再次执行 --full 会接着做
+- **Batched**: 复用 VectorService.add_records 的批量编码，全量重建可启用多进程编码池占满所有 CPU 核
+"""
+
+import datetime
+import json
+import os
+from pathlib import Path
+
+from src.services.vector_service import content_hash, record_chunks
+
+
+class SyncReport:
+    """[数据结构] 一次比对的结果"""
+
+    __slots__ = ("missing", "stale", "orphans", "total_store", "total_vector", "keys")
+
+    def __init__(self, missing, stale, orphans, total_store, total_vector, keys=None):
+        self.missing = missing
+        self.stale = stale
+        self.orphans = orphans
+        self.total_store = total_store
+        self.total_vector = total_vector
+        self.keys = keys or {}  # {商机 ID: 存储 Key}，修复时据此加载商机
+
+    @property
+    def in_sync(self) -> bool:
+        return not (self.missing or self.stale or self.orphans)
+
+
+class VectorSyncer:
+    """
+    [执行器] 存储 <-> 向量库同步
+    progress 回调签名: progress(阶段名, 已完成, 总数)
+    """
+
+    def __init__(self, store, vector_service, state_path=None, batch_size: int = 64, chunk_size: int = 256):
+        self.store = store
+        self.vector_service = vector_service
+        self.state_path = Path(state_path) if state_path else store.state_path("vector_sync")
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size  # 每次从存储加载并写入向量库的商机数 (即检查点粒度)
+
+    # ---------- 比对 ----------
+
+    def _store_records(self, progress=None) -> dict:
+        """{id: (key, content_hash, 是否有检索片段)}；同一 ID 出现在多个 Key 时以最近修改的为准"""
+        summaries = self.store.summaries()
+        found = {}
+        for i, entry in enumerate(summaries):
+            rid = entry.get("id")
+            if rid is not None and str(rid) not in found:
+                data = self.store.load(entry["file_path"])
+                if data is not None:
+                    found[str(rid)] = (entry["file_path"], content_hash(data), bool(record_chunks(rid, data)))
+            if progress:
+                progress("扫描存储", i + 1, len(summaries))
+        return found
+
+    def diff(self, progress=None) -> SyncReport:
+        """[比对] 计算缺失/过期/孤儿三类差异"""
+        stored = self._store_records(progress)
+        indexed = self.vector_service.indexed_hashes()
+        chunked = self.vector_service.chunked_record_ids()
+        missing = sorted(rid for rid in stored if rid not in indexed)
+        stale = sorted(rid for rid, (_, digest, has_chunks) in stored.items()
+                       if rid in indexed and (indexed[rid] != digest or (has_chunks and rid not in chunked)))
+        orphans = sorted(rid for rid in indexed if rid not in stored)
+        keys = {rid: entry[0] for rid, entry in stored.items()}
+        return SyncReport(missing, stale, orphans, len(stored), len(indexed), keys=keys)
+
+    # ---------- 修复 ----------
+
+    def _embed(self, ids: list, keys: dict, phase: str, progress=None, pool=None, on_chunk=None) -> int:
+        written = 0
+        for start in range(0, len(ids), self.chunk_size):
+            chunk = ids[start:start + self.chunk_size]
+            records = []
+            for rid in chunk:
+                data = self.store.load(keys[rid])
+                if data is not None:
+                    records.append(data)
+            written += self.vector_service.add_records(records, batch_size=self.batch_size, pool=pool)
+            if on_chunk:
+                on_chunk(start + len(chunk))
+            if progress:
+                progress(phase, min(start + len(chunk), len(ids)), len(ids))
+        return written
+
+    def repair(self, report: SyncReport = None, progress=None) -> dict:
+        """[增量修复] 重新向量化缺失/过期商机，清理孤儿"""
+        report = report or self.diff(progress)
+        keys = dict(report.keys)
+        # 报告中没有 Key 的商机 (手工构造或较早的报告) 按 ID 重新查找，已被删除的跳过
+        for rid in report.missing + report.stale:
+            if rid not in keys:
+                key = self.store.find_key(rid)
+                if key:
+                    keys[rid] = key
+        todo = [rid for rid in report.missing + report.stale if rid in keys]
+        embedded = self._embed(todo, keys, "向量化", progress)
+        purged = self.vector_service.delete_records(report.orphans) if report.orphans else 0
+        if progress and report.orphans:
+            progress("清理孤儿", purged, len(report.orphans))
+        return {"embedded": embedded, "purged": purged}
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if isinstance(state.get("pending"), list):
+                return state
+        except Exception:
+            pass
+        return None
+
+    def _save_checkpoint(self, state: dict):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    def has_checkpoint(self) -> bool:
+        return self._load_checkpoint() is not None
+
+    def rebuild(self, workers: int = None, progress=None, resume: bool = True) -> dict:
+        """
+        [全量重建] 清空向量库后重新向量化全部商机
+        - workers > 1 时启用多进程编码池 (默认每个 CPU 核一个进程)
+        - 每写完一批就更新检查点；中断后再次调用 (resume=True) 只处理剩余 ID
+        """
+        stored = {}
+        for entry in self.store.summaries():
+            rid = entry.get("id")
+            if rid is not None and str(rid) not in stored:
+                stored[str(rid)] = entry["file_path"]
+
+        state = self._load_checkpoint() if resume else None
+        resumed = state is not None
+        if state is None:
+            self.vector_service.reset_db()
+            state = {"mode": "full", "started_at": datetime.datetime.now().isoformat(), "pending": sorted(stored)}
+            self._save_checkpoint(state)
+        pending = [rid for rid in state["pending"] if rid in stored]
+
+        workers = workers if workers is not None else (os.cpu_count() or 1)
+        pool = self.vector_service.start_encode_pool(workers) if workers > 1 and len(pending) > self.chunk_size else None
+
+        def on_chunk(done_count):
+            state["pending"] = pending[done_count:]
+            self._save_checkpoint(state)
+
+        try:
+            embedded = self._embed(pending, stored, "全量重建", progress, pool=pool, on_chunk=on_chunk)
+        finally:
+            self.vector_service.stop_encode_pool(pool)
+
+        self.state_path.unlink(missing_ok=True)
+        return {"embedded": embedded, "resumed": resumed}
@@ -21,11 +21,18 @@ from rich import print
 # 将项目根目录添加到 sys.path，确保 src 模块可以被正确导入
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.core.controller import LinkSellController
-
-# 初始化 Typer 应用和核心控制器
+# 初始化 Typer 应用
+# [延迟加载] 控制器 (连带向量引擎后台线程) 只在需要它的命令中创建，init / --help 等命令秒开
 app = typer.Typer()
-controller = LinkSellController()
+_controller = None
+
+def get_controller():
+    """[辅助函数] 首次调用时创建核心控制器，同一进程内复用"""
+    global _controller
+    if _controller is None:
+        from src.core.controller import LinkSellController
+        _controller = LinkSellController()
+    return _controller
 
 def launch_gui():
     """
@@ -95,6 +102,151 @@ def analyze(content: str = typer.Option(None, "--content", "-c", help="要提炼
         from src.cli.interface import run_analyze
         run_analyze(content, audio_file, use_mic, save, debug)
 
+@app.command()
+def import_json(source: str = typer.Option("data/opportunities", "--source", help="旧版 JSON 商机目录"),
+                db_path: str = typer.Option("data/linksell.db", "--db", help="目标 SQLite 数据库路径")):
+    """
+    [命令] 一次性导入旧版 JSON 商机到 SQLite
+    导入完成后，将 config.ini 中 [storage] backend 改为 sqlite 即可切换。
+    """
+    from src.services.storage_service import SQLiteStore, import_json_directory
+
+    store = SQLiteStore(db_path=db_path)
+    try:
+        count = import_json_directory(source, store)
+    finally:
+        store.close()
+    print(f"[bold green]✅ 已导入 {count} 条商机至 {db_path}[/bold green]")
+    print("[dim]提示：请在 config.ini 的 [storage] 中设置 backend = sqlite 以启用。[/dim]")
+
+@app.command()
+def vector_sync(full: bool = typer.Option(False, "--full", help="清空向量库后全量重建 (多进程编码，可断点续跑)"),
+                dry_run: bool = typer.Option(False, "--dry-run", help="只比对并报告差异，不做修改"),
+                workers: int = typer.Option(0, "--workers", "-w", help="全量重建的编码进程数 (0 = CPU 核数)"),
+                batch_size: int = typer.Option(64, "--batch-size", help="模型编码批大小"),
+                restart: bool = typer.Option(False, "--restart", help="忽略上次未完成的全量重建检查点")):
+    """
+    [命令] 检查并修复商机存储与向量库的一致性
+    默认只重新向量化缺失/过期的商机并清理孤儿向量；--full 执行全量重建。
+    """
+    from rich.progress import Progress, BarColumn, MofNCompleteColumn, TimeRemainingColumn
+    from src.core.vector_sync import VectorSyncer
+
+    controller = get_controller()
+    if not controller.vector_service:
+        print("[red]❌ 向量库不可用，无法同步。[/red]")
+        raise typer.Exit(1)
+    controller.vector_service._ensure_initialized(timeout=600)
+    if controller.index_queue is not None:
+        # 先处理写后队列中的积压任务，比对结果才反映最新保存
+        controller.index_queue.wait(timeout=60)
+    syncer = VectorSyncer(controller.store, controller.vector_service, batch_size=batch_size)
+
+    with Progress("[progress.description]{task.description}", BarColumn(), MofNCompleteColumn(),
+                  TimeRemainingColumn()) as bar:
+        tasks = {}
+
+        def progress(phase, done, total):
+            if phase not in tasks:
+                tasks[phase] = bar.add_task(phase, total=total)
+            bar.update(tasks[phase], completed=done, total=total)
+
+        if full:
+            if syncer.has_checkpoint() and not restart:
+                print("[yellow]⏯️ 检测到未完成的全量重建，从检查点继续...[/yellow]")
+            result = syncer.rebuild(workers=workers or None, progress=progress, resume=not restart)
+            print(f"[bold green]✅ 全量重建完成：向量化 {result['embedded']} 条商机。[/bold green]")
+            _print_cache_stats(controller.vector_service)
+            return
+
+        report = syncer.diff(progress)
+        print(f"📊 存储 {report.total_store} 条 | 向量库 {report.total_vector} 条 | "
+              f"缺失 {len(report.missing)} | 过期 {len(report.stale)} | 孤儿 {len(report.orphans)}")
+        if report.in_sync:
+            print("[bold green]✅ 存储与向量库一致，无需修复。[/bold green]")
+            return
+        if dry_run:
+            return
+        result = syncer.repair(report, progress=progress)
+    print(f"[bold green]✅ 修复完成：重新向量化 {result['embedded']} 条，清理孤儿 {result['purged']} 条。[/bold green]")
+    _print_cache_stats(controller.vector_service)
+
+def _print_cache_stats(vector_service):
+    """[辅助] 打印向量编码缓存命中率"""
+    stats = vector_service.cache_stats()
+    if stats and stats["hits"] + stats["misses"]:
+        print(f"[dim]🧠 编码缓存：命中 {stats['hits']} / 未命中 {stats['misses']} "
+              f"(命中率 {stats['hit_rate']:.0%})，缓存向量 {stats['entries']} 条[/dim]")
+
+@app.command()
+def export_onnx(output: str = typer.Option(None, "--output", "-o", help="导出目录 (默认取 config.ini 的 [vector] onnx_path)"),
+                model: str = typer.Option("paraphrase-multilingual-MiniLM-L12-v2", "--model", help="模型名或本地路径"),
+                no_quantize: bool = typer.Option(False, "--no-quantize", help="只导出 FP32，不做 int8 量化")):
+    """
+    [命令] 把 Embedding 模型导出为 ONNX 并做动态 int8 量化
+    导出后在 config.ini 中设置 [vector] backend = onnx 即可切换为 ONNX Runtime 推理。
+    """
+    from src.services.embedding_backends import export_onnx as run_export
+
+    import configparser
+    config = configparser.ConfigParser()
+    config.read("config/config.ini")
+    output = output or config.get("vector", "onnx_path", fallback="data/models/minilm-onnx")
+    print(f"[cyan]📦 正在导出 {model} -> {output} ...[/cyan]")
+    sizes = run_export(model, output, quantize=not no_quantize)
+    for name, size in sorted(sizes.items()):
+        print(f"  {name:<24} {size / 1e6:8.1f} MB")
+    print("[bold green]✅ 导出完成。[/bold green]")
+    print("[dim]提示：在 config.ini 的 [vector] 中设置 backend = onnx，然后执行 vector-sync --full 重建向量库。[/dim]")
+
+@app.command()
+def vector_status(probe: str = typer.Option("测试项目", "--probe", help="就绪后用于测量首次查询耗时的项目名")):
+    """
+    [命令] 向量引擎启动耗时报告
+    等待引擎加载完成并执行一次项目名检索，输出 模型加载 / 向量库打开 / 索引准备 / 首次查询 各阶段耗时。
+    """
+    controller = get_controller()
+    if not controller.vector_service:
+        print("[red]❌ 向量库不可用。[/red]")
+        raise typer.Exit(1)
+    try:
+        controller.vector_service._ensure_initialized(timeout=600)
+        controller.vector_service.search_projects(probe)
+    except Exception as e:
+        print(f"[red]❌ 向量引擎加载失败: {e}[/red]")
+    report = controller.startup_report()
+    labels = {"model_load_s": "模型加载 (s)", "store_open_s": "向量库打开 (s)", "indexes_s": "索引准备 (s)",
+              "ready_s": "启动至就绪 (s)", "first_query_ms": "首次查询 (ms)"}
+    for key, label in labels.items():
+        print(f"  {label:<16} {report.get(key) if report.get(key) is not None else '-'}")
+    print(f"  状态: {report.get('status')} | 存储: {report.get('store')}"
+          + (f" | 守护进程: {report['daemon']}" if report.get("daemon") else ""))
+
+@app.command()
+def vector_daemon(socket_path: str = typer.Option(None, "--socket", help="Unix Socket 路径 (默认取 config.ini 的 [vector] daemon_socket)"),
+                  max_batch: int = typer.Option(32, "--max-batch", help="单条查询编码合并的最大批大小"),
+                  max_wait_ms: float = typer.Option(5.0, "--max-wait-ms", help="合并批次的最长等待 (毫秒)")):
+    """
+    [命令] 启动向量守护进程 (常驻前台，Ctrl+C 退出)
+    守护进程持有 Embedding 模型与向量库；CLI / GUI / 定时任务启动时发现它在运行，即改为轻量客户端。
+    """
+    import configparser
+    from src.services.vector_service import VectorService, vector_options
+    from src.services.vector_daemon import VectorDaemon
+
+    config = configparser.ConfigParser()
+    config.read("config/config.ini")
+    socket_path = socket_path or config.get("vector", "daemon_socket", fallback="data/vector_daemon.sock")
+    daemon = VectorDaemon(VectorService(**vector_options(config)), socket_path,
+                          max_batch=max_batch, max_wait_ms=max_wait_ms)
+    try:
+        daemon.start()
+    except RuntimeError as e:
+        print(f"[red]❌ {e}[/red]")
+        raise typer.Exit(1)
+    print(f"[bold green]✅ 向量守护进程已启动: {socket_path} (PID {os.getpid()})[/bold green]")
+    daemon.serve_forever()
+
 @app.command()
 def manage():
     """
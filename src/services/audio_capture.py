@@ -11,9 +11,6 @@ LinkSell 音频采集服务 (Audio Capture)
 - **ASR Ready**: 默认使用 16kHz 采样率，适配大多数语音识别 API
 """
 
-import sounddevice as sd
-import numpy as np
-import scipy.io.wavfile as wavfile
 import threading
 import sys
 from rich.console import Console
@@ -33,6 +30,11 @@ def record_audio_until_enter(filename: str, samplerate=16000, channels=1):
     Returns:
         bool: 录音是否成功。
     """
+    # [延迟导入] sounddevice 需要 PortAudio，scipy 导入较慢，只在真正录音时加载
+    import numpy as np
+    import scipy.io.wavfile as wavfile
+    import sounddevice as sd
+
     try:
         # 用于存储录制的原始数据块
         recorded_data = []
@@ -0,0 +1,140 @@
+"""
+LinkSell Embedding 推理后端 (Embedding Backends)
+
+职责：
+- 提供与 SentenceTransformer.encode 兼容的 ONNX Runtime 编码器 (CPU 推理，不依赖 torch)
+- 把 sentence-transformers 模型导出为 ONNX，并做动态 int8 量化
+
+特点：
+- **Torch-free Runtime**: 运行时只需 onnxruntime + tokenizers，服务器无需 GPU 也无需加载 torch
+- **Same Pooling**: 与 paraphrase-multilingual-MiniLM-L12-v2 一致的 mean pooling，
+  向量与 PyTorch 后端可直接比较 (一致性见 benchmarks/bench_embedding_backend.py)
+- **Length Bucketing**: 批量编码前按长度排序，减少 padding 的无效计算
+
+依赖：
+- 运行: pip install onnxruntime tokenizers
+- 导出: 另需 torch、transformers、onnx (只在导出的机器上需要)
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+# 导出目录中的文件名
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_qint8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+CONFIG_FILE = "embedding_config.json"
+
+
+class OnnxEncoder:
+    """
+    [推理后端] ONNX Runtime 版句向量编码器
+    encode() 的参数与返回值与 SentenceTransformer.encode 一致 (单条返回一维向量，多条返回二维数组)。
+    """
+
+    def __init__(self, model_dir, file_name: str = INT8_FILE, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = Path(model_dir)
+        config_path = self.model_dir / CONFIG_FILE
+        config = json.loads(config_path.read_text(encoding="utf-8")) if config_path.exists() else {}
+        self.max_length = int(config.get("max_length", 128))
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.no_padding()
+        self.pad_id = int(config.get("pad_id", 0))
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(self.model_dir / file_name), sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _forward(self, encodings: list) -> np.ndarray:
+        """[内部] 一批已分词文本 -> mean pooling 句向量"""
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.full((len(encodings), width), self.pad_id, dtype=np.int64)
+        mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, enc in enumerate(encodings):
+            input_ids[row, :len(enc.ids)] = enc.ids
+            mask[row, :len(enc.ids)] = 1
+        feeds = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[..., None].astype(np.float32)
+        return (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts, batch_size: int = 32, show_progress_bar: bool = False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(texts)
+        # 按长度排序后分批，结果再按原顺序放回
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        out = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vec in zip(idx, self._forward([encodings[i] for i in idx])):
+                out[i] = vec
+        result = np.stack(out).astype(np.float32)
+        return result[0] if single else result
+
+
+def export_onnx(model_name: str, output_dir, quantize: bool = True, opset: int = 17) -> dict:
+    """
+    [导出] sentence-transformers 模型 -> ONNX (+ 动态 int8 量化)
+    输出目录包含 model.onnx、model_qint8.onnx、tokenizer.json 与 embedding_config.json。
+    返回: {文件名: 字节数}
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    # 与 SentenceTransformer 一致：不带组织名的模型名默认属于 sentence-transformers
+    if "/" not in model_name and not Path(model_name).exists():
+        model_name = f"sentence-transformers/{model_name}"
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    class _LastHidden(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, input_ids, attention_mask):
+            return self.inner(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+    sample = tokenizer(["示例文本", "LinkSell 商机"], padding=True, return_tensors="pt")
+    dynamic = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        _LastHidden(model), (sample["input_ids"], sample["attention_mask"]), str(out / FP32_FILE),
+        input_names=["input_ids", "attention_mask"], output_names=["last_hidden_state"],
+        dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "last_hidden_state": dynamic},
+        opset_version=opset, dynamo=False
+    )
+    tokenizer.backend_tokenizer.save(str(out / TOKENIZER_FILE))
+
+    # sentence-transformers 模型的最大序列长度 (MiniLM 为 128)，读不到时退回 128
+    max_length = 128
+    st_config = Path(model_name) / "sentence_bert_config.json"
+    if st_config.exists():
+        max_length = json.loads(st_config.read_text(encoding="utf-8")).get("max_seq_length", max_length)
+    (out / CONFIG_FILE).write_text(json.dumps({
+        "source": model_name, "max_length": max_length, "pooling": "mean",
+        "pad_id": tokenizer.pad_token_id or 0
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(out / FP32_FILE), str(out / INT8_FILE), weight_type=QuantType.QInt8)
+
+    return {f.name: f.stat().st_size for f in out.iterdir() if f.is_file()}
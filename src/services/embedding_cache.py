@@ -0,0 +1,225 @@
+"""
+LinkSell 向量编码缓存 (Embedding Cache)
+
+职责：
+- 以 "模型名 + _format_record 文本" 的哈希为 Key，持久化保存已编码的向量
+- 记录每个商机 ID 当前使用的缓存 Key，商机删除或文本变化后清理不再被引用的向量
+- 统计命中率，供 vector-sync 等命令展示
+- 进程内的查询向量 LRU 缓存：同一问题/项目名重复检索时跳过模型前向
+
+特点：
+- **Skip Re-encoding**: 只追加小记、或修改了不参与向量文本的字段时，保存商机不再重新跑 Embedding 模型
+- **Model-aware**: Key 含模型名，切换模型后旧向量自然失效，不会混用不同维度/语义空间的向量
+- **SQLite + WAL**: 单文件存储，跨线程共享连接，由锁串行化
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock, RLock
+
+
+def text_key(model_name: str, text: str) -> str:
+    """[工具] 缓存 Key = SHA1(模型名 + 分隔符 + 向量文本)"""
+    return hashlib.sha1(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """[缓存] 持久化向量缓存 (float32 存为 BLOB)"""
+
+    def __init__(self, db_path="data/embedding_cache.db"):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key        TEXT PRIMARY KEY,
+                dim        INTEGER NOT NULL,
+                vector     BLOB NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS record_keys (
+                record_id  TEXT PRIMARY KEY,
+                key        TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_record_keys_key ON record_keys(key);
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: list) -> dict:
+        """[查询] 批量读取 {key: 向量}，未命中的 Key 不出现在结果中；同时累计命中统计"""
+        import numpy as np
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                marks = ",".join("?" * len(part))
+                for key, dim, blob in self._conn.execute(
+                        f"SELECT key, dim, vector FROM embeddings WHERE key IN ({marks})", part):
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+        hit = sum(1 for k in keys if k in found)
+        self.hits += hit
+        self.misses += len(keys) - hit
+        return found
+
+    def put_many(self, items: dict):
+        """[写入] 批量保存 {key: 向量}"""
+        if not items:
+            return
+        import numpy as np
+        now = time.time()
+        rows = []
+        for key, vec in items.items():
+            arr = np.asarray(vec, dtype=np.float32).ravel()
+            rows.append((key, int(arr.shape[0]), arr.tobytes(), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, dim, vector, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def bind(self, pairs: list) -> int:
+        """
+        [引用] 记录 (商机 ID, 缓存 Key) 的对应关系
+        商机文本变化后旧 Key 不再被任何商机引用，随即清理。返回清理的向量数。
+        """
+        if not pairs:
+            return 0
+        with self._lock:
+            ids = [str(rid) for rid, _ in pairs]
+            previous = self._keys_for(ids)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO record_keys (record_id, key) VALUES (?, ?)",
+                [(str(rid), key) for rid, key in pairs]
+            )
+            pruned = self._prune_unreferenced(previous)
+            self._conn.commit()
+        return pruned
+
+    def forget(self, record_ids: list) -> int:
+        """[清理] 商机删除时解除引用并删除不再被引用的向量，返回清理的向量数"""
+        ids = [str(rid) for rid in record_ids]
+        if not ids:
+            return 0
+        with self._lock:
+            previous = self._keys_for(ids)
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                self._conn.execute(
+                    f"DELETE FROM record_keys WHERE record_id IN ({','.join('?' * len(part))})", part
+                )
+            pruned = self._prune_unreferenced(previous)
+            self._conn.commit()
+        return pruned
+
+    def clear(self):
+        """[清理] 清空全部缓存 (切换模型或重置向量库时使用)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.execute("DELETE FROM record_keys")
+            self._conn.commit()
+
+    def _keys_for(self, ids: list) -> set:
+        keys = set()
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key FROM record_keys WHERE record_id IN ({','.join('?' * len(part))})", part
+            )
+            keys.update(row[0] for row in rows)
+        return keys
+
+    def _prune_unreferenced(self, keys: set) -> int:
+        pruned = 0
+        for key in keys:
+            if self._conn.execute("SELECT 1 FROM record_keys WHERE key = ? LIMIT 1", (key,)).fetchone():
+                continue
+            pruned += self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,)).rowcount
+        return pruned
+
+    def stats(self) -> dict:
+        """[统计] 本进程内的命中情况 + 缓存中的向量条数"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def normalize_query(text) -> str:
+    """[工具] 查询文本归一化：全半角统一、去首尾空白、连续空白合并为一个空格"""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", str(text or ""))).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    [缓存] 查询向量 LRU (按条数限制)
+    Key 为实际送入模型的文本，search / search_projects / search_chunks 共用。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # {text: 向量 (list)}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_encode(self, text: str, encode):
+        """[读取] 命中直接返回；未命中调用 encode(text) 并存入 (encode 在锁外执行，不阻塞其他查询)"""
+        with self._lock:
+            vec = self._entries.get(text)
+            if vec is not None:
+                self._entries.move_to_end(text)
+                self.hits += 1
+                return vec
+            self.misses += 1
+        vec = encode(text)
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[text] = vec
+                self._entries.move_to_end(text)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return vec
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """[诊断] 缓存统计"""
+        total = self.hits + self.misses
+        return {
+            "query_cache_size": len(self._entries),
+            "query_cache_hits": self.hits,
+            "query_cache_misses": self.misses,
+            "query_cache_evictions": self.evictions,
+            "query_cache_max_entries": self.max_entries,
+            "query_hit_rate_pct": round(self.hits / total * 100, 2) if total > 0 else 0
+        }
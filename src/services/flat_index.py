@@ -0,0 +1,390 @@
+"""
+LinkSell 内置平铺向量索引 (Flat Vector Index)
+
+职责：
+- ChromaDB 不可用 (未安装、版本不兼容、库文件损坏) 时的向量存储后备方案
+- 向量存放在内存映射 (np.memmap) 的 float32/float16 矩阵中，配合 ID 数组与元数据做精确检索
+- 提供与 Chroma Collection / Client 相同的最小接口，VectorService 无需区分两种后端
+
+特点：
+- **Exact Search**: 一次矩阵-向量乘法算出全部距离，argpartition 取 Top-K，数万条记录仍在毫秒级
+- **Append-only**: 新向量追加到矩阵末尾，删除/覆盖只打墓碑标记；墓碑过多时打开集合自动压缩
+- **Crash-safe Log**: ID/元数据/墓碑以 JSON Lines 追加日志保存，先落盘向量再写日志，
+  中途崩溃最多丢失未写入日志的一批，不会出现日志指向不存在的向量
+- **Pure NumPy**: 不依赖 chromadb / hnswlib
+
+磁盘布局 (每个集合一个目录)：
+    <root>/<集合名>/index.json   维度、数据类型、距离类型、集合元数据
+    <root>/<集合名>/vectors.bin  向量矩阵 (行 = 写入顺序，容量按倍数扩展)
+    <root>/<集合名>/log.jsonl    操作日志 {"add": [[id, 行号, 元数据], ...]} / {"del": [id, ...]} /
+                                 {"upd": [[id, 元数据], ...]}
+"""
+
+import json
+import os
+import shutil
+from pathlib import Path
+from threading import RLock
+
+import numpy as np
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+SPACES = ("l2", "cosine", "ip")
+
+
+def _matches(meta: dict, where: dict) -> bool:
+    """[工具] 按 Chroma where 语法判断一条元数据是否命中 (支持 $eq/$ne/$in/$nin/$and/$or)"""
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, target in cond.items():
+                if op == "$eq" and value != target:
+                    return False
+                if op == "$ne" and value == target:
+                    return False
+                if op == "$in" and value not in target:
+                    return False
+                if op == "$nin" and value in target:
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+class FlatCollection:
+    """
+    [集合] 一个平铺向量索引 (接口对齐 chromadb Collection 中 VectorService 用到的部分)
+    不保存 documents：检索文本由调用方按 ID 还原。
+    """
+
+    GROW_ROWS = 1024          # 最小扩容行数
+    SEARCH_BLOCK = 8192       # 分块计算距离：float16 转换的临时内存有上限，且块留在 CPU 缓存中
+    COMPACT_MIN_DEAD = 1024   # 墓碑数超过该值且多于存活数时，打开集合时压缩
+
+    def __init__(self, path, name: str, space: str = "l2", dtype: str = "float32", metadata: dict = None):
+        if space not in SPACES:
+            raise ValueError(f"未知的距离类型: {space}")
+        if dtype not in DTYPES:
+            raise ValueError(f"未知的向量数据类型: {dtype}")
+        self.name = name
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = RLock()
+
+        header = self._read_header()
+        if header:
+            space, dtype = header["space"], header["dtype"]
+            self.metadata = header.get("metadata") or None
+            self.dim = header.get("dim")
+        else:
+            self.metadata = metadata or None
+            self.dim = None
+        self.space = space
+        self.dtype = DTYPES[dtype]
+        if not header:
+            self._write_header()
+
+        self._ids = []        # 行号 -> ID
+        self._metas = []      # 行号 -> 元数据
+        self._row_of = {}     # 存活 ID -> 行号
+        self._matrix = None   # np.memmap (容量行 x dim)
+        self._sq_norms = np.zeros(0, dtype=np.float32)  # l2 距离用的行范数平方
+        self._replay_log()
+        self._open_matrix()
+        if self.dim:
+            self._sq_norms = self._row_norms(0, len(self._ids))
+        dead = len(self._ids) - len(self._row_of)
+        if dead >= self.COMPACT_MIN_DEAD and dead > len(self._row_of):
+            self.compact()
+
+    # ---------- 持久化 ----------
+
+    def _read_header(self):
+        file = self.path / "index.json"
+        return json.loads(file.read_text(encoding="utf-8")) if file.exists() else None
+
+    def _write_header(self):
+        file = self.path / "index.json"
+        tmp = file.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "dim": self.dim, "dtype": np.dtype(self.dtype).name, "space": self.space, "metadata": self.metadata
+        }, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, file)
+
+    def _append_log(self, entry: dict):
+        with open(self.path / "log.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_log(self):
+        file = self.path / "log.jsonl"
+        if not file.exists():
+            return
+        with open(file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # 崩溃时写了一半的最后一行
+                for rid, row, meta in entry.get("add", ()):
+                    while len(self._ids) <= row:
+                        self._ids.append(None)
+                        self._metas.append(None)
+                    self._ids[row], self._metas[row] = rid, meta
+                    self._row_of[rid] = row
+                for rid in entry.get("del", ()):
+                    self._row_of.pop(rid, None)
+                for rid, meta in entry.get("upd", ()):
+                    row = self._row_of.get(rid)
+                    if row is not None:
+                        self._metas[row] = meta
+
+    def _capacity(self) -> int:
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    def _open_matrix(self, rows: int = 0):
+        """[内部] 以 r+ 模式映射向量文件，rows 大于现有容量时先扩展文件"""
+        if not self.dim:
+            return
+        file = self.path / "vectors.bin"
+        row_bytes = self.dim * np.dtype(self.dtype).itemsize
+        current = file.stat().st_size // row_bytes if file.exists() else 0
+        if rows > current:
+            with open(file, "ab") as f:
+                f.truncate(rows * row_bytes)
+            current = rows
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        if current:
+            self._matrix = np.memmap(file, dtype=self.dtype, mode="r+", shape=(current, self.dim))
+
+    def _row_norms(self, start: int, stop: int) -> np.ndarray:
+        out = np.zeros(stop - start, dtype=np.float32)
+        for s in range(start, stop, self.SEARCH_BLOCK):
+            block = np.asarray(self._matrix[s:min(stop, s + self.SEARCH_BLOCK)], dtype=np.float32)
+            out[s - start:s - start + len(block)] = np.einsum("ij,ij->i", block, block)
+        return out
+
+    def compact(self):
+        """[维护] 丢弃墓碑行，重写向量文件与日志 (行号重新从 0 连续编号)"""
+        with self._lock:
+            live = sorted(self._row_of.values())
+            tmp_vectors = self.path / "vectors.bin.tmp"
+            tmp_log = self.path / "log.jsonl.tmp"
+            if live and self.dim:
+                out = np.memmap(tmp_vectors, dtype=self.dtype, mode="w+", shape=(len(live), self.dim))
+                out[:] = self._matrix[live]
+                out.flush()
+                del out
+            else:
+                tmp_vectors.write_bytes(b"")
+            adds = [[self._ids[row], new, self._metas[row]] for new, row in enumerate(live)]
+            with open(tmp_log, "w", encoding="utf-8") as f:
+                if adds:
+                    f.write(json.dumps({"add": adds}, ensure_ascii=False) + "\n")
+            self._matrix = None
+            os.replace(tmp_vectors, self.path / "vectors.bin")
+            os.replace(tmp_log, self.path / "log.jsonl")
+            self._ids = [a[0] for a in adds]
+            self._metas = [a[2] for a in adds]
+            self._row_of = {rid: row for row, rid in enumerate(self._ids)}
+            self._open_matrix()
+            self._sq_norms = self._row_norms(0, len(self._ids)) if self.dim else np.zeros(0, dtype=np.float32)
+
+    # ---------- Chroma 兼容接口 ----------
+
+    def count(self) -> int:
+        return len(self._row_of)
+
+    def modify(self, metadata: dict = None, **kwargs):
+        with self._lock:
+            if metadata is not None:
+                self.metadata = dict(metadata)
+                self._write_header()
+
+    def upsert(self, ids: list, embeddings, metadatas: list = None, documents: list = None):
+        """[写入] 追加新行；已存在的 ID 旧行打墓碑"""
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError("embeddings 与 ids 数量不一致")
+        if self.space == "cosine":
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._write_header()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"向量维度 {vectors.shape[1]} 与索引维度 {self.dim} 不一致")
+
+            start = len(self._ids)
+            stop = start + len(ids)
+            if stop > self._capacity():
+                self._open_matrix(max(stop, self._capacity() * 2, self.GROW_ROWS))
+            self._matrix[start:stop] = vectors.astype(self.dtype)
+            self._matrix.flush()
+
+            adds = []
+            for offset, (rid, meta) in enumerate(zip(ids, metadatas)):
+                rid = str(rid)
+                meta = {k: v for k, v in (meta or {}).items() if v is not None}
+                self._ids.append(rid)
+                self._metas.append(meta)
+                self._row_of[rid] = start + offset
+                adds.append([rid, start + offset, meta])
+            self._sq_norms = np.concatenate([self._sq_norms[:start], self._row_norms(start, stop)])
+            self._append_log({"add": adds})
+
+    def add(self, ids: list, embeddings, metadatas: list = None, documents: list = None):
+        self.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+
+    def update(self, ids: list, metadatas: list = None, **kwargs):
+        """[写入] 合并更新元数据 (值为 None 表示删除该字段，与 Chroma 一致)；向量不变"""
+        if not ids or metadatas is None:
+            return
+        with self._lock:
+            updates = []
+            for rid, patch in zip(ids, metadatas):
+                row = self._row_of.get(str(rid))
+                if row is None:
+                    continue
+                meta = dict(self._metas[row] or {})
+                for key, value in (patch or {}).items():
+                    if value is None:
+                        meta.pop(key, None)
+                    else:
+                        meta[key] = value
+                self._metas[row] = meta
+                updates.append([str(rid), meta])
+            if updates:
+                self._append_log({"upd": updates})
+
+    def delete(self, ids: list = None, where: dict = None):
+        with self._lock:
+            targets = [str(i) for i in ids] if ids is not None else list(self._row_of)
+            if where:
+                targets = [i for i in targets if i in self._row_of and _matches(self._metas[self._row_of[i]], where)]
+            removed = [i for i in targets if self._row_of.pop(i, None) is not None]
+            if removed:
+                self._append_log({"del": removed})
+
+    def _live_rows(self, ids: list = None, where: dict = None) -> list:
+        if ids is not None:
+            rows = [self._row_of[str(i)] for i in ids if str(i) in self._row_of]
+        else:
+            rows = sorted(self._row_of.values())
+        if where:
+            rows = [r for r in rows if _matches(self._metas[r], where)]
+        return rows
+
+    def _pack(self, rows: list, include: list) -> dict:
+        result = {"ids": [self._ids[r] for r in rows]}
+        if "metadatas" in include:
+            result["metadatas"] = [dict(self._metas[r]) for r in rows]
+        if "documents" in include:
+            result["documents"] = [None] * len(rows)
+        if "embeddings" in include:
+            result["embeddings"] = np.asarray(self._matrix[rows], dtype=np.float32) if rows else []
+        return result
+
+    def get(self, ids: list = None, where: dict = None, limit: int = None, offset: int = None,
+            include: list = ("metadatas", "documents")):
+        with self._lock:
+            rows = self._live_rows(ids, where)
+            start = offset or 0
+            rows = rows[start:start + limit] if limit is not None else rows[start:]
+            return self._pack(rows, include)
+
+    def query(self, query_embeddings, n_results: int = 10, where: dict = None,
+              include: list = ("metadatas", "documents", "distances")):
+        """[检索] 精确 Top-K：分块矩阵-向量乘法 + argpartition"""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        out = {"ids": []}
+        for key in ("metadatas", "documents", "distances", "embeddings"):
+            if key in include:
+                out[key] = []
+        with self._lock:
+            total = len(self._ids)
+            allowed = None
+            if where:
+                allowed = np.zeros(total, dtype=bool)
+                allowed[self._live_rows(where=where)] = True
+            elif len(self._row_of) < total:
+                allowed = np.zeros(total, dtype=bool)
+                allowed[list(self._row_of.values())] = True
+
+            for q in queries:
+                if not self.dim or not self._row_of:
+                    rows, dist = [], []
+                else:
+                    if self.space == "cosine":
+                        q = q / max(float(np.linalg.norm(q)), 1e-12)
+                    dots = np.empty(total, dtype=np.float32)
+                    for s in range(0, total, self.SEARCH_BLOCK):
+                        block = self._matrix[s:min(total, s + self.SEARCH_BLOCK)]
+                        dots[s:s + len(block)] = np.asarray(block, dtype=np.float32) @ q
+                    if self.space == "l2":
+                        distances = self._sq_norms[:total] - 2 * dots + float(q @ q)
+                    else:
+                        distances = 1.0 - dots
+                    if allowed is not None:
+                        distances[~allowed] = np.inf
+                    k = min(n_results, int(allowed.sum()) if allowed is not None else total)
+                    if k <= 0:
+                        rows, dist = [], []
+                    else:
+                        top = np.argpartition(distances, k - 1)[:k] if k < total else np.arange(total)
+                        top = top[np.argsort(distances[top], kind="stable")]
+                        rows, dist = top.tolist(), distances[top].tolist()
+                packed = self._pack(rows, include)
+                out["ids"].append(packed["ids"])
+                for key in ("metadatas", "documents", "embeddings"):
+                    if key in out:
+                        out[key].append(packed[key])
+                if "distances" in out:
+                    out["distances"].append(dist)
+        return out
+
+
+class FlatClient:
+    """
+    [客户端] 管理根目录下的多个 FlatCollection (接口对齐 chromadb PersistentClient 的常用方法)
+    """
+
+    def __init__(self, path, dtype: str = "float32"):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = dtype
+        self._collections = {}
+        self._lock = RLock()
+
+    def get_or_create_collection(self, name: str, metadata: dict = None, configuration: dict = None):
+        with self._lock:
+            if name not in self._collections:
+                space = ((configuration or {}).get("hnsw") or {}).get("space") \
+                    or (metadata or {}).get("hnsw:space") or "l2"
+                self._collections[name] = FlatCollection(self.path / name, name, space=space, dtype=self.dtype,
+                                                         metadata=metadata)
+            return self._collections[name]
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            if collection is not None:
+                collection._matrix = None
+            shutil.rmtree(self.path / name, ignore_errors=True)
+
+    def get_max_batch_size(self) -> int:
+        return 100000
@@ -0,0 +1,162 @@
+"""
+LinkSell LLM 响应缓存 (LLM Response Cache)
+
+职责：
+- 以 "调用名 + Prompt 模板内容 + 模型接入点 + 输入" 的哈希为 Key，持久化保存低温度 NLU 调用的回复文本
+- TTL 过期 + 条数上限 (按最近使用时间淘汰)
+- 同一 Prompt 模板内容变化时自动清除该模板的旧回复
+- 统计命中率与节省的 LLM 往返耗时
+
+特点：
+- **Deterministic Only**: 只用于意图识别、搜索词提取、润色、输入规范化等温度 0.1~0.2、输入短且重复的调用
+- **Prompt-aware**: Key 含模板内容，修改 config/prompts 下的模板后旧回复不再命中，并在首次遇到新模板时删除
+- **SQLite + WAL**: 单文件存储，跨线程共享连接，由锁串行化
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from threading import RLock
+
+
+def prompt_hash(system_prompt: str) -> str:
+    """[工具] Prompt 模板内容的短哈希"""
+    return hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def response_key(name: str, system_prompt: str, endpoint_id: str, user_content: str) -> str:
+    """[工具] 缓存 Key = SHA1(调用名 + 模板内容 + 接入点 + 输入)"""
+    raw = "\x00".join([name, system_prompt, endpoint_id or "", user_content])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """[缓存] 持久化 LLM 回复缓存"""
+
+    def __init__(self, db_path="data/llm_cache.db", ttl_s: float = 7 * 86400, max_entries: int = 5000):
+        """
+        参数:
+        - db_path: SQLite 文件路径
+        - ttl_s: 回复有效期 (秒)，<= 0 表示不过期
+        - max_entries: 最多保存的回复条数，超出后淘汰最久未使用的
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.invalidated = 0
+
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key         TEXT PRIMARY KEY,
+                name        TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                response    TEXT NOT NULL,
+                latency_ms  REAL NOT NULL,
+                created_at  REAL NOT NULL,
+                last_used   REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_llm_responses_used ON llm_responses(last_used);
+            CREATE INDEX IF NOT EXISTS idx_llm_responses_name ON llm_responses(name, prompt_hash);
+            """
+        )
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        # 本进程已确认过的 {调用名: 模板哈希}，模板未变时不重复执行清理
+        self._prompts = {}
+
+    def check_prompt(self, name: str, system_prompt: str) -> str:
+        """[失效] 登记调用名当前使用的模板；模板内容变化时删除该调用的旧回复。返回模板哈希"""
+        current = prompt_hash(system_prompt)
+        if self._prompts.get(name) == current:
+            return current
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM llm_responses WHERE name = ? AND prompt_hash != ?", (name, current)
+            ).rowcount
+            self._conn.commit()
+            self._entries -= removed
+            self.invalidated += removed
+            self._prompts[name] = current
+        return current
+
+    def get(self, key: str):
+        """[查询] 返回未过期的回复文本，未命中返回 None；同时累计命中统计与节省的耗时"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency_ms, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl_s > 0 and now - row[2] > self.ttl_s:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._entries -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_ms += row[1]
+        return row[0]
+
+    def put(self, key: str, name: str, system_prompt: str, response: str, latency_ms: float):
+        """[写入] 保存一条回复 (latency_ms 为本次实际调用耗时，命中时计入节省耗时)"""
+        now = time.time()
+        with self._lock:
+            existed = self._conn.execute("SELECT 1 FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(key, name, prompt_hash, response, latency_ms, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, name, prompt_hash(system_prompt), response, float(latency_ms), now, now)
+            )
+            if not existed:
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """[淘汰] 先删过期回复，仍超出上限时按最近使用时间删除最旧的"""
+        if self.ttl_s > 0:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_s,))
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE key IN "
+            "(SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def clear(self):
+        """[清理] 清空全部回复"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            self._entries = 0
+            self._prompts.clear()
+
+    def stats(self) -> dict:
+        """[统计] 本进程内的命中情况、节省的 LLM 耗时 + 缓存中的回复条数"""
+        total = self.hits + self.misses
+        return {
+            "llm_cache_entries": self._entries,
+            "llm_cache_hits": self.hits,
+            "llm_cache_misses": self.misses,
+            "llm_cache_hit_rate": self.hits / total if total else 0.0,
+            "llm_cache_saved_ms": round(self.saved_ms, 1),
+            "llm_cache_invalidated": self.invalidated,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
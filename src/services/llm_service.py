@@ -10,13 +10,18 @@ LinkSell LLM 服务 (LLM Service)
 - **Prompt Management**: 统一从 config/prompts 目录加载模板，支持 fallback 机制
 - **Structured Output**: 强依赖 JSON 输出格式，便于系统后续处理
 - **Architect Mode**: 集成"销售架构师"模型，处理复杂的多轮笔记合并逻辑
+- **Response Cache**: 意图识别/搜索词提取/润色/输入规范化等低温度调用可启用磁盘缓存 (见 llm_cache.py)
 """
 
 import json
 import os
+import time
 from pathlib import Path
 from threading import Lock
-from volcenginesdkarkruntime import Ark
+
+from src.services.llm_cache import response_key
+
+# [延迟导入] volcenginesdkarkruntime 连带导入 httpx/pydantic 等 (约 0.6s)，首次创建客户端时才导入
 
 # ===== [PHASE 1 优化] LLM 客户端单例工厂 =====
 class ArkClientFactory:
@@ -37,12 +42,13 @@ class ArkClientFactory:
     _lock = Lock()
 
     @classmethod
-    def get_client(cls, api_key: str) -> Ark:
+    def get_client(cls, api_key: str) -> "Ark":
         """获取或创建指定 API key 的单例 Ark 客户端"""
         if api_key not in cls._instances:
             with cls._lock:
                 # 双重检查锁定模式
                 if api_key not in cls._instances:
+                    from volcenginesdkarkruntime import Ark
                     cls._instances[api_key] = Ark(api_key=api_key)
         return cls._instances[api_key]
 
@@ -84,27 +90,103 @@ def load_prompt(prompt_name: str, fallback: str = None) -> str:
     raise FileNotFoundError(f"【架构禁忌】: 严禁在代码中硬编码 Prompt！请创建文件: {prompt_path}" + 
                            (f" 或 fallback {fallback_path}" if fallback else ""))
 
+# ===== 响应缓存 =====
+# 由 Controller 按 config.ini [llm_cache] 配置；未配置时所有调用直连 LLM
+CACHEABLE_FUNCTIONS = ("classify_intent", "extract_search_term", "polish_text", "normalize_input", "understand_input")
+_response_cache = None
+_cached_functions = frozenset()
+
+def configure_response_cache(cache, functions=CACHEABLE_FUNCTIONS):
+    """
+    [配置] 设置响应缓存 (LLMResponseCache) 与启用缓存的调用名
+    cache 为 None 时关闭缓存；functions 只接受 CACHEABLE_FUNCTIONS 中的调用。
+    """
+    global _response_cache, _cached_functions
+    unknown = set(functions) - set(CACHEABLE_FUNCTIONS)
+    if unknown:
+        raise ValueError(f"不支持缓存的 LLM 调用: {', '.join(sorted(unknown))}")
+    _response_cache = cache
+    _cached_functions = frozenset(functions) if cache is not None else frozenset()
+
+def response_cache_stats() -> dict:
+    """[诊断] 响应缓存统计，未启用时返回空字典"""
+    return _response_cache.stats() if _response_cache is not None else {}
+
+def _chat(name: str, system_prompt: str, user_content: str, api_key: str, endpoint_id: str,
+          temperature: float) -> str:
+    """
+    [工具] 单轮对话，返回去除首尾空白的回复文本 (调用失败时抛出异常，由调用方兜底)
+    name 启用了响应缓存时先查缓存；只缓存成功的回复。
+    """
+    cache = _response_cache if name in _cached_functions else None
+    if cache is not None:
+        cache.check_prompt(name, system_prompt)
+        key = response_key(name, system_prompt, endpoint_id, user_content)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    client = ArkClientFactory.get_client(api_key)
+    completion = client.chat.completions.create(
+        model=endpoint_id,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content},
+        ],
+        temperature=temperature,
+    )
+    response = completion.choices[0].message.content.strip()
+    if cache is not None:
+        cache.put(key, name, system_prompt, response, (time.perf_counter() - started) * 1000)
+    return response
+
 def polish_text(content: str, api_key: str, endpoint_id: str) -> str:
     """
     [LLM] 文本润色
     将口语化/杂乱的语音转写文本转换为规范的书面文本。
     """
-    client = ArkClientFactory.get_client(api_key)
     system_prompt = load_prompt("polish_text")
 
     try:
-        completion = client.chat.completions.create(
-            model=endpoint_id,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": content},
-            ],
-            temperature=0.2, # 低随机性，保持语义准确
-        )
-        return completion.choices[0].message.content.strip()
+        # 低随机性，保持语义准确
+        return _chat("polish_text", system_prompt, content, api_key, endpoint_id, temperature=0.2)
     except:
         return content
 
+def extract_search_term(text: str, api_key: str, endpoint_id: str) -> str:
+    """
+    [LLM] 提取核心搜索词
+    例如："查看沈阳轴承厂详情" -> "沈阳轴承厂"；模板缺失或调用失败时原样返回。
+    """
+    try:
+        system_prompt = load_prompt("extract_search_term")
+        term = _chat("extract_search_term", system_prompt, text, api_key, endpoint_id, temperature=0.1)
+    except:
+        return text
+    return _clean_search_term(term, text)
+
+def _clean_search_term(term: str, fallback: str) -> str:
+    """[工具] 清洗模型输出的搜索词：Unknown 时返回 fallback，去除可能的引号"""
+    if "Unknown" in term:
+        return fallback
+    return term.replace('"', '').replace("'", '').replace('`', '').strip()
+
+def normalize_input(text: str, context_type: str, api_key: str, endpoint_id: str) -> str:
+    """
+    [LLM] 规范化用户输入
+    用于在填空或选择场景下，将用户的口语转化为标准值；模板缺失或调用失败时原样返回。
+    """
+    user_msg = f"Context Type: {context_type}\nUser Input: {text}"
+    try:
+        system_prompt = load_prompt("normalize_input")
+        normalized = _chat("normalize_input", system_prompt, user_msg, api_key, endpoint_id, temperature=0.1)
+    except:
+        return text
+    if "[[NULL]]" in normalized:
+        return ""
+    return normalized
+
 def update_sales_data(original_data: dict, user_instruction: str, api_key: str, endpoint_id: str) -> dict:
     """
     [LLM] 智能修改
@@ -191,19 +273,10 @@ def classify_intent(text: str, api_key: str, endpoint_id: str) -> dict:
     [LLM] 意图分类
     判断用户的意图并提取内容，返回 {"intent": "...", "content": "..."}。
     """
-    client = ArkClientFactory.get_client(api_key)
     system_prompt = load_prompt("classify_intent")
     
     try:
-        completion = client.chat.completions.create(
-            model=endpoint_id,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text},
-            ],
-            temperature=0.1, 
-        )
-        response = completion.choices[0].message.content.strip()
+        response = _chat("classify_intent", system_prompt, text, api_key, endpoint_id, temperature=0.1)
         
         # 1. 尝试解析 JSON
         try:
@@ -228,6 +301,34 @@ def classify_intent(text: str, api_key: str, endpoint_id: str) -> dict:
     except Exception as e:
         return {"intent": "RECORD", "content": text}
 
+def understand_input(text: str, api_key: str, endpoint_id: str) -> dict:
+    """
+    [LLM] 融合 NLU：一次调用同时完成意图分类、搜索词提取与结构化过滤条件提取
+    返回 {"intent": "...", "content": "...", "search_term": "...", "filters": {...}}；
+    search_term 为 "" 表示没有具体目标 (泛指或指代当前商机)。调用或解析失败返回 None，由调用方退回分步调用。
+    """
+    try:
+        system_prompt = load_prompt("understand_input")
+        raw_content = _chat("understand_input", system_prompt, text, api_key, endpoint_id, temperature=0.1)
+        if "```json" in raw_content:
+            raw_content = raw_content.split("```json")[1].split("```")[0].strip()
+        elif "```" in raw_content:
+            raw_content = raw_content.split("```")[1].split("```")[0].strip()
+        result = json.loads(raw_content)
+    except Exception:
+        return None
+    if not isinstance(result, dict) or not result.get("intent"):
+        return None
+
+    term = result.get("search_term")
+    content = result.get("content")
+    return {
+        "intent": str(result["intent"]).upper(),
+        "content": text if content is None else str(content),
+        "search_term": _clean_search_term(str(term), "") if term else "",
+        "filters": result.get("filters") if isinstance(result.get("filters"), dict) else {},
+    }
+
 def query_sales_data(query: str, history_data: list, api_key: str, endpoint_id: str) -> str:
     """
     [LLM] 销售问答 (RAG)
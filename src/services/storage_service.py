@@ -0,0 +1,686 @@
+"""
+LinkSell 商机存储服务 (Storage Backend)
+
+职责：
+- 为 Controller 提供统一的商机持久化接口 (读/写/删/枚举)
+- 屏蔽底层存储介质差异 (一商机一 JSON 文件 / 单文件 SQLite)
+- 提供从旧版 JSON 目录到 SQLite 的一次性导入工具
+
+特点：
+- **Pluggable**: 通过 config.ini 的 [storage] backend 切换后端，上层 CRUD 语义不变
+- **Stable Keys**: 两种后端都使用 "data/opportunities/<项目名>.json" 形式的 Key，
+  因此 `_file_path`、重命名检测等既有逻辑无需区分后端
+- **WAL Mode**: SQLite 后端开启 WAL，读写并发互不阻塞 (CLI + GUI 同时运行)
+- **Manifest**: 维护 (id, 路径, mtime, size, 项目名, 阶段, 销售, 更新时间) 摘要清单，
+  ID 查找、临时 ID 与列表排序均不再打开商机文件
+- **Append-only Logs**: record_logs 单独存为追加式日志段，追加一条小记只写一行；
+  主文档只保存结构化字段，读取时自动合并，上层看到的仍是完整商机
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from threading import RLock
+
+# 清单 (Manifest) 中每条商机的摘要字段
+MANIFEST_FIELDS = ("id", "file_path", "mtime", "size", "project_name", "stage", "sales_rep", "updated_at",
+                   "customer_name", "company", "budget", "timeline", "budget_value", "timeline_date")
+
+
+def _chain_digest(digest: str, entries: list) -> str:
+    """[工具] 链式摘要：digest_i = sha1(digest_{i-1} + entry_i)，用于判断日志是否只是追加"""
+    for entry in entries:
+        payload = digest + json.dumps(entry, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    return digest
+
+
+def plan_log_append(count: int, digest: str, logs: list):
+    """
+    [工具] 对比已持久化的日志状态 (条数 + 链式摘要) 与待写入的 record_logs
+    返回 (reset, tail, new_digest)：
+    - reset=False: 已持久化部分是新列表的前缀，只需追加 tail
+    - reset=True: 历史被改写 (删改/重排)，需要整体重写为 tail
+    """
+    if count <= len(logs):
+        prefix_digest = _chain_digest("", logs[:count])
+        if prefix_digest == digest:
+            tail = logs[count:]
+            return False, tail, _chain_digest(prefix_digest, tail)
+    return True, list(logs), _chain_digest("", logs)
+
+
+def build_summary(key: str, data: dict, mtime: float, size: int) -> dict:
+    """
+    [工具] 从完整商机中提取清单摘要
+    项目名、阶段兼容内外两层结构 (与 Engine 的展示逻辑保持一致)。
+    """
+    data = data or {}
+    opp = data.get("project_opportunity") or {}
+    cust = data.get("customer_info") or {}
+    record_id = data.get("id")
+    stage = opp.get("opportunity_stage", data.get("opportunity_stage", ""))
+    return {
+        "id": str(record_id) if record_id is not None else None,
+        "file_path": key,
+        "mtime": mtime,
+        "size": size,
+        "project_name": opp.get("project_name") or data.get("project_name", ""),
+        "stage": "" if stage is None else str(stage),
+        "sales_rep": data.get("sales_rep", ""),
+        "updated_at": data.get("updated_at", ""),
+        "customer_name": cust.get("name") or "",
+        "company": cust.get("company") or "",
+        "budget": str(opp.get("budget") or ""),
+        "timeline": str(opp.get("timeline") or ""),
+        # 写入时规范化的结构化取值 (见 src/core/normalization.py)，缺失时为 None
+        "budget_value": opp.get("budget_value"),
+        "timeline_date": opp.get("timeline_date"),
+    }
+
+
+class OpportunitySummary:
+    """
+    [投影记录] 列表视图使用的精简商机摘要
+    使用 __slots__，每条只占几十字节，不包含 record_logs 等大字段；
+    由清单条目直接构造，全程不读取商机正文。
+    """
+
+    __slots__ = ("id", "project_name", "stage", "sales_rep", "updated_at", "customer_name", "company",
+                 "_temp_id", "_file_path")
+    FIELDS = __slots__
+
+    def __init__(self, entry: dict, temp_id: str):
+        self.id = entry.get("id")
+        self.project_name = entry.get("project_name") or ""
+        self.stage = entry.get("stage") or ""
+        self.sales_rep = entry.get("sales_rep") or ""
+        self.updated_at = entry.get("updated_at") or ""
+        self.customer_name = entry.get("customer_name") or ""
+        self.company = entry.get("company") or ""
+        self._temp_id = temp_id
+        self._file_path = entry["file_path"]
+
+    def project(self, fields) -> dict:
+        """[投影] 只取出指定字段，返回普通字典"""
+        return {f: getattr(self, f) for f in fields}
+
+
+class OpportunityStore:
+    """
+    [抽象基类] 商机存储后端
+    所有 Key 均为字符串形式的 (虚拟) 文件路径，排序规则统一为"最近修改在前"，
+    临时 ID (_temp_id) 即该顺序下的 1-based 序号。
+    """
+
+    def __init__(self, data_dir="data/opportunities"):
+        self.data_dir = Path(data_dir)
+
+    def key_for(self, project_name: str) -> str:
+        """[工具] 根据项目名生成存储 Key (过滤文件名非法字符)"""
+        safe_name = re.sub(r'[\\/:*?"<>|]', '_', project_name)
+        return str(self.data_dir / f"{safe_name}.json")
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def load(self, key: str):
+        """读取一条商机，不存在或损坏时返回 None"""
+        raise NotImplementedError
+
+    def stamp(self, key: str):
+        """返回数据版本戳 (修改时间)，用于缓存校验；不存在时返回 None"""
+        raise NotImplementedError
+
+    def write(self, key: str, data: dict, mtime: float = None):
+        """写入 (覆盖) 一条商机"""
+        raise NotImplementedError
+
+    def remove(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def keys(self) -> list:
+        """按修改时间倒序返回全部 Key"""
+        return [entry["file_path"] for entry in self.summaries()]
+
+    def summaries(self) -> list:
+        """按修改时间倒序返回全部清单摘要 (见 MANIFEST_FIELDS)，不读取商机正文"""
+        raise NotImplementedError
+
+    def generation(self) -> int:
+        """清单版本号：任何条目增删改 (含外部进程修改) 都会使其递增，用于上层索引失效判断"""
+        raise NotImplementedError
+
+    def find_key(self, record_id):
+        """根据真实 ID 查找 Key，找不到返回 None"""
+        raise NotImplementedError
+
+    def state_path(self, name: str) -> Path:
+        """[工具] 与本存储绑定的小型状态文件路径 (清单、迁移记录等)"""
+        return self.data_dir.parent / f"{self.data_dir.name}.{name}.json"
+
+    def close(self):
+        pass
+
+
+class JsonFileStore(OpportunityStore):
+    """
+    [兼容后端] 一商机一 JSON 文件
+    即 v3.x 以来的原始布局：data/opportunities/<项目名>.json
+
+    目录旁维护一份持久化清单 (data/opportunities.manifest.json)：
+    - 启动时仅对目录做 stat，mtime/size 未变的文件直接沿用清单条目
+    - 每次 write/remove 增量更新对应条目
+    - 目录 mtime 变化 (其他进程新建/删除文件) 时自动重新校验
+
+    record_logs 存放在同名日志段 <项目名>.logs.jsonl 中，每行一个操作：
+    - {"op": "append", "entry": {...}}  追加一条小记
+    - {"op": "reset"}                   历史被改写，之前的行全部作废
+    作废行超过有效行时自动压缩 (重写为只含有效条目的新段)。
+    """
+
+    MANIFEST_VERSION = 5
+    # 日志段压缩阈值：总行数不少于该值且超过有效条数两倍时压缩
+    COMPACT_MIN_LINES = 32
+
+    def __init__(self, data_dir="data/opportunities"):
+        super().__init__(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.state_path("manifest")
+
+        self._lock = RLock()
+        self._entries = {}      # {key: summary}
+        self._by_id = {}        # {id: key}
+        self._dir_mtime = None
+        self._manifest_stat = None
+        self._generation = 0
+
+        self._load_manifest()
+        self._validate()
+
+    # ---------- 清单维护 ----------
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") == self.MANIFEST_VERSION:
+                self._entries = {e["file_path"]: e for e in payload.get("entries", [])}
+        except Exception:
+            self._entries = {}
+        self._manifest_stat = self._stat_manifest()
+
+    def _save_manifest(self):
+        payload = {"version": self.MANIFEST_VERSION, "entries": list(self._entries.values())}
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest_stat = self._stat_manifest()
+
+    def _stat_manifest(self):
+        """清单文件的 (mtime_ns, size)；每次写入都会更新清单，可据此发现其他进程的写入"""
+        try:
+            st = self.manifest_path.stat()
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _stat_dir(self):
+        try:
+            return self.data_dir.stat().st_mtime
+        except OSError:
+            return None
+
+    def _reindex_ids(self):
+        self._by_id = {e["id"]: key for key, e in self._entries.items() if e.get("id") is not None}
+        self._generation += 1
+
+    def _set_entry(self, key, summary):
+        """[增量维护] 替换单个条目并同步 ID 映射"""
+        old = self._entries.pop(key, None)
+        if old and self._by_id.get(old.get("id")) == key:
+            del self._by_id[old["id"]]
+        if summary is not None:
+            self._entries[key] = summary
+            if summary.get("id") is not None:
+                self._by_id[summary["id"]] = key
+        self._generation += 1
+        return old
+
+    # ---------- 日志段 ----------
+
+    def _segment_path(self, key) -> Path:
+        return Path(key).with_suffix(".logs.jsonl")
+
+    def _segment_size(self, key) -> int:
+        try:
+            return self._segment_path(key).stat().st_size
+        except OSError:
+            return 0
+
+    def _read_segment(self, key):
+        """读取日志段，返回 (有效条目列表, 物理行数)"""
+        entries, lines = [], 0
+        try:
+            with open(self._segment_path(key), "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    lines += 1
+                    try:
+                        op = json.loads(line)
+                    except Exception:
+                        continue  # 崩溃时可能残留半行，忽略
+                    if op.get("op") == "reset":
+                        entries = []
+                    elif op.get("op") == "append":
+                        entries.append(op.get("entry"))
+        except OSError:
+            pass
+        return entries, lines
+
+    def _rewrite_segment(self, key, logs) -> int:
+        """[压缩] 用有效条目重写日志段，返回新的物理行数"""
+        seg_path = self._segment_path(key)
+        if not logs:
+            if seg_path.exists():
+                os.remove(seg_path)
+            return 0
+        tmp_path = seg_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in logs:
+                f.write(json.dumps({"op": "append", "entry": entry}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, seg_path)
+        return len(logs)
+
+    def _log_state(self, key) -> dict:
+        """
+        已持久化日志段的状态 (优先取清单，缺失时读取日志段重建)
+        清单中的状态只有在日志段大小、主文档 mtime/size 与磁盘一致时才可信，
+        否则说明其他进程写过该商机，按日志段实际内容重建，避免重复追加。
+        """
+        cached = self._entries.get(key)
+        if cached and "log_count" in cached and cached.get("log_size") == self._segment_size(key):
+            try:
+                st = Path(key).stat()
+            except OSError:
+                st = None
+            if st is not None and cached.get("mtime") == st.st_mtime and cached.get("size") == st.st_size:
+                return cached
+        entries, lines = self._read_segment(key)
+        return {"log_count": len(entries), "log_digest": _chain_digest("", entries), "log_lines": lines}
+
+    def _summarize(self, key, st) -> dict:
+        doc = self._read_doc(key)
+        entries, lines = self._read_segment(key)
+        summary = build_summary(key, doc, st.st_mtime, st.st_size)
+        summary.update(log_count=len(entries), log_digest=_chain_digest("", entries),
+                       log_lines=lines, log_size=self._segment_size(key))
+        return summary
+
+    def compact(self) -> int:
+        """[维护] 压缩所有含作废行的日志段，返回压缩的段数"""
+        compacted = 0
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.get("log_lines", 0) > entry.get("log_count", 0):
+                    entries, _ = self._read_segment(key)
+                    entry["log_lines"] = self._rewrite_segment(key, entries)
+                    entry["log_size"] = self._segment_size(key)
+                    compacted += 1
+            if compacted:
+                self._save_manifest()
+        return compacted
+
+    # ---------- 校验 ----------
+
+    def _validate(self):
+        """
+        [校验] 用 stat 比对清单与目录
+        只有新增或 mtime/size (含日志段大小) 变化的文件才会被重新解析。
+        """
+        with self._lock:
+            dirty = False
+            seen = set()
+            with os.scandir(self.data_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json") or not entry.is_file():
+                        continue
+                    key = str(self.data_dir / entry.name)
+                    st = entry.stat()
+                    seen.add(key)
+                    cached = self._entries.get(key)
+                    if (cached and cached["mtime"] == st.st_mtime and cached["size"] == st.st_size
+                            and cached.get("log_size") == self._segment_size(key)):
+                        continue
+                    # 损坏的文件也保留占位条目，保证临时 ID 的编号与文件数一致
+                    self._entries[key] = self._summarize(key, st)
+                    dirty = True
+
+            for key in [k for k in self._entries if k not in seen]:
+                del self._entries[key]
+                dirty = True
+
+            self._dir_mtime = self._stat_dir()
+            if dirty or not self.manifest_path.exists():
+                self._save_manifest()
+            if dirty or not self._by_id:
+                self._reindex_ids()
+
+    def _refresh_if_changed(self):
+        if self._stat_manifest() != self._manifest_stat:
+            # 其他进程写过 (原地改写已有文件时目录 mtime 不变)：读入其清单后按 stat 校验
+            self._load_manifest()
+            self._validate()
+            self._reindex_ids()
+        elif self._stat_dir() != self._dir_mtime:
+            self._validate()
+
+    # ---------- 存储接口 ----------
+
+    def exists(self, key):
+        return Path(key).exists()
+
+    def _read_doc(self, key):
+        try:
+            with open(key, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def load(self, key):
+        doc = self._read_doc(key)
+        if doc is None:
+            return None
+        # 兼容旧版：主文档内嵌的 record_logs 在前，日志段中的条目在后
+        inline = doc.pop("record_logs", None)
+        entries, lines = self._read_segment(key)
+        if inline is not None or lines:
+            doc["record_logs"] = (inline or []) + entries
+        return doc
+
+    def stamp(self, key):
+        try:
+            return Path(key).stat().st_mtime
+        except OSError:
+            return None
+
+    def write(self, key, data, mtime=None):
+        path = Path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc = dict(data)
+        logs = doc.pop("record_logs", None) or []
+        with self._lock:
+            # 1. 日志段：通常只追加新增的几行
+            state = self._log_state(key)
+            reset, tail, digest = plan_log_append(state["log_count"], state["log_digest"], logs)
+            lines = state.get("log_lines", 0)
+            if reset or tail:
+                with open(self._segment_path(key), "a", encoding="utf-8") as f:
+                    if reset:
+                        f.write(json.dumps({"op": "reset"}) + "\n")
+                    for entry in tail:
+                        f.write(json.dumps({"op": "append", "entry": entry}, ensure_ascii=False) + "\n")
+                lines += len(tail) + (1 if reset else 0)
+                if reset and lines >= self.COMPACT_MIN_LINES and lines > 2 * len(logs):
+                    lines = self._rewrite_segment(key, logs)
+
+            # 2. 主文档：只含结构化字段
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(doc, f, ensure_ascii=False, indent=2)
+            if mtime is not None:
+                os.utime(path, (mtime, mtime))
+
+            st = path.stat()
+            summary = build_summary(key, doc, st.st_mtime, st.st_size)
+            summary.update(log_count=len(logs), log_digest=digest,
+                           log_lines=lines, log_size=self._segment_size(key))
+            self._set_entry(key, summary)
+            self._save_manifest()
+            self._dir_mtime = self._stat_dir()
+
+    def remove(self, key):
+        path = Path(key)
+        with self._lock:
+            if not path.exists():
+                return False
+            os.remove(path)
+            seg_path = self._segment_path(key)
+            if seg_path.exists():
+                os.remove(seg_path)
+            if self._set_entry(key, None) is not None:
+                self._save_manifest()
+            self._dir_mtime = self._stat_dir()
+        return True
+
+    def summaries(self):
+        with self._lock:
+            self._refresh_if_changed()
+            entries = list(self._entries.values())
+        entries.sort(key=lambda e: e["mtime"], reverse=True)
+        return entries
+
+    def generation(self):
+        with self._lock:
+            self._refresh_if_changed()
+            return self._generation
+
+    def find_key(self, record_id):
+        with self._lock:
+            self._refresh_if_changed()
+            return self._by_id.get(str(record_id))
+
+
+class SQLiteStore(OpportunityStore):
+    """
+    [高性能后端] 单文件 SQLite 存储 (WAL 模式)
+    每条商机一行，按 Key 主键、ID 与修改时间建索引，
+    列表与 ID 查找不再需要扫描目录和逐个解析文件。
+    record_logs 存放在独立的 record_logs 表中，追加小记只插入新行。
+    """
+
+    # 清单摘要与日志状态列 (早期数据库缺失时自动补齐)
+    EXTRA_COLUMNS = {
+        "size": "INTEGER NOT NULL DEFAULT 0",
+        "project_name": "TEXT NOT NULL DEFAULT ''",
+        "stage": "TEXT NOT NULL DEFAULT ''",
+        "sales_rep": "TEXT NOT NULL DEFAULT ''",
+        "updated_at": "TEXT NOT NULL DEFAULT ''",
+        "log_count": "INTEGER NOT NULL DEFAULT 0",
+        "log_digest": "TEXT NOT NULL DEFAULT ''",
+        "customer_name": "TEXT NOT NULL DEFAULT ''",
+        "company": "TEXT NOT NULL DEFAULT ''",
+        "budget": "TEXT NOT NULL DEFAULT ''",
+        "timeline": "TEXT NOT NULL DEFAULT ''",
+        "budget_value": "REAL",
+        "timeline_date": "TEXT",
+    }
+    # 由 build_summary 计算的摘要列 (与 MANIFEST_FIELDS 对应，id/key/mtime 为主列)
+    SUMMARY_COLUMNS = tuple(f for f in MANIFEST_FIELDS if f not in ("id", "file_path", "mtime"))
+
+    def __init__(self, db_path="data/linksell.db", data_dir="data/opportunities"):
+        super().__init__(data_dir)
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Streamlit 会在多个线程中复用同一个 Controller，连接需跨线程共享，由锁串行化
+        self._lock = RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS opportunities (
+                key          TEXT PRIMARY KEY,
+                id           TEXT,
+                mtime        REAL NOT NULL,
+                doc          TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_opportunities_id ON opportunities(id);
+            CREATE INDEX IF NOT EXISTS idx_opportunities_mtime ON opportunities(mtime DESC);
+            CREATE TABLE IF NOT EXISTS record_logs (
+                key   TEXT NOT NULL,
+                seq   INTEGER NOT NULL,
+                entry TEXT NOT NULL,
+                PRIMARY KEY (key, seq)
+            );
+            """
+        )
+        self._ensure_summary_columns()
+        self._conn.commit()
+
+    def _ensure_summary_columns(self):
+        """[兼容] 为早期创建的数据库补齐清单摘要列，并从正文回填"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(opportunities)")}
+        missing = [c for c in self.EXTRA_COLUMNS if c not in columns]
+        if not missing:
+            return
+        for col in missing:
+            self._conn.execute(f"ALTER TABLE opportunities ADD COLUMN {col} {self.EXTRA_COLUMNS[col]}")
+        for key, mtime, doc in self._conn.execute("SELECT key, mtime, doc FROM opportunities").fetchall():
+            try:
+                data = json.loads(doc)
+            except Exception:
+                data = {}
+            summary = build_summary(key, data, mtime, len(doc.encode("utf-8")))
+            assignments = ", ".join(f"{c} = ?" for c in self.SUMMARY_COLUMNS)
+            self._conn.execute(
+                f"UPDATE opportunities SET {assignments} WHERE key = ?",
+                tuple(summary[c] for c in self.SUMMARY_COLUMNS) + (key,)
+            )
+
+    def exists(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM opportunities WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def load(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT doc FROM opportunities WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            log_rows = self._conn.execute(
+                "SELECT entry FROM record_logs WHERE key = ? ORDER BY seq", (key,)
+            ).fetchall()
+        try:
+            doc = json.loads(row[0])
+        except Exception:
+            return None
+        # 兼容旧版：正文内嵌的 record_logs 在前，日志表中的条目在后
+        inline = doc.pop("record_logs", None)
+        if inline is not None or log_rows:
+            doc["record_logs"] = (inline or []) + [json.loads(r[0]) for r in log_rows]
+        return doc
+
+    def stamp(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM opportunities WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def write(self, key, data, mtime=None):
+        main = dict(data)
+        logs = main.pop("record_logs", None) or []
+        doc = json.dumps(main, ensure_ascii=False)
+        summary = build_summary(key, main, mtime or time.time(), len(doc.encode("utf-8")))
+        with self._lock:
+            # 1. 日志表：通常只插入新增的几行
+            row = self._conn.execute(
+                "SELECT log_count, log_digest FROM opportunities WHERE key = ?", (key,)
+            ).fetchone()
+            count, digest = row if row else (0, "")
+            reset, tail, new_digest = plan_log_append(count, digest, logs)
+            start = count
+            if reset:
+                self._conn.execute("DELETE FROM record_logs WHERE key = ?", (key,))
+                start = 0
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO record_logs (key, seq, entry) VALUES (?, ?, ?)",
+                [(key, start + i, json.dumps(entry, ensure_ascii=False)) for i, entry in enumerate(tail)]
+            )
+
+            # 2. 主文档：只含结构化字段
+            columns = ("key", "id", "mtime", "doc", "log_count", "log_digest") + self.SUMMARY_COLUMNS
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO opportunities ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                (key, summary["id"], summary["mtime"], doc, len(logs), new_digest)
+                + tuple(summary[c] for c in self.SUMMARY_COLUMNS)
+            )
+            self._conn.commit()
+
+    def remove(self, key):
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM opportunities WHERE key = ?", (key,))
+            self._conn.execute("DELETE FROM record_logs WHERE key = ?", (key,))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def keys(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT key FROM opportunities ORDER BY mtime DESC, rowid DESC").fetchall()
+        return [r[0] for r in rows]
+
+    def state_path(self, name):
+        return self.db_path.with_name(f"{self.db_path.stem}.{name}.json")
+
+    def summaries(self):
+        with self._lock:
+            columns = ", ".join(("id", "key", "mtime") + self.SUMMARY_COLUMNS)
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM opportunities ORDER BY mtime DESC, rowid DESC"
+            ).fetchall()
+        return [dict(zip(MANIFEST_FIELDS, row)) for row in rows]
+
+    def generation(self):
+        # data_version 在其他连接 (含其他进程) 提交后变化；本连接的写入由 total_changes 体现
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return hash((data_version, self._conn.total_changes))
+
+    def find_key(self, record_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key FROM opportunities WHERE id = ? ORDER BY mtime DESC LIMIT 1", (str(record_id),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_store(config, data_dir="data/opportunities") -> OpportunityStore:
+    """
+    [工厂] 根据配置创建存储后端
+    [storage] backend = json (默认) | sqlite
+    """
+    backend = config.get("storage", "backend", fallback="json").strip().lower()
+    if backend == "sqlite":
+        db_path = config.get("storage", "sqlite_path", fallback="data/linksell.db")
+        return SQLiteStore(db_path=db_path, data_dir=data_dir)
+    return JsonFileStore(data_dir=data_dir)
+
+
+def import_json_directory(source_dir, target: OpportunityStore) -> int:
+    """
+    [一次性导入] 将旧版 JSON 目录导入到目标存储
+    保留每个文件的修改时间，确保导入后列表顺序与临时 ID 不变。
+    返回成功导入的条数。
+    """
+    source = JsonFileStore(source_dir)
+    imported = 0
+    for key in source.keys():
+        data = source.load(key)
+        if data is None:
+            print(f"⚠️ [Import] 跳过无法解析的文件: {key}")
+            continue
+        target_key = str(target.data_dir / Path(key).name)
+        target.write(target_key, data, mtime=source.stamp(key))
+        imported += 1
+    return imported
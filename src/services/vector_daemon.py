@@ -0,0 +1,356 @@
+"""
+LinkSell 向量守护进程 (Vector Daemon)
+
+职责：
+- 单独的常驻进程持有 Embedding 模型与向量库客户端，通过本机 Unix Socket 提供编码/检索/写入
+- CLI、Streamlit GUI、定时任务中的 VectorService 发现守护进程在运行时，改为轻量客户端
+  (RemoteVectorService)，不再各自加载一份 ~400MB 的模型
+- 把多个并发请求中的单条查询编码合并成一批前向 (micro-batching)
+
+特点：
+- **Transparent**: RemoteVectorService 提供与 VectorService 相同的方法，Controller / vector-sync /
+  写后队列无需区分本地还是远程；守护进程不在时自动回退为进程内加载
+- **Local Hydration**: hydrate 回调无法跨进程，远程检索只返回 ID 与元数据，
+  商机正文与片段文本仍由调用方按 ID 在本进程还原
+- **Simple Protocol**: 每个连接一问一答，4 字节长度前缀 + JSON；Socket 文件权限 0600，只允许本用户访问
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from pathlib import Path
+
+from src.services.vector_service import hydrate_chunk_hits
+
+# 允许远程调用的 VectorService 方法 (均为可 JSON 序列化的参数与返回值)
+REMOTE_METHODS = {
+    "add_records", "delete_record", "delete_records", "search", "search_chunks", "search_projects",
+    "indexed_hashes", "chunked_record_ids", "reset_db", "cache_stats", "query_cache_stats", "status",
+    "wait_ready", "is_ready", "is_loading", "startup_report",
+}
+# 会改写向量库的方法：各客户端的请求在各自线程中执行，这些方法串行化，检索仍可并发
+MUTATING_METHODS = {"add_records", "delete_record", "delete_records", "reset_db"}
+
+
+def _send(sock, payload):
+    data = json.dumps(payload, ensure_ascii=False, default=_encode_default).encode("utf-8")
+    sock.sendall(struct.pack("!I", len(data)) + data)
+
+
+def _recv(sock):
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    (size,) = struct.unpack("!I", header)
+    body = _recv_exact(sock, size)
+    if body is None:
+        raise ConnectionError("向量守护进程连接中断")
+    return json.loads(body.decode("utf-8"))
+
+
+def _recv_exact(sock, size: int):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _encode_default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"无法序列化 {type(obj).__name__}")
+
+
+class MicroBatcher:
+    """
+    [编码合并] 包装 Embedding 模型：并发的单条 encode 在 max_wait_ms 内凑成一批再前向
+    批量 encode (列表输入) 原样转交模型。对外接口与 SentenceTransformer.encode 一致。
+    """
+
+    def __init__(self, model, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._cond = threading.Condition()
+        self._waiting = []  # [(文本, 结果槽)]
+        self.batches = 0
+        self.items = 0
+        threading.Thread(target=self._run, name="linksell-micro-batch", daemon=True).start()
+
+    def __getattr__(self, name):
+        # start_multi_process_pool 等其余方法直接转交模型
+        return getattr(self.model, name)
+
+    def encode(self, texts, batch_size: int = 32, show_progress_bar: bool = False, **kwargs):
+        if not isinstance(texts, str):
+            return self.model.encode(texts, batch_size=batch_size, show_progress_bar=show_progress_bar, **kwargs)
+        slot = {"done": threading.Event()}
+        with self._cond:
+            self._waiting.append((texts, slot))
+            self._cond.notify()
+        slot["done"].wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["vector"]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._waiting:
+                    self._cond.wait()
+                # 第一条到达后再等一小段时间，让同时到达的请求进入同一批
+                deadline = time.monotonic() + self.max_wait
+                while len(self._waiting) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(timeout=remaining)
+                batch, self._waiting = self._waiting[:self.max_batch], self._waiting[self.max_batch:]
+            try:
+                vectors = self.model.encode([t for t, _ in batch], batch_size=len(batch), show_progress_bar=False)
+                for (_, slot), vec in zip(batch, vectors):
+                    slot["vector"] = vec
+            except Exception as e:
+                for _, slot in batch:
+                    slot["error"] = e
+            self.batches += 1
+            self.items += len(batch)
+            for _, slot in batch:
+                slot["done"].set()
+
+    def stats(self) -> dict:
+        return {
+            "micro_batches": self.batches,
+            "micro_batch_items": self.items,
+            "micro_batch_avg": round(self.items / self.batches, 2) if self.batches else 0,
+        }
+
+
+class VectorDaemon:
+    """[服务端] 在 Unix Socket 上托管一个 VectorService"""
+
+    def __init__(self, service, socket_path, max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.service = service
+        self.socket_path = Path(socket_path)
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self.batcher = None
+        self.requests = 0
+        self.started_at = time.time()
+        self._server = None
+        self._write_lock = threading.Lock()
+
+    def _wrap_model(self):
+        """[后台] 模型加载完成后套上 MicroBatcher (加载失败时保持原状，请求会返回初始化错误)"""
+        try:
+            self.service._ensure_initialized(timeout=3600)
+        except Exception:
+            return
+        self.batcher = MicroBatcher(self.service.model, self.max_batch, self.max_wait_ms)
+        self.service.model = self.batcher
+
+    def dispatch(self, request: dict):
+        method = request.get("method")
+        if method not in REMOTE_METHODS:
+            raise ValueError(f"不支持的远程方法: {method}")
+        self.requests += 1
+        if method == "wait_ready":
+            self.service._ensure_initialized(**request.get("kwargs", {}))
+            return True
+        if method == "status":
+            return {"status": self.service.status(), "pid": os.getpid(),
+                    "uptime_s": round(time.time() - self.started_at, 1), "requests": self.requests,
+                    "store": self.service.store_kind, **(self.batcher.stats() if self.batcher else {})}
+        call = getattr(self.service, method)
+        if method in MUTATING_METHODS:
+            # 先读后删再写的索引维护 (项目名/片段集合) 不能交错，否则会残留旧片段或复活已删除条目
+            with self._write_lock:
+                return call(*request.get("args", []), **request.get("kwargs", {}))
+        return call(*request.get("args", []), **request.get("kwargs", {}))
+
+    def start(self):
+        """[启动] 绑定 Socket 并在后台线程中服务；已有守护进程在运行时抛出 RuntimeError"""
+        if RemoteVectorService.connect(self.socket_path) is not None:
+            raise RuntimeError(f"向量守护进程已在运行: {self.socket_path}")
+        if self.socket_path.exists():
+            self.socket_path.unlink()  # 上次异常退出留下的 Socket 文件
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                request = _recv(self.request)
+                if request is None:
+                    return
+                try:
+                    response = {"ok": True, "result": daemon.dispatch(request)}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e), "type": type(e).__name__}
+                _send(self.request, response)
+
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._wrap_model, daemon=True).start()
+        threading.Thread(target=self._server.serve_forever, name="linksell-vector-daemon", daemon=True).start()
+
+    def serve_forever(self):
+        """[前台] 启动 (如尚未启动) 并阻塞到 Ctrl+C"""
+        if self._server is None:
+            self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+
+class RemoteVectorService:
+    """
+    [客户端] 与 VectorService 同名方法的轻量代理 (不导入模型与向量库)
+    连接失败时抛出 ConnectionError，调用方按向量库故障处理 (写后队列重试、检索回退)。
+    """
+
+    # 批量写入时每次请求的条数 (每块之后回调一次 progress)
+    CHUNK = 256
+
+    def __init__(self, socket_path, timeout: float = 600.0):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self.store_kind = "remote"
+
+    @classmethod
+    def connect(cls, socket_path, timeout: float = 1.0):
+        """[发现] 守护进程在运行时返回客户端，否则返回 None"""
+        if not socket_path or not hasattr(socket, "AF_UNIX") or not Path(socket_path).exists():
+            return None
+        client = cls(socket_path)
+        try:
+            client._call("status", _socket_timeout=timeout)
+        except (OSError, ConnectionError, RuntimeError):
+            return None
+        return client
+
+    def _call(self, method: str, *args, _socket_timeout: float = None, **kwargs):
+        """[内部] 一次远程调用；kwargs 原样转交服务端方法 (含其 timeout 参数)"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(_socket_timeout or self.timeout)
+            sock.connect(str(self.socket_path))
+            _send(sock, {"method": method, "args": list(args), "kwargs": kwargs})
+            response = _recv(sock)
+        if response is None:
+            raise ConnectionError("向量守护进程未返回结果")
+        if not response["ok"]:
+            error = TimeoutError if response.get("type") == "TimeoutError" else RuntimeError
+            raise error(f"[向量守护进程] {response['error']}")
+        return response["result"]
+
+    # ---------- 与 VectorService 对齐的接口 ----------
+
+    def _ensure_initialized(self, timeout: float = 30.0):
+        self._call("wait_ready", timeout=timeout, _socket_timeout=timeout + 5)
+
+    def status(self):
+        try:
+            return self._call("status", _socket_timeout=2)["status"]
+        except (OSError, ConnectionError, RuntimeError):
+            return "Error"
+
+    def is_ready(self) -> bool:
+        try:
+            return self._call("is_ready", _socket_timeout=2)
+        except (OSError, ConnectionError, RuntimeError):
+            return False
+
+    def is_loading(self) -> bool:
+        try:
+            return self._call("is_loading", _socket_timeout=2)
+        except (OSError, ConnectionError, RuntimeError):
+            return False
+
+    def startup_report(self) -> dict:
+        """守护进程中的启动耗时 (守护进程常驻，客户端进程本身无需加载)"""
+        return dict(self._call("startup_report", _socket_timeout=2), daemon=str(self.socket_path))
+
+    def add_record(self, record_id, record_data: dict, timeout: float = 30.0):
+        self.add_records([dict(record_data, id=record_id)], batch_size=1, timeout=timeout)
+
+    def add_records(self, records: list, batch_size: int = 64, timeout: float = 30.0, progress=None,
+                    pool=None) -> int:
+        records = [r for r in records if r.get("id") is not None]
+        written = 0
+        for start in range(0, len(records), self.CHUNK):
+            written += self._call("add_records", records[start:start + self.CHUNK], batch_size=batch_size,
+                                  timeout=timeout)
+            if progress:
+                progress(written, len(records))
+        return written
+
+    def start_encode_pool(self, workers: int = None, timeout: float = 30.0):
+        return None  # 编码在守护进程中完成
+
+    def stop_encode_pool(self, pool):
+        pass
+
+    def delete_record(self, record_id, timeout: float = 30.0):
+        return self._call("delete_record", record_id, timeout=timeout)
+
+    def delete_records(self, ids: list, timeout: float = 30.0) -> int:
+        return self._call("delete_records", list(ids), timeout=timeout)
+
+    def indexed_hashes(self, page_size: int = 1000, timeout: float = 30.0) -> dict:
+        return self._call("indexed_hashes", page_size=page_size, timeout=timeout)
+
+    def chunked_record_ids(self, page_size: int = 1000, timeout: float = 30.0) -> set:
+        return set(self._call("chunked_record_ids", page_size=page_size, timeout=timeout))
+
+    def reset_db(self, timeout: float = 30.0):
+        return self._call("reset_db", timeout=timeout)
+
+    def cache_stats(self):
+        return self._call("cache_stats")
+
+    def query_cache_stats(self) -> dict:
+        try:
+            return self._call("query_cache_stats", _socket_timeout=2)
+        except (OSError, ConnectionError, RuntimeError):
+            return {}
+
+    def search(self, query: str, top_k=5, where_filter: dict = None, hydrate=None, timeout: float = 30.0):
+        hits = self._call("search", query, top_k=top_k, where_filter=where_filter, timeout=timeout)
+        if hydrate is None:
+            return hits
+        restored = (hydrate(hit.get("id")) for hit in hits)
+        return [data for data in restored if data is not None]
+
+    def search_chunks(self, query: str, top_k: int = 8, where_filter: dict = None, hydrate=None,
+                      timeout: float = 30.0):
+        hits = self._call("search_chunks", query, top_k=top_k, where_filter=where_filter, timeout=timeout)
+        return hydrate_chunk_hits(hits, hydrate) if hydrate is not None else hits
+
+    def search_projects(self, project_name: str, top_k=3, threshold: float = None, timeout: float = 30.0):
+        return self._call("search_projects", project_name, top_k=top_k, threshold=threshold, timeout=timeout)
@@ -8,13 +8,29 @@ LinkSell 向量数据库服务 (RAG Core)
 
 特点：
 - **Hybrid Search**: 支持"语义相似度 + 元数据过滤"的混合检索
-- **Async Loading**: 采用后台线程加载模型，避免阻塞主程序启动
-- **Metadata Extraction**: 自动拆分关键字段 (销售、阶段等) 用于精确筛选
+- **Async Loading**: 采用后台线程加载模型，避免阻塞主程序启动；chromadb / sentence_transformers (torch)
+  / numpy 也延迟到首次使用时导入，导入本模块本身几乎不耗时。is_loading() 供调用方在加载期间走降级检索，
+  startup_report() 记录 模型加载 / 向量库打开 / 索引准备 / 首次查询 各阶段耗时
+- **Pluggable Backend**: Embedding 推理可选 PyTorch (默认) 或 ONNX Runtime int8 (见 embedding_backends)
+- **Slim Metadata**: 只存 项目名/阶段/销售/内容指纹 用于过滤与一致性比对，
+  商机正文由调用方 (Controller 缓存) 按 ID 还原，向量库不再重复保存完整 JSON
+- **Embedding Cache**: 可选的持久化向量缓存，向量文本未变的商机保存时不再重新编码；
+  查询向量另有进程内 LRU，重复的问题/项目名不再跑模型
+- **Name Index**: 独立的项目名/别名集合 (余弦距离)，项目查重不再拿短名称去比整段商机内容的向量
+- **Chunk Index**: 每条跟进小记、客户需求、关键点各自一条向量，问答只取最相关的片段；
+  追加小记时只编码新增的那一条
+- **Flat Fallback**: ChromaDB 不可用时自动改用内置的 NumPy 内存映射平铺索引 (见 flat_index)，
+  精确检索，接口不变
 """
 
 import os
+import re
 import threading
+import time
+import unicodedata
 import json
+import hashlib
+import sqlite3
 from pathlib import Path
 
 # [环境配置] 必须在导入 sentence_transformers 之前设置
@@ -23,32 +39,166 @@ os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
 os.environ["HTTP_PROXY"] = ""
 os.environ["HTTPS_PROXY"] = ""
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+from src.services.embedding_cache import EmbeddingCache, QueryEmbeddingCache, normalize_query, text_key
+# [延迟导入] sentence_transformers 会连带导入 torch (数秒 + 数百 MB)，首次加载模型时才导入
+# 模块级占位名保留，测试可直接 patch 为离线替身
+SentenceTransformer = None
+
+
+def content_hash(record: dict) -> str:
+    """[工具] 商机内容指纹 (键排序后的 JSON 的 SHA1)，用于 JSON 与向量库的一致性比对"""
+    payload = {k: v for k, v in record.items() if k not in ("_temp_id", "_file_path")}
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def normalize_name(name) -> str:
+    """[工具] 项目名归一化：全半角统一、小写、去掉空白与常见标点"""
+    text = unicodedata.normalize("NFKC", str(name or "")).lower()
+    return re.sub(r"[\s\-_·•.,，。、:：;；()（）\[\]【】\"'“”‘’]+", "", text)
+
+
+def project_names(record: dict) -> list:
+    """[工具] 商机的项目名 + 别名 (project_opportunity.aliases)，归一化并去重，项目名在前"""
+    opp = record.get("project_opportunity") or {}
+    raw = [opp.get("project_name") or record.get("project_name")]
+    aliases = opp.get("aliases") or record.get("aliases") or []
+    raw += [aliases] if isinstance(aliases, str) else list(aliases)
+    names = []
+    for name in raw:
+        norm = normalize_name(name)
+        if norm and norm not in names:
+            names.append(norm)
+    return names
+
+
+def _as_list(value) -> list:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else [str(v) for v in value if v]
+
+
+def record_chunks(record_id, record: dict) -> list:
+    """
+    [工具] 把商机拆成检索片段 [(片段ID, 类型, 序号, 文本)]
+    - log: 每条跟进小记一段 (序号 = 在 record_logs 中的位置，小记只追加，已有片段 ID 保持稳定)
+    - requirements / key_points: 客户需求、关键点各合成一段
+    每段都带上项目名，保证片段脱离原商机后仍有语义。
+    """
+    opp = record.get("project_opportunity") or {}
+    project = opp.get("project_name") or record.get("project_name") or "未命名"
+    chunks = []
+    for seq, log in enumerate(record.get("record_logs") or []):
+        if not isinstance(log, dict) or not log.get("content"):
+            continue
+        who = log.get("sales_rep") or log.get("recorder") or ""
+        text = f"项目: {project}; 时间: {log.get('time', '')} {who}; 小记: {log['content']}"
+        chunks.append((f"{record_id}:log:{seq}", "log", seq, text))
+    for kind, field, label in (("requirements", "customer_requirements", "客户需求"),
+                               ("key_points", "key_points", "关键点")):
+        items = list(dict.fromkeys(_as_list(opp.get(field)) + _as_list(record.get(field))))
+        if items:
+            chunks.append((f"{record_id}:{kind}", kind, 0, f"项目: {project}; {label}: {'；'.join(items)}"))
+    return chunks
+
+
+def hydrate_chunk_hits(hits: list, hydrate) -> list:
+    """[工具] 按商机 ID 取完整商机，填入片段正文；商机已删除或片段已不存在的命中被跳过"""
+    texts = {}  # {商机ID: {片段ID: 文本}}
+    out = []
+    for hit in hits:
+        rid = hit["record_id"]
+        if rid not in texts:
+            record = hydrate(rid)
+            texts[rid] = {c[0]: c[3] for c in record_chunks(rid, record)} if record else {}
+        text = texts[rid].get(hit["id"])
+        if text is not None:
+            out.append(dict(hit, text=text))
+    return out
+
+
+def vector_options(config) -> dict:
+    """[配置] config.ini [vector] 段 -> VectorService 构造参数 (Controller 与向量守护进程共用)"""
+    cache_path = config.get("vector", "embedding_cache", fallback="data/embedding_cache.db")
+    return {
+        "cache_path": cache_path or None,
+        "name_threshold": config.getfloat("vector", "name_match_threshold", fallback=0.75),
+        "query_cache_size": config.getint("vector", "query_cache_size", fallback=1024),
+        "backend": config.get("vector", "backend", fallback="torch"),
+        "onnx_path": config.get("vector", "onnx_path", fallback=None) or None,
+        "onnx_file": config.get("vector", "onnx_file", fallback=None) or None,
+        "store": config.get("vector", "store", fallback="auto"),
+        "flat_dtype": config.get("vector", "flat_dtype", fallback="float32"),
+    }
+
 
 class VectorService:
-    def __init__(self, db_path="data/vector_db", model_name="paraphrase-multilingual-MiniLM-L12-v2"):
+    # 单次 Upsert/Delete 的最大条数 (同时受 Chroma 自身上限约束)
+    UPSERT_BATCH = 1000
+    # 集合元数据结构版本 (1 = 每条记录附带完整 json_data；2 = 精简元数据)
+    SCHEMA_VERSION = 2
+    # 旧版元数据中需要删除的字段
+    LEGACY_META_KEYS = ("json_data", "record_type")
+    # 项目名索引集合 (每个项目名/别名一条向量，ID 为 "<商机ID>#<序号>")
+    NAMES_COLLECTION = "project_names"
+    # 检索片段集合 (小记/需求/关键点，ID 为 "<商机ID>:<类型>[:<序号>]")
+    CHUNKS_COLLECTION = "record_chunks"
+
+    def __init__(self, db_path="data/vector_db", model_name="paraphrase-multilingual-MiniLM-L12-v2",
+                 cache_path=None, name_threshold: float = 0.75, query_cache_size: int = 1024,
+                 backend: str = "torch", onnx_path=None, onnx_file: str = None, store: str = "auto",
+                 flat_path=None, flat_dtype: str = "float32"):
         """
         [初始化] 启动后台加载线程
         
         参数:
         - db_path: 向量数据库的本地存储路径
         - model_name: 使用的 Embedding 模型名称 (默认多语言小模型)
+        - cache_path: 向量编码缓存 (SQLite) 路径，为空时不启用缓存
+        - name_threshold: 项目名匹配的最低余弦相似度 (见 benchmarks/bench_name_index.py 的校准)
+        - query_cache_size: 查询向量 LRU 缓存的条数上限 (0 = 不缓存)
+        - backend: 推理后端 "torch" (SentenceTransformer) | "onnx" (ONNX Runtime，需先 export-onnx 导出)
+        - onnx_path / onnx_file: ONNX 导出目录与模型文件名 (默认 int8 量化版)
+        - store: 向量存储 "auto" (ChromaDB，不可用时退回内置平铺索引) | "chroma" | "flat"
+        - flat_path / flat_dtype: 平铺索引目录 (默认 <db_path>_flat) 与矩阵精度 ("float32" | "float16")
         """
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"未知的 Embedding 后端: {backend}")
+        if backend == "onnx" and not onnx_path:
+            raise ValueError("ONNX 后端需要配置 onnx_path")
+        if store not in ("auto", "chroma", "flat"):
+            raise ValueError(f"未知的向量存储: {store}")
         
         # 确保数据目录存在
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.model_name = model_name
+        self.backend = backend
+        self.onnx_path = onnx_path
+        self.onnx_file = onnx_file or "model_qint8.onnx"
+        # 向量来源标识 (模型 + 后端)：不同后端的向量不可混用，编码缓存与集合都以此区分
+        self.embedder_id = model_name if backend == "torch" else f"{model_name}@onnx/{self.onnx_file}"
+        self.store = store
+        self.flat_path = Path(flat_path) if flat_path else self.db_path.with_name(self.db_path.name + "_flat")
+        self.flat_dtype = flat_dtype
         
         # [内部状态]
         self.model = None       # Embedding 模型实例
-        self.client = None      # ChromaDB 客户端
+        self.client = None      # ChromaDB 客户端 (或内置平铺索引 FlatClient)
+        self.store_kind = None  # 实际使用的向量存储 "chroma" | "flat"
         self.collection = None  # ChromaDB 集合 (Table)
+        self.names = None       # 项目名/别名集合 (余弦距离)
+        self.chunks = None      # 小记/需求/关键点片段集合 (余弦距离)
+        self.name_threshold = name_threshold
+        self.embedding_cache = EmbeddingCache(cache_path) if cache_path else None
+        self.query_cache = QueryEmbeddingCache(query_cache_size)
         
         # [线程控制] 用于同步主线程和加载线程
         self._init_event = threading.Event()
         self._init_error = None
+        # [启动耗时] 各阶段秒数 (first_query_ms 为就绪后第一次检索的耗时)
+        self._started = time.perf_counter()
+        self._startup = {"model_load_s": None, "store_open_s": None, "indexes_s": None, "ready_s": None,
+                         "first_query_ms": None}
         
         # [启动后台线程]
         # 这样主程序可以立刻启动 UI，不用等模型加载完
@@ -62,16 +212,30 @@ class VectorService:
         """
         try:
             print("⏳ [VectorService] 后台正在加载 Embedding 模型...")
-            # 1. 加载 HuggingFace 模型 (第一次会下载，比较慢)
-            self.model = SentenceTransformer(self.model_name)
+            # 1. 加载 Embedding 模型 (PyTorch 第一次会下载，比较慢；ONNX 从本地导出目录加载)
+            phase = time.perf_counter()
+            self.model = self._load_model()
+            self._startup["model_load_s"] = round(time.perf_counter() - phase, 3)
             
             print("⏳ [VectorService] 后台正在连接 ChromaDB...")
-            # 2. 初始化持久化向量数据库
-            self.client = chromadb.PersistentClient(path=str(self.db_path))
-            # 获取或创建名为 'sales_knowledge' 的集合
-            self.collection = self.client.get_or_create_collection(name="sales_knowledge")
-            
-            print("✅ [VectorService] 向量引擎后台加载完成！")
+            # 2. 初始化持久化向量数据库，获取或创建名为 'sales_knowledge' 的集合
+            phase = time.perf_counter()
+            self.client, self.collection = self._open_store()
+            # 3. 旧版集合 (元数据内嵌完整 JSON) 一次性迁移为精简元数据
+            self._migrate_metadata()
+            self._check_embedder()
+            self._startup["store_open_s"] = round(time.perf_counter() - phase, 3)
+            # 4. 项目名索引 (早期版本没有该集合时从主集合元数据回填)
+            phase = time.perf_counter()
+            self.names = self._open_names()
+            self._backfill_names()
+            # 5. 检索片段索引 (需要完整商机，旧库由 vector-sync 补齐)
+            self.chunks = self._open_chunks()
+            self._startup["indexes_s"] = round(time.perf_counter() - phase, 3)
+            self._startup["ready_s"] = round(time.perf_counter() - self._started, 3)
+
+            print(f"✅ [VectorService] 向量引擎后台加载完成！(模型 {self._startup['model_load_s']}s / "
+                  f"向量库 {self._startup['store_open_s']}s / 索引 {self._startup['indexes_s']}s)")
         except Exception as e:
             print(f"❌ [VectorService] 初始化失败: {e}")
             self._init_error = e
@@ -79,6 +243,238 @@ class VectorService:
             # 无论成功失败，都设置 Event，通知主线程等待结束
             self._init_event.set()
 
+    def _open_store(self):
+        """
+        [向量存储] 优先使用 ChromaDB；未安装或无法打开时 (store = auto) 退回内置平铺索引，
+        语义检索与项目名查重照常可用。返回 (client, 主集合)。
+        """
+        if self.store != "flat":
+            try:
+                import chromadb
+                client = chromadb.PersistentClient(path=str(self.db_path))
+                collection = client.get_or_create_collection(name="sales_knowledge")
+                self.store_kind = "chroma"
+                return client, collection
+            except Exception as e:
+                if self.store == "chroma":
+                    raise
+                print(f"⚠️ [VectorService] ChromaDB 不可用 ({e})，改用内置平铺向量索引 {self.flat_path}")
+        from src.services.flat_index import FlatClient
+        client = FlatClient(self.flat_path, dtype=self.flat_dtype)
+        self.store_kind = "flat"
+        return client, client.get_or_create_collection(name="sales_knowledge")
+
+    def _load_model(self):
+        if self.backend == "onnx":
+            from src.services.embedding_backends import OnnxEncoder
+            return OnnxEncoder(self.onnx_path, file_name=self.onnx_file)
+        global SentenceTransformer
+        if SentenceTransformer is None:
+            from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+    def _check_embedder(self):
+        """[一致性] 集合中的向量由其他模型/后端生成时给出提示 (需全量重建才能混用检索)"""
+        meta = self.collection.metadata or {}
+        previous = meta.get("embedder")
+        if previous == self.embedder_id:
+            return
+        if previous and self.collection.count() > 0:
+            print(f"⚠️ [VectorService] 向量库由 {previous} 生成，当前为 {self.embedder_id}，"
+                  f"请运行 vector-sync --full 重建。")
+            return
+        self.collection.modify(metadata=dict(meta, embedder=self.embedder_id))
+
+    def _schema_version(self) -> int:
+        return int((self.collection.metadata or {}).get("schema_version", 1))
+
+    def _mark_schema(self):
+        meta = dict(self.collection.metadata or {})
+        meta["schema_version"] = self.SCHEMA_VERSION
+        self.collection.modify(metadata=meta)
+
+    def _migrate_metadata(self, page_size: int = 1000, progress=None) -> int:
+        """
+        [数据迁移] v1 -> v2：删除元数据中的 json_data / record_type，补齐 content_hash
+        向量与文档不变，只改写元数据；返回改写的记录数。
+        """
+        if self._schema_version() >= self.SCHEMA_VERSION:
+            return 0
+        total = self.collection.count()
+        if total == 0:
+            # 新建的空集合直接标记为最新结构
+            self._mark_schema()
+            return 0
+        print(f"🧹 [VectorService] 正在精简向量库元数据 ({total} 条)...")
+        migrated = 0
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            updates = []
+            for rid, meta in zip(ids, page.get("metadatas") or []):
+                meta = meta or {}
+                if not any(k in meta for k in self.LEGACY_META_KEYS):
+                    continue
+                patch_meta = {k: None for k in self.LEGACY_META_KEYS if k in meta}  # None = 删除该字段
+                if not meta.get("content_hash") and meta.get("json_data"):
+                    try:
+                        patch_meta["content_hash"] = content_hash(json.loads(meta["json_data"]))
+                    except Exception:
+                        pass
+                updates.append((rid, patch_meta))
+            if updates:
+                self.collection.update(ids=[u[0] for u in updates], metadatas=[u[1] for u in updates])
+                migrated += len(updates)
+            if progress:
+                progress(min(offset + len(ids), total), total)
+            if len(ids) < page_size:
+                break
+            offset += page_size
+        self._mark_schema()
+        self._vacuum()
+        return migrated
+
+    def _vacuum(self):
+        """[维护] 收缩 Chroma 的 SQLite 文件 (删除大段元数据后空间不会自动归还磁盘)，失败不影响使用"""
+        if self.store_kind != "chroma":
+            return
+        try:
+            conn = sqlite3.connect(str(self.db_path / "chroma.sqlite3"))
+            conn.execute("VACUUM")
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ [VectorService] 向量库空间回收失败: {e}")
+
+    def _open_names(self):
+        return self.client.get_or_create_collection(
+            name=self.NAMES_COLLECTION, configuration={"hnsw": {"space": "cosine"}}
+        )
+
+    def _open_chunks(self):
+        return self.client.get_or_create_collection(
+            name=self.CHUNKS_COLLECTION, configuration={"hnsw": {"space": "cosine"}}
+        )
+
+    def _backfill_names(self, page_size: int = 1000) -> int:
+        """[数据迁移] 项目名索引为空而主集合有数据时，按主集合元数据中的项目名回填"""
+        if self.names.count() > 0 or self.collection.count() == 0:
+            return 0
+        print("🧹 [VectorService] 正在构建项目名索引...")
+        filled = 0
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            rows = []
+            for rid, meta in zip(ids, page.get("metadatas") or []):
+                meta = meta or {}
+                name = meta.get("project_name")
+                if not name and meta.get("json_data"):
+                    name = json.loads(meta["json_data"]).get("project_opportunity", {}).get("project_name")
+                rows.append((rid, {"project_name": name, "sales_rep": meta.get("sales_rep", "未知")}))
+            filled += self._index_names(rows, batch_size=64)
+            if len(ids) < page_size:
+                return filled
+            offset += page_size
+
+    def _index_names(self, rows: list, batch_size: int, pool=None) -> int:
+        """
+        [项目名索引] rows = [(商机ID, 商机字典)]，为每个项目名/别名写入一条向量
+        商机的别名变少时，多出来的旧条目一并删除。返回写入条数。
+        """
+        if not rows:
+            return 0
+        entries = []
+        for rid, record in rows:
+            display = (record.get("project_opportunity") or {}).get("project_name") or record.get("project_name")
+            for i, name in enumerate(project_names(record)):
+                entries.append((f"{rid}#{i}", rid, name, str(display or name), str(record.get("sales_rep", "未知"))))
+        ids = [str(rid) for rid, _ in rows]
+        existing = set(self.names.get(where={"record_id": {"$in": ids}}, include=[])["ids"])
+        self._drop_names(existing - {e[0] for e in entries})
+        if entries:
+            embeddings = self._embed_texts([f"name:{e[0]}" for e in entries], [e[2] for e in entries],
+                                           batch_size, pool)
+            self.names.upsert(
+                ids=[e[0] for e in entries],
+                embeddings=embeddings,
+                metadatas=[{"record_id": e[1], "name": e[2], "project_name": e[3], "sales_rep": e[4]}
+                           for e in entries]
+            )
+        return len(entries)
+
+    def _drop_names(self, entry_ids):
+        entry_ids = list(entry_ids)
+        if not entry_ids:
+            return
+        self.names.delete(ids=entry_ids)
+        if self.embedding_cache is not None:
+            self.embedding_cache.forget([f"name:{e}" for e in entry_ids])
+
+    def _delete_names_for(self, record_ids: list):
+        for start in range(0, len(record_ids), 1000):
+            part = record_ids[start:start + 1000]
+            self._drop_names(self.names.get(where={"record_id": {"$in": part}}, include=[])["ids"])
+
+    def _index_chunks(self, rows: list, batch_size: int, pool=None) -> int:
+        """
+        [片段索引] rows = [(商机ID, 商机字典)]
+        按片段文本指纹增量更新：只编码新增/变化的片段，删除已不存在的片段。返回编码的片段数。
+        """
+        if not rows:
+            return 0
+        current = {}
+        for rid, record in rows:
+            display = (record.get("project_opportunity") or {}).get("project_name") or record.get("project_name")
+            for cid, kind, seq, text in record_chunks(rid, record):
+                current[cid] = (text, {
+                    "record_id": str(rid), "kind": kind, "seq": seq,
+                    "project_name": str(display or "未命名"),
+                    "sales_rep": str(record.get("sales_rep", "未知")),
+                    "digest": hashlib.sha1(text.encode("utf-8")).hexdigest()
+                })
+        existing = {}
+        ids = [str(rid) for rid, _ in rows]
+        for start in range(0, len(ids), 1000):
+            page = self.chunks.get(where={"record_id": {"$in": ids[start:start + 1000]}}, include=["metadatas"])
+            for cid, meta in zip(page["ids"], page["metadatas"]):
+                existing[cid] = (meta or {}).get("digest")
+
+        self._drop_chunks(set(existing) - set(current))
+        todo = [cid for cid, (_, meta) in current.items() if existing.get(cid) != meta["digest"]]
+        chunk = self._max_upsert_batch()
+        for start in range(0, len(todo), chunk):
+            part = todo[start:start + chunk]
+            embeddings = self._embed_texts([f"chunk:{cid}" for cid in part], [current[cid][0] for cid in part],
+                                           batch_size, pool)
+            self.chunks.upsert(ids=part, embeddings=embeddings, metadatas=[current[cid][1] for cid in part])
+        return len(todo)
+
+    def _drop_chunks(self, chunk_ids):
+        chunk_ids = list(chunk_ids)
+        for start in range(0, len(chunk_ids), 1000):
+            self.chunks.delete(ids=chunk_ids[start:start + 1000])
+        if chunk_ids and self.embedding_cache is not None:
+            self.embedding_cache.forget([f"chunk:{c}" for c in chunk_ids])
+
+    def _delete_chunks_for(self, record_ids: list):
+        for start in range(0, len(record_ids), 1000):
+            part = record_ids[start:start + 1000]
+            self._drop_chunks(self.chunks.get(where={"record_id": {"$in": part}}, include=[])["ids"])
+
+    def chunked_record_ids(self, page_size: int = 1000, timeout: float = 30.0) -> set:
+        """[一致性] 片段索引中出现过的商机 ID (vector-sync 据此发现缺少片段的商机)"""
+        self._ensure_initialized(timeout=timeout)
+        found = set()
+        offset = 0
+        while True:
+            page = self.chunks.get(include=["metadatas"], limit=page_size, offset=offset)
+            found.update((meta or {}).get("record_id") for meta in page.get("metadatas") or [])
+            if len(page.get("ids") or []) < page_size:
+                return found
+            offset += page_size
+
     def _ensure_initialized(self, timeout: float = 30.0):
         """
         [状态守卫] 确保服务已就绪
@@ -95,6 +491,22 @@ class VectorService:
         if self._init_error:
             raise RuntimeError(f"VectorService failed to initialize: {self._init_error}")
 
+    def is_ready(self) -> bool:
+        """[状态] 引擎已加载完成且可用 (不阻塞)；加载中或失败时返回 False"""
+        return self._init_event.is_set() and self._init_error is None
+
+    def is_loading(self) -> bool:
+        """[状态] 后台仍在加载 (不阻塞)；加载失败后返回 False，调用方按不可用处理而不是继续等待"""
+        return not self._init_event.is_set()
+
+    def startup_report(self) -> dict:
+        """[诊断] 启动各阶段耗时 (秒)；未完成的阶段为 None"""
+        return dict(self._startup, store=self.store_kind, status=self.status())
+
+    def _note_query(self, started: float):
+        if self._startup["first_query_ms"] is None:
+            self._startup["first_query_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
     def status(self):
         """检查当前服务状态 (用于 UI 展示)"""
         if self._init_error:
@@ -117,23 +529,12 @@ class VectorService:
         text += f"关键点: {', '.join(record.get('key_points', []))}"
         return text
 
-    def add_record(self, record_id: int, record_data: dict, timeout: float = 30.0):
+    def _record_metadata(self, record_data: dict) -> dict:
         """
-        [核心功能] 添加或更新一条记录
-
-        参数:
-        - timeout: 初始化超时时间(秒)
+        [元数据提取] (Metadata Extraction)
+        将关键字段单独拆分存入 metadata，以便后续使用 where 语句进行精确过滤
+        注意：Chroma 的 metadata 只能存简单类型 (str, int, float, bool)
         """
-        self._ensure_initialized(timeout=timeout) # 确保就绪
-        
-        # 1. 生成内容向量
-        content_text = self._format_record(record_data)
-        embedding = self.model.encode(content_text).tolist()
-        
-        # 2. [元数据提取] (Metadata Extraction)
-        # 将关键字段单独拆分存入 metadata，以便后续使用 where 语句进行精确过滤
-        # 注意：Chroma 的 metadata 只能存简单类型 (str, int, float, bool)
-        
         # 提取项目名 (兼容多层级)
         p_name = record_data.get("project_opportunity", {}).get("project_name")
         if not p_name: p_name = record_data.get("project_name", "未命名")
@@ -142,21 +543,159 @@ class VectorService:
         stage = record_data.get("opportunity_stage")
         if not stage: stage = record_data.get("project_opportunity", {}).get("opportunity_stage", "")
         
-        meta = {
-            "json_data": json.dumps(record_data, ensure_ascii=False), # 存完整 JSON 方便还原
+        # 完整商机不再存入向量库，检索结果按 ID 从主存储还原 (见 search 的 hydrate 参数)
+        return {
             "sales_rep": str(record_data.get("sales_rep", "未知")),  # <--- 销售过滤的关键
-            "record_type": str(record_data.get("record_type", "商机")),
             "project_name": str(p_name),
-            "stage": str(stage)
+            "stage": str(stage),
+            "content_hash": content_hash(record_data)
         }
 
-        # 3. 存入数据库 (Upsert: 存在则更新，不存在则插入)
-        self.collection.upsert(
-            embeddings=[embedding],
-            documents=[content_text],
-            metadatas=[meta],
-            ids=[str(record_id)]
-        )
+    def _max_upsert_batch(self) -> int:
+        """Chroma 单次写入的最大条数 (不同版本/后端上限不同)"""
+        getter = getattr(self.client, "get_max_batch_size", None)
+        try:
+            limit = int(getter()) if getter else 0
+        except Exception:
+            limit = 0
+        return min(limit or self.UPSERT_BATCH, self.UPSERT_BATCH)
+
+    def _encode_batch(self, texts: list, batch_size: int, pool=None):
+        """[内部] 批量编码；提供多进程池时把编码分摊到所有 CPU 核"""
+        if pool is not None:
+            return self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+        return self.model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+
+    def _encode_query(self, text: str) -> list:
+        """[内部] 查询文本 -> 向量 (经 LRU 缓存，命中时不跑模型)"""
+        return self.query_cache.get_or_encode(text, lambda t: self.model.encode(t).tolist())
+
+    def _embed_texts(self, ids: list, texts: list, batch_size: int, pool=None) -> list:
+        """
+        [内部] 文本 -> 向量；启用缓存时只编码缓存未命中的文本
+        编码完成后记录 (ID -> 缓存 Key)，文本变化后旧向量随之从缓存中清理。
+        """
+        if self.embedding_cache is None:
+            embeddings = self._encode_batch(texts, batch_size, pool)
+            return embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings
+
+        keys = [text_key(self.embedder_id, t) for t in texts]
+        cached = self.embedding_cache.get_many(keys)
+        todo = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in todo:
+                todo[key] = text
+        if todo:
+            encoded = self._encode_batch(list(todo.values()), batch_size, pool)
+            fresh = dict(zip(todo, encoded))
+            self.embedding_cache.put_many(fresh)
+            cached.update(fresh)
+        self.embedding_cache.bind(list(zip(ids, keys)))
+        import numpy as np
+        return [np.asarray(cached[k], dtype=np.float32).tolist() for k in keys]
+
+    def _upsert(self, ids: list, records: list, batch_size: int, progress=None, pool=None) -> int:
+        """
+        [内部] 批量编码 + 分块 Upsert
+        同一批内重复的 ID 只保留最后一条 (Chroma 不允许单次写入重复 ID)。
+        """
+        latest = {}
+        for rid, data in zip(ids, records):
+            latest[str(rid)] = data
+        ids, records = list(latest), list(latest.values())
+
+        chunk = self._max_upsert_batch()
+        written = 0
+        for start in range(0, len(ids), chunk):
+            chunk_ids = ids[start:start + chunk]
+            chunk_records = records[start:start + chunk]
+            # 1. 批量生成内容向量 (缓存命中的直接复用，其余由模型按 batch_size 分批前向)
+            texts = [self._format_record(r) for r in chunk_records]
+            embeddings = self._embed_texts(chunk_ids, texts, batch_size, pool)
+            # 2. 一次写入整块 (Upsert: 存在则更新，不存在则插入)
+            self.collection.upsert(
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[self._record_metadata(r) for r in chunk_records],
+                ids=chunk_ids
+            )
+            # 3. 同步项目名索引与检索片段索引
+            rows = list(zip(chunk_ids, chunk_records))
+            self._index_names(rows, batch_size, pool)
+            self._index_chunks(rows, batch_size, pool)
+            written += len(chunk_ids)
+            if progress:
+                progress(written, len(ids))
+        return written
+
+    def add_record(self, record_id: int, record_data: dict, timeout: float = 30.0):
+        """
+        [核心功能] 添加或更新一条记录
+
+        参数:
+        - timeout: 初始化超时时间(秒)
+        """
+        self._ensure_initialized(timeout=timeout) # 确保就绪
+        self._upsert([record_id], [record_data], batch_size=1)
+
+    def add_records(self, records: list, batch_size: int = 64, timeout: float = 30.0, progress=None,
+                    pool=None) -> int:
+        """
+        [核心功能] 批量添加或更新记录 (重建索引、导入、回填等批量场景使用)
+
+        参数:
+        - records: 商机字典列表，以各自的 "id" 字段作为向量 ID (缺少 id 的跳过)
+        - batch_size: 模型编码的批大小
+        - progress: 可选回调 progress(已写入, 总数)，每写完一块调用一次
+        - pool: 可选多进程编码池 (见 start_encode_pool)
+        返回: 写入条数
+        """
+        self._ensure_initialized(timeout=timeout)
+        records = [r for r in records if r.get("id") is not None]
+        if not records:
+            return 0
+        return self._upsert([r["id"] for r in records], records, batch_size=batch_size, progress=progress,
+                            pool=pool)
+
+    def start_encode_pool(self, workers: int = None, timeout: float = 30.0):
+        """
+        [批量编码] 启动多进程编码池 (每个 CPU 核一个进程)，用于全量重建
+        用完必须调用 stop_encode_pool 释放子进程。
+        """
+        self._ensure_initialized(timeout=timeout)
+        if not hasattr(self.model, "start_multi_process_pool"):
+            return None  # ONNX Runtime 单进程内已用满所有核 (intra-op 线程)
+        workers = workers or os.cpu_count() or 1
+        return self.model.start_multi_process_pool(["cpu"] * workers)
+
+    def stop_encode_pool(self, pool):
+        """[批量编码] 关闭多进程编码池"""
+        if pool is not None:
+            self.model.stop_multi_process_pool(pool)
+
+    def indexed_hashes(self, page_size: int = 1000, timeout: float = 30.0) -> dict:
+        """
+        [一致性] 分页读取向量库中全部记录的内容指纹 {id: content_hash}
+        早期写入的记录没有 content_hash 元数据时，从存档的 json_data 现场计算。
+        """
+        self._ensure_initialized(timeout=timeout)
+        hashes = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            ids = page.get("ids") or []
+            for rid, meta in zip(ids, page.get("metadatas") or []):
+                meta = meta or {}
+                digest = meta.get("content_hash")
+                if not digest and meta.get("json_data"):
+                    try:
+                        digest = content_hash(json.loads(meta["json_data"]))
+                    except Exception:
+                        digest = None
+                hashes[rid] = digest
+            if len(ids) < page_size:
+                return hashes
+            offset += page_size
 
     def delete_record(self, record_id: str, timeout: float = 30.0):
         """
@@ -168,14 +707,43 @@ class VectorService:
         self._ensure_initialized(timeout=timeout)
         try:
             self.collection.delete(ids=[str(record_id)])
+            self._delete_names_for([str(record_id)])
+            self._delete_chunks_for([str(record_id)])
+            if self.embedding_cache is not None:
+                self.embedding_cache.forget([record_id])
             return True
         except Exception as e:
             # 删除失败通常不影响主流程，记录即可
             return False
 
+    def delete_records(self, ids: list, timeout: float = 30.0) -> int:
+        """
+        [核心功能] 批量删除记录 (分块提交)
+        返回: 提交删除的 ID 数 (不存在的 ID 会被 Chroma 忽略)
+        """
+        self._ensure_initialized(timeout=timeout)
+        ids = list(dict.fromkeys(str(i) for i in ids))
+        chunk = self._max_upsert_batch()
+        for start in range(0, len(ids), chunk):
+            self.collection.delete(ids=ids[start:start + chunk])
+        self._delete_names_for(ids)
+        self._delete_chunks_for(ids)
+        if self.embedding_cache is not None:
+            self.embedding_cache.forget(ids)
+        return len(ids)
+
+    def cache_stats(self):
+        """[统计] 向量编码缓存命中情况；未启用缓存时返回 None"""
+        return self.embedding_cache.stats() if self.embedding_cache is not None else None
+
+    def query_cache_stats(self) -> dict:
+        """[统计] 查询向量 LRU 缓存命中情况"""
+        return self.query_cache.stats()
+
     def reset_db(self, timeout: float = 30.0):
         """
         [危险操作] 清空所有数据
+        向量编码缓存保留不动：随后的全量重建可直接复用其中的向量。
 
         参数:
         - timeout: 初始化超时时间(秒)
@@ -184,12 +752,18 @@ class VectorService:
         try:
             self.client.delete_collection("sales_knowledge")
             self.collection = self.client.get_or_create_collection(name="sales_knowledge")
+            self._mark_schema()
+            self._check_embedder()
+            self.client.delete_collection(self.NAMES_COLLECTION)
+            self.names = self._open_names()
+            self.client.delete_collection(self.CHUNKS_COLLECTION)
+            self.chunks = self._open_chunks()
             return True
         except Exception as e:
             print(f"Reset failed: {e}")
             return False
 
-    def search(self, query: str, top_k=5, where_filter: dict = None, timeout: float = 30.0):
+    def search(self, query: str, top_k=5, where_filter: dict = None, hydrate=None, timeout: float = 30.0):
         """
         [核心功能] 语义搜索
 
@@ -197,68 +771,126 @@ class VectorService:
         - query: 用户的问题或搜索词
         - top_k: 返回最相似的前 K 条
         - where_filter: 过滤条件 (例如 {"sales_rep": "张三"})
+        - hydrate: 按 ID 还原完整商机的回调 hydrate(id) -> dict | None (通常为 Controller 缓存)；
+          返回 None 的命中 (主存储中已删除) 会被跳过。不提供时只返回精简元数据。
         - timeout: 初始化超时时间(秒)
         """
         self._ensure_initialized(timeout=timeout)
+        started = time.perf_counter()
         
-        # 1. 将查询词转换为向量
-        query_embedding = self.model.encode(query).tolist()
+        # 1. 将查询词转换为向量 (归一化后经 LRU 缓存)
+        query_embedding = self._encode_query(normalize_query(query))
         
-        # 2. 在数据库中执行向量近邻搜索
+        # 2. 在数据库中执行向量近邻搜索 (只取元数据，不拉取文档正文)
         results = self.collection.query(
             query_embeddings=[query_embedding],
             n_results=top_k,
-            where=where_filter  # <--- 精确过滤条件
+            where=where_filter,  # <--- 精确过滤条件
+            include=["metadatas"]
         )
         
-        # 3. 解析结果，提取原始 JSON 数据
+        # 3. 按 ID 还原商机
         history_snippets = []
-        if results and "metadatas" in results:
-            for meta_list in results["metadatas"]:
-                for meta in meta_list:
-                    # 从 metadata 中还原完整的 JSON 对象
+        if results and results.get("ids"):
+            for rid, meta in zip(results["ids"][0], (results.get("metadatas") or [[]])[0]):
+                meta = meta or {}
+                if "json_data" in meta:
+                    # 尚未迁移的旧版记录：元数据中自带完整 JSON
                     history_snippets.append(json.loads(meta["json_data"]))
+                elif hydrate is not None:
+                    data = hydrate(rid)
+                    if data is not None:
+                        history_snippets.append(data)
+                else:
+                    history_snippets.append(dict(meta, id=rid))
+        self._note_query(started)
         return history_snippets
 
-    def search_projects(self, project_name: str, top_k=3, threshold=1.2, timeout: float = 30.0):
+    def search_chunks(self, query: str, top_k: int = 8, where_filter: dict = None, hydrate=None,
+                      timeout: float = 30.0):
+        """
+        [核心功能] 片段级语义检索 (RAG 上下文)
+
+        参数:
+        - query: 用户的问题
+        - top_k: 返回最相关的前 K 个片段
+        - where_filter: 片段元数据过滤 (例如 {"sales_rep": "张三"} 或 {"kind": "log"})
+        - hydrate: 按商机 ID 取完整商机的回调，用于还原片段正文；商机已删除或片段已不存在时跳过
+        返回: [{"id" (片段 ID), "record_id", "project_name", "sales_rep", "kind", "seq", "text", "score"}]，
+              按相关度降序；未提供 hydrate 时 text 为 None
+        """
+        self._ensure_initialized(timeout=timeout)
+        started = time.perf_counter()
+        query_embedding = self._encode_query(normalize_query(query))
+        results = self.chunks.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            where=where_filter,
+            include=["metadatas", "distances"]
+        )
+
+        hits = []
+        if results and results.get("ids"):
+            for cid, meta, dist in zip(results["ids"][0], results["metadatas"][0], results["distances"][0]):
+                meta = meta or {}
+                hits.append({
+                    "id": cid,
+                    "record_id": meta.get("record_id"),
+                    "project_name": meta.get("project_name"),
+                    "sales_rep": meta.get("sales_rep"),
+                    "kind": meta.get("kind"),
+                    "seq": meta.get("seq"),
+                    "text": None,
+                    "score": 1.0 - dist
+                })
+        self._note_query(started)
+        return hydrate_chunk_hits(hits, hydrate) if hydrate is not None else hits
+
+    def search_projects(self, project_name: str, top_k=3, threshold: float = None, timeout: float = 30.0):
         """
         [专用功能] 项目名相似度搜索
         用于检查项目是否已存在，或者根据模糊名称找项目。
+        只在项目名/别名索引中检索 (余弦距离)，同一商机的多个别名只保留最相似的一条。
 
         参数:
-        - threshold: 距离阈值 (L2距离)。越小越相似，超过此值则丢弃。
+        - threshold: 最低余弦相似度 (0~1，越大越严格)，默认取 name_threshold
         - timeout: 初始化超时时间(秒)
+        返回: [{"id", "project_name", "sales_rep", "distance" (余弦距离), "score" (余弦相似度)}]，按相似度降序
         """
         self._ensure_initialized(timeout=timeout)
-        query_embedding = self.model.encode(project_name).tolist()
-        
-        results = self.collection.query(
+        started = time.perf_counter()
+        threshold = self.name_threshold if threshold is None else threshold
+        query = normalize_name(project_name)
+        if not query:
+            return []
+        query_embedding = self._encode_query(query)
+
+        # 多取几条，给同一商机的别名去重留余量
+        results = self.names.query(
             query_embeddings=[query_embedding],
-            n_results=top_k,
+            n_results=top_k * 2,
+            include=["metadatas", "distances"]
         )
-        
+
         matches = []
-        if results and "metadatas" in results:
-            ids = results["ids"][0]
-            metadatas = results["metadatas"][0]
-            # 获取距离 (0=完全一致)
-            distances = results["distances"][0] if "distances" in results else [0]*len(ids)
-            
-            for rid, meta, dist in zip(ids, metadatas, distances):
-                # 过滤掉距离太远的结果 (不相关)
-                if dist > threshold:
+        seen = set()
+        if results and results.get("ids"):
+            for meta, dist in zip(results["metadatas"][0], results["distances"][0]):
+                meta = meta or {}
+                score = 1.0 - dist
+                rid = meta.get("record_id")
+                # 过滤掉相似度不足的结果 (不相关)
+                if score < threshold or rid in seen:
                     continue
-
-                try:
-                    data = json.loads(meta["json_data"])
-                    p_name = data.get("project_opportunity", {}).get("project_name")
-                    if not p_name: p_name = data.get("project_name", "未知项目")
-                    
-                    matches.append({
-                        "id": rid,
-                        "project_name": p_name,
-                        "sales_rep": data.get("sales_rep", "未知"),
-                        "distance": dist
-                    })
-                except: pass
+                seen.add(rid)
+                matches.append({
+                    "id": rid,
+                    "project_name": meta.get("project_name") or "未知项目",
+                    "sales_rep": meta.get("sales_rep", "未知"),
+                    "distance": dist,
+                    "score": score
+                })
+                if len(matches) >= top_k:
+                    break
+        self._note_query(started)
         return matches
@@ -0,0 +1,61 @@
+"""
+LinkSell 商机缓存单元测试 (Cache Tests)
+
+职责：
+- 验证 LRU 淘汰顺序与字节预算
+- 验证同一 Key 只保留一个版本
+- 验证返回副本与缓存隔离 (修改嵌套字段不污染缓存)
+"""
+
+import sys
+import os
+import unittest
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.cache import OpportunityCache
+
+
+class TestOpportunityCache(unittest.TestCase):
+    def test_stale_version_replaced(self):
+        """[测试场景] 版本戳变化后旧版本失效，且不会堆积多个条目"""
+        cache = OpportunityCache()
+        cache.put("a.json", 1.0, {"v": 1})
+        cache.put("a.json", 2.0, {"v": 2})
+
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.get("a.json", 1.0))
+        self.assertEqual(cache.get("a.json", 2.0), {"v": 2})
+
+    def test_lru_eviction_by_bytes(self):
+        """[测试场景] 超出字节预算时淘汰最久未使用的条目"""
+        payload = "x" * 400
+        cache = OpportunityCache(max_bytes=1300)
+        cache.put("a", 1, {"p": payload})
+        cache.put("b", 1, {"p": payload})
+        cache.get("a", 1)  # a 变为最近使用
+        cache.put("c", 1, {"p": payload})
+        cache.put("d", 1, {"p": payload})
+
+        self.assertIsNone(cache.get("b", 1))
+        self.assertIsNotNone(cache.get("a", 1))
+        stats = cache.stats()
+        self.assertLessEqual(stats["cache_bytes"], 1300)
+        self.assertGreaterEqual(stats["cache_evictions"], 1)
+
+    def test_returned_copy_is_isolated(self):
+        """[测试场景] 修改返回值的嵌套字段不影响缓存"""
+        cache = OpportunityCache()
+        cache.put("a", 1, {"record_logs": [{"content": "原始"}]})
+
+        view = cache.get("a", 1)
+        view["record_logs"].append({"content": "篡改"})
+        view["_temp_id"] = "1"
+
+        self.assertEqual(cache.get("a", 1), {"record_logs": [{"content": "原始"}]})
+        self.assertEqual(cache.stats()["cache_hits"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
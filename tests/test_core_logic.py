@@ -104,5 +104,61 @@ class TestCoreLogic(unittest.TestCase):
         self.assertEqual(result["type"], "record")
         self.assertIn("笔记已暂存", result["message"])
 
+    def test_handle_list_projection(self):
+        """
+        [测试场景] LIST 全量列表 - 摘要投影记录
+        预期：精简记录 (无 project_opportunity) 也能正确渲染项目名、阶段与销售
+        """
+        self.mock_ctrl.process_list_request.return_value = {
+            "results": [{"id": "201", "project_name": "大连港口", "stage": "3", "sales_rep": "李四"}],
+            "message": "📋 找到 1 条商机"
+        }
+        self.mock_ctrl.stage_map = {"3": "P3 商务谈判"}
+        self.mock_ctrl.parse_list_filters.return_value = ({}, "")
+
+        result = self.engine.handle_list("列出所有项目")
+
+        self.assertEqual(result["type"], "list")
+        self.assertIn("**大连港口** | P3 商务谈判 | 李四", result["report_text"])
+
+    def test_handle_list_structured(self):
+        """
+        [测试场景] LIST 结构化条件 - 直接走二级索引
+        预期：识别出过滤条件时不再调用 LLM 搜索词提取 (process_list_request)
+        """
+        self.mock_ctrl.parse_list_filters.return_value = ({"stage": ["3"], "sales_rep": ["张三"]}, "")
+        self.mock_ctrl.process_structured_list.return_value = {
+            "results": [{"id": "301", "project_name": "沈阳机床", "stage": "3", "sales_rep": "张三"}],
+            "message": "📋 找到 1 条商机"
+        }
+        self.mock_ctrl.stage_map = {"3": "P3 商务谈判"}
+
+        result = self.engine.handle_list("张三的P3单子")
+
+        self.mock_ctrl.process_structured_list.assert_called_once_with({"stage": ["3"], "sales_rep": ["张三"]},
+                                                                      keyword=None)
+        self.mock_ctrl.process_list_request.assert_not_called()
+        self.assertIn("**沈阳机床** | P3 商务谈判 | 张三", result["report_text"])
+
+    def test_fused_nlu_skips_search_term_call(self):
+        """
+        [测试场景] 融合 NLU - 一次调用给出意图与搜索词
+        预期：不再单独调用意图识别与搜索词提取，直接用融合结果检索
+        """
+        self.mock_ctrl.fused_nlu = True
+        self.mock_ctrl.understand.return_value = {
+            "intent": "GET", "content": "沈阳项目", "search_term": "沈阳", "filters": {}
+        }
+        self.mock_ctrl.last_search_partial = False
+        self.mock_ctrl.find_potential_matches.return_value = []
+
+        result = self.engine.handle_user_input("查看沈阳项目")
+
+        self.assertEqual(result["type"], "error")
+        self.mock_ctrl.find_potential_matches.assert_called_once_with("沈阳")
+        self.mock_ctrl.identify_intent.assert_not_called()
+        self.mock_ctrl.extract_search_term.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
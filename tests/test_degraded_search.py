@@ -0,0 +1,120 @@
+"""
+LinkSell 向量引擎加载期间的降级检索测试 (Degraded Search Tests)
+
+职责：
+- 验证引擎未就绪时 find_potential_matches 不阻塞、只返回关键字结果并标记为部分结果
+- 验证加载期间的向量检索登记到后台，引擎就绪后执行一次作为预热
+- 验证加载失败后不再标记为部分结果、不登记后台任务
+- 验证 wait_for_engine 时照常走向量检索
+
+特点：
+- **No Model**: 用可控就绪状态的替身代替 VectorService
+"""
+
+import sys
+import os
+import configparser
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LoadingVectorService:
+    """[测试替身] 调用 ready.set() 之前视为仍在加载 (error 非空表示加载失败)；search_projects 记录调用"""
+
+    def __init__(self, *args, **kwargs):
+        self.ready = threading.Event()
+        self.error = None
+        self.project_queries = []
+
+    def is_loading(self):
+        return not self.ready.is_set()
+
+    def _ensure_initialized(self, timeout=30.0):
+        if not self.ready.wait(timeout):
+            raise TimeoutError("loading")
+        if self.error:
+            raise RuntimeError(self.error)
+
+    def search_projects(self, project_name, top_k=3, threshold=None, timeout=30.0):
+        self._ensure_initialized(timeout)
+        self.project_queries.append(project_name)
+        return [{"id": "u-9", "project_name": "沈阳智慧园区", "sales_rep": "李四", "score": 0.9}]
+
+    def startup_report(self):
+        return {"status": "Loading..." if self.is_loading() else "Ready"}
+
+
+class TestDegradedSearch(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+
+        config = configparser.ConfigParser()
+        config["storage"] = {"backend": "sqlite", "sqlite_path": "data/linksell.db"}
+        config["vector"] = {"index_queue": "", "daemon_socket": ""}
+        Path("config").mkdir()
+        with open("config/config.ini", "w", encoding="utf-8") as f:
+            config.write(f)
+
+        with patch("src.core.controller.VectorService", LoadingVectorService):
+            from src.core.controller import LinkSellController
+            self.ctrl = LinkSellController()
+        self.vectors = self.ctrl.vector_service
+        self.vectors.ready.set()
+        self.ctrl.overwrite_opportunity({"id": "u-1", "sales_rep": "张三",
+                                         "project_opportunity": {"project_name": "沈阳项目"}})
+        self.vectors.ready.clear()
+
+    def tearDown(self):
+        self.vectors.ready.set()
+        if self.ctrl._deferred_executor is not None:
+            self.ctrl._deferred_executor.shutdown(wait=True)
+        self.ctrl.store.close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_loading_engine_returns_partial_keyword_results(self):
+        """[测试场景] 加载中：立即返回关键字结果并标记 partial；就绪后后台执行一次预热检索"""
+        matches = self.ctrl.find_potential_matches("沈阳")
+        self.assertTrue(self.ctrl.last_search_partial)
+        self.assertEqual([(m["id"], m.get("partial")) for m in matches], [("u-1", True)])
+        self.assertEqual(self.vectors.project_queries, [])
+        self.assertTrue(self.ctrl.process_list_request("沈阳", search_term="沈阳")["results"])
+        self.assertTrue(self.ctrl.last_search_partial)
+
+        self.vectors.ready.set()
+        self.ctrl._deferred_executor.shutdown(wait=True)
+        self.assertEqual(self.vectors.project_queries, ["沈阳"])
+        self.assertEqual(self.ctrl._deferred, set())
+
+        matches = self.ctrl.find_potential_matches("沈阳")
+        self.assertFalse(self.ctrl.last_search_partial)
+        self.assertEqual(sorted(m["id"] for m in matches), ["u-1", "u-9"])
+
+    def test_failed_engine_is_not_reported_as_loading(self):
+        """[测试场景] 加载失败：照常回退到关键字结果，不标记 partial，不登记后台任务"""
+        self.vectors.error = "model missing"
+        self.vectors.ready.set()
+        with patch.object(self.vectors, "search_projects", side_effect=RuntimeError("failed to initialize")):
+            matches = self.ctrl.find_potential_matches("沈阳")
+        self.assertFalse(self.ctrl.last_search_partial)
+        self.assertEqual([(m["id"], m.get("partial")) for m in matches], [("u-1", None)])
+        self.assertIsNone(self.ctrl._deferred_executor)
+
+    def test_wait_for_engine_blocks_for_vector_results(self):
+        """[测试场景] wait_for_engine=True 时等待加载完成并合并语义结果"""
+        threading.Timer(0.05, self.vectors.ready.set).start()
+        matches = self.ctrl.find_potential_matches("沈阳", wait_for_engine=True)
+        self.assertFalse(self.ctrl.last_search_partial)
+        self.assertIn("u-9", [m["id"] for m in matches])
+
+
+if __name__ == "__main__":
+    unittest.main()
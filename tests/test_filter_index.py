@@ -0,0 +1,104 @@
+"""
+LinkSell 结构化过滤引擎单元测试 (Filter Index Tests)
+
+职责：
+- 验证等值/范围条件的组合查询与增量维护
+- 验证自然语言到结构化条件的规则提取
+
+特点：
+- **Pure**: 不依赖存储与向量库，直接构造清单条目
+"""
+
+import sys
+import os
+import unittest
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.filter_index import FilterIndex, parse_list_filters, filters_from_nlu
+
+
+def make_entry(i, stage="", sales_rep="", budget="", timeline="", mtime=None):
+    return {"file_path": f"data/opportunities/{i}.json", "id": str(i), "mtime": mtime or i,
+            "stage": stage, "sales_rep": sales_rep, "budget": budget, "timeline": timeline}
+
+
+class TestFilterIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FilterIndex()
+        self.entries = [
+            make_entry(1, "3", "张三", "80万", "2024-06-30"),
+            make_entry(2, "3", "张三", "30万", "2024年9月"),
+            make_entry(3, "2", "张三", "1.2亿", ""),
+            make_entry(4, "3", "李四", "60万", "2024-03-01"),
+            make_entry(5, "3", "张三", "待定", ""),
+        ]
+        self.index.sync(self.entries)
+
+    def ids(self, keys):
+        return sorted(k.split("/")[-1][:-5] for k in keys)
+
+    def test_equality_and_range(self):
+        """[测试场景] 阶段 + 销售 + 预算下限组合"""
+        keys = self.index.select({"stage": "3", "sales_rep": ["张三"], "budget": (500000, None)})
+        self.assertEqual(self.ids(keys), ["1"])
+        self.assertEqual(self.ids(self.index.select({"timeline": (None, "2024-07-01")})), ["1", "4"])
+        self.assertIsNone(self.index.select({}))
+        with self.assertRaises(ValueError):
+            self.index.select({"customer": "x"})
+
+    def test_incremental_update(self):
+        """[测试场景] 改写与删除后二级索引同步更新"""
+        self.entries[0] = make_entry(1, "4", "张三", "20万", "", mtime=99)
+        del self.entries[3]
+        self.assertEqual(self.index.sync(self.entries), 2)
+        self.assertEqual(self.ids(self.index.select({"stage": "3"})), ["2", "5"])
+        self.assertEqual(self.ids(self.index.select({"budget": (None, 250000)})), ["1"])
+        self.assertEqual(sorted(self.index.values("sales_rep")), ["张三"])
+
+
+class TestParseListFilters(unittest.TestCase):
+    def test_extracts_structured_conditions(self):
+        """[测试场景] "P3 阶段张三超过50万" -> 阶段 + 销售 + 预算下限"""
+        filters = parse_list_filters("P3阶段张三负责的超过50万的单子", {"3": "P3 商务谈判"}, ["张三", "李四"])
+        self.assertEqual(filters, {"stage": ["3"], "sales_rep": ["张三"], "budget": (500000, None)})
+
+        filters = parse_list_filters("商务谈判中的项目，预算10到20万，2024年6月前", {"3": "P3 商务谈判"})
+        self.assertEqual(filters, {"stage": ["3"], "budget": (100000, 200000), "timeline": (None, "2024-06-01")})
+
+    def test_plain_keyword_yields_nothing(self):
+        """[测试场景] 普通关键字查询不产生结构化条件 (退回全文检索)"""
+        self.assertEqual(parse_list_filters("沈阳机床的项目", {"3": "P3 商务谈判"}, ["张三"]), {})
+        self.assertEqual(parse_list_filters("3个月内的项目"), {})
+
+    def test_rest_keeps_keyword(self):
+        """[测试场景] 条件与关键字混合：剩余关键字保留下来，纯条件查询剩余为空"""
+        stage_map, reps = {"3": "P3 商务谈判"}, ["张三"]
+        self.assertEqual(parse_list_filters("P3阶段的医院项目", stage_map, reps, with_rest=True),
+                         ({"stage": ["3"]}, "医院"))
+        self.assertEqual(parse_list_filters("张三的沈阳机床项目", stage_map, reps, with_rest=True),
+                         ({"sales_rep": ["张三"]}, "沈阳机床"))
+        self.assertEqual(parse_list_filters("P3阶段张三负责的超过50万的单子", stage_map, reps, with_rest=True)[1], "")
+
+    def test_rest_drops_filler_and_sort(self):
+        """[测试场景] 销售/跟进/负责人/名下/有几个 等口语虚词与 "按…排序" 指令不残留为关键字"""
+        stage_map, reps = {"3": "P3 商务谈判"}, ["张三"]
+        for text in ("销售张三的P3商机", "张三跟进的项目", "预算50万以上的项目有几个", "负责人张三的单子",
+                     "张三名下的商机", "张三的单子按预算从高到低", "P3的项目按时间排序"):
+            self.assertEqual(parse_list_filters(text, stage_map, reps, with_rest=True)[1], "", text)
+        self.assertEqual(parse_list_filters("P3的医院项目按预算排序", stage_map, reps, with_rest=True)[1], "医院")
+
+    def test_filters_from_nlu(self):
+        """[测试场景] LLM 融合解析给出的条件：阶段/金额/日期统一规范化，未知销售与阶段被丢弃"""
+        raw = {"stage": ["P3", "商务谈判", "9"], "sales_rep": ["张三", "赵六"],
+               "budget_min": "50万", "budget_max": None, "timeline_before": "2024年6月"}
+        self.assertEqual(filters_from_nlu(raw, {"3": "P3 商务谈判"}, ["张三", "李四"]),
+                         {"stage": ["3"], "sales_rep": ["张三"], "budget": (500000, None),
+                          "timeline": (None, "2024-06-01")})
+        self.assertEqual(filters_from_nlu(None), {})
+        self.assertEqual(filters_from_nlu({"budget_min": "很多"}), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
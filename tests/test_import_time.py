@@ -0,0 +1,53 @@
+"""
+LinkSell 启动导入回归测试 (Import Time Tests)
+
+职责：
+- 用 `python -X importtime` 检查 CLI 入口与核心模块在导入阶段不会加载重型依赖
+  (chromadb / torch / sentence_transformers / numpy / 火山引擎 SDK / 音频库)
+- 这些依赖应在首次使用时才导入，保证 init、--help 等命令秒开
+
+特点：
+- **Subprocess**: 每个用例在全新解释器中运行，不受当前测试进程已导入模块的影响
+- **Dependency-free**: 只检查导入列表，不要求重型依赖已安装
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = {
+    "chromadb", "torch", "sentence_transformers", "transformers", "onnxruntime",
+    "volcenginesdkarkruntime", "sounddevice", "scipy", "numpy",
+}
+
+
+def imported_modules(args: list) -> set:
+    """[辅助] 在子进程中以 -X importtime 运行，返回导入过的顶层包名"""
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT,
+                          capture_output=True, text=True, timeout=120)
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name.split(".")[0])
+    return modules
+
+
+class TestImportTime(unittest.TestCase):
+    def test_cli_help_skips_heavy_imports(self):
+        loaded = imported_modules([os.path.join("src", "main.py"), "--help"])
+        self.assertIn("typer", loaded)
+        self.assertEqual(loaded & HEAVY_MODULES, set())
+
+    def test_core_modules_skip_heavy_imports(self):
+        loaded = imported_modules(["-c", "import src.core.controller, src.core.conversational_engine, "
+                                         "src.services.audio_capture"])
+        self.assertIn("src", loaded)
+        self.assertEqual(loaded & HEAVY_MODULES, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+LinkSell 向量索引写后队列单元测试 (Index Queue Tests)
+
+职责：
+- 验证同一商机的任务去重、任务持久化 (重新打开后仍在)、按批写入与删除
+- 验证处理期间再次保存的商机不会被误删任务，失败时任务保留并退避重试
+- 验证 Controller 保存时只登记任务，检索前的 "读己之写" 等待
+
+特点：
+- **No Model**: 用内存替身代替存储与向量服务，不加载 Embedding 模型
+"""
+
+import sys
+import os
+import configparser
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.index_queue import IndexQueue
+
+
+class FakeStore:
+    def __init__(self):
+        self.records = {}
+
+    def find_key(self, record_id):
+        return f"{record_id}.json" if record_id in self.records else None
+
+    def load(self, key):
+        return self.records.get(key[:-len(".json")])
+
+
+class FakeVectorService:
+    def __init__(self):
+        self.batches = []
+        self.deleted = []
+        self.fail = None
+        self.on_add = None
+
+    def add_records(self, records, batch_size=64, timeout=30.0):
+        if self.fail:
+            raise self.fail
+        self.batches.append([dict(r) for r in records])
+        if self.on_add:
+            self.on_add()
+        return len(records)
+
+    def delete_records(self, ids, timeout=30.0):
+        self.deleted.extend(ids)
+        return len(ids)
+
+
+class TestIndexQueue(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "queue.db")
+        self.store = FakeStore()
+        self.vectors = FakeVectorService()
+        self.queue = IndexQueue(self.store, self.vectors, db_path=self.db_path, start=False)
+
+    def tearDown(self):
+        self.queue.close()
+        self._tmp.cleanup()
+
+    def test_dedup_durable_and_batched(self):
+        """[测试场景] 同一 ID 多次登记只保留一条；重新打开后任务仍在；一批内写入最新内容并处理删除"""
+        self.store.records = {"1": {"v": 1}, "2": {"v": 1}}
+        for _ in range(3):
+            self.queue.enqueue("1")
+        self.queue.enqueue("2")
+        self.queue.enqueue("3", op="delete")
+        self.store.records["1"] = {"v": 3}
+        self.assertEqual(self.queue.depth(), 3)
+
+        self.queue.close()
+        self.queue = IndexQueue(self.store, self.vectors, db_path=self.db_path, start=False)
+        self.assertEqual(self.queue.depth(), 3)
+        self.assertEqual(self.queue.stats()["index_queue_depth"], 3)
+
+        del self.store.records["2"]  # 登记后商机被删除 -> 按删除处理
+        self.assertEqual(self.queue.drain_once(), 3)
+        self.assertEqual(self.vectors.batches, [[{"v": 3, "id": "1"}]])
+        self.assertEqual(sorted(self.vectors.deleted), ["2", "3"])
+        self.assertEqual(self.queue.depth(), 0)
+        self.assertTrue(self.queue.wait(timeout=0))
+
+    def test_requeued_during_processing_and_retry(self):
+        """[测试场景] 处理期间再次保存的任务保留到下一批；失败时任务不丢、记录错误并延后重试"""
+        self.store.records = {"1": {"v": 1}}
+        first = self.queue.enqueue("1")
+        self.vectors.on_add = lambda: self.queue.enqueue("1")
+        self.assertEqual(self.queue.drain_once(), 0)
+        self.assertEqual(self.queue.depth(), 1)
+        self.assertFalse(self.queue.wait(version=first, timeout=0))
+
+        self.vectors.on_add = None
+        self.vectors.fail = RuntimeError("模型加载中")
+        self.assertEqual(self.queue.drain_once(), 0)
+        stats = self.queue.stats()
+        self.assertEqual((stats["index_queue_depth"], stats["index_queue_failures"]), (1, 1))
+        self.assertIn("模型加载中", stats["index_queue_last_error"])
+        self.assertGreater(self.queue._retry_at, 0)
+
+        self.vectors.fail = None
+        self.assertEqual(self.queue.drain_once(), 1)
+        self.assertTrue(self.queue.wait(version=first, timeout=0))
+
+    def test_background_worker_drains(self):
+        """[测试场景] 后台线程自动处理任务，wait 在任务完成后返回"""
+        self.store.records = {"9": {"v": 1}}
+        self.queue.start()
+        self.queue.enqueue("9")
+        self.assertTrue(self.queue.wait(timeout=5))
+        self.assertEqual(self.vectors.batches[-1], [{"v": 1, "id": "9"}])
+
+
+class TestControllerWriteBehind(unittest.TestCase):
+    """[集成测试] Controller 保存只登记任务，检索前等待任务完成"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+
+        config = configparser.ConfigParser()
+        config["storage"] = {"backend": "sqlite", "sqlite_path": "data/linksell.db"}
+        Path("config").mkdir()
+        with open("config/config.ini", "w", encoding="utf-8") as f:
+            config.write(f)
+
+        self.vectors = MagicMock()
+        self.vectors.search_projects.return_value = []
+        with patch("src.core.controller.VectorService", return_value=self.vectors):
+            from src.core.controller import LinkSellController
+            self.ctrl = LinkSellController()
+
+    def tearDown(self):
+        self.ctrl.index_queue.close()
+        self.ctrl.store.close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_save_enqueues_and_search_waits(self):
+        self.assertIsNotNone(self.ctrl.index_queue)
+        opp = {"id": "u-1", "sales_rep": "张三", "project_opportunity": {"project_name": "沈阳项目"}}
+        self.assertTrue(self.ctrl.overwrite_opportunity(opp))
+        self.vectors.add_record.assert_not_called()
+
+        self.ctrl.find_potential_matches("不存在的项目")
+        self.assertEqual(self.ctrl.index_queue.depth(), 0)
+        written = self.vectors.add_records.call_args[0][0]
+        self.assertEqual([r["id"] for r in written], ["u-1"])
+        self.assertEqual(self.ctrl.get_cache_stats()["index_queue_processed"], 1)
+
+        self.assertTrue(self.ctrl.delete_opportunity("u-1"))
+        self.assertTrue(self.ctrl.index_queue.wait(timeout=5))
+        self.vectors.delete_records.assert_called_with(["u-1"], timeout=self.ctrl.index_queue.init_timeout)
+
+
+if __name__ == "__main__":
+    unittest.main()
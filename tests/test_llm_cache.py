@@ -0,0 +1,114 @@
+"""
+LinkSell LLM 响应缓存单元测试 (LLM Response Cache Tests)
+
+职责：
+- 验证启用缓存的调用重复输入时不再请求 LLM，命中率与节省耗时统计正确
+- 验证修改 Prompt 模板后旧回复自动失效、未启用缓存的调用照常直连
+- 验证 TTL 过期与条数上限淘汰
+
+特点：
+- **Offline**: 用计数的假 Ark 客户端代替真实 API
+"""
+
+import sys
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services import llm_service
+from src.services.llm_cache import LLMResponseCache
+
+
+class FakeArk:
+    """[测试替身] 回复 "<系统提示词>|<输入>"，记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, temperature):
+        self.calls += 1
+        reply = f"{messages[0]['content']}|{messages[1]['content']}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f" {reply} "))])
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        Path("config/prompts").mkdir(parents=True)
+        self._write_prompt("polish_text", "润色 v1")
+        self._write_prompt("extract_search_term", "提取搜索词")
+
+        self.ark = FakeArk()
+        self._patch = patch.object(llm_service.ArkClientFactory, "get_client", return_value=self.ark)
+        self._patch.start()
+        self.cache = LLMResponseCache("data/llm_cache.db")
+        llm_service.configure_response_cache(self.cache, ["polish_text"])
+
+    def tearDown(self):
+        llm_service.configure_response_cache(None)
+        self._patch.stop()
+        self.cache.close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _write_prompt(self, name, text):
+        Path(f"config/prompts/{name}.txt").write_text(text, encoding="utf-8")
+
+    def test_hit_and_prompt_invalidation(self):
+        """[测试场景] 重复输入命中缓存；模板修改后重新请求并清除旧回复；未启用的调用不缓存"""
+        first = llm_service.polish_text("保存", "key", "ep-1")
+        self.assertEqual(first, "润色 v1|保存")
+        self.assertEqual(llm_service.polish_text("保存", "key", "ep-1"), first)
+        self.assertEqual(self.ark.calls, 1)
+        llm_service.polish_text("保存", "key", "ep-2")  # 接入点不同 -> 不同 Key
+        self.assertEqual(self.ark.calls, 2)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats["llm_cache_hits"], stats["llm_cache_misses"], stats["llm_cache_entries"]), (1, 2, 2))
+        self.assertGreaterEqual(stats["llm_cache_saved_ms"], 0)
+
+        self._write_prompt("polish_text", "润色 v2")
+        self.assertEqual(llm_service.polish_text("保存", "key", "ep-1"), "润色 v2|保存")
+        self.assertEqual(self.ark.calls, 3)
+        self.assertEqual(self.cache.stats()["llm_cache_invalidated"], 2)
+        self.assertEqual(self.cache.stats()["llm_cache_entries"], 1)
+
+        for _ in range(2):
+            llm_service.extract_search_term("查看沈阳机床", "key", "ep-1")
+        self.assertEqual(self.ark.calls, 5)
+
+        with self.assertRaises(ValueError):
+            llm_service.configure_response_cache(self.cache, ["architect_analyze"])
+
+    def test_ttl_and_size_eviction(self):
+        """[测试场景] 过期回复不再命中；超出条数上限时淘汰最久未使用的"""
+        cache = LLMResponseCache("data/small.db", ttl_s=60, max_entries=2)
+        try:
+            for key in ("a", "b"):
+                cache.put(key, "polish_text", "p", key.upper(), latency_ms=100)
+            self.assertEqual(cache.get("a"), "A")  # a 最近使用 -> b 最旧
+            cache.put("c", "polish_text", "p", "C", latency_ms=100)
+            self.assertIsNone(cache.get("b"))
+            self.assertEqual((cache.get("a"), cache.get("c")), ("A", "C"))
+            self.assertEqual(cache.stats()["llm_cache_entries"], 2)
+            self.assertEqual(cache.stats()["llm_cache_saved_ms"], 300)
+
+            with patch("src.services.llm_cache.time.time", return_value=time.time() + 120):
+                self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.stats()["llm_cache_entries"], 1)
+        finally:
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+LinkSell 数据迁移框架单元测试 (Migration Tests)
+
+职责：
+- 验证待办迁移只执行一次，并写入状态文件
+- 验证完全迁移过的存储启动时不再遍历商机
+- 验证部分商机迁移失败时不记录完成状态，下次启动重试
+- 验证 recorder -> sales_rep 迁移的字段语义
+
+特点：
+- **Isolated**: 使用临时目录中的 JsonFileStore
+"""
+
+import sys
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.storage_service import JsonFileStore
+from src.core.migrations import MigrationRunner, get_migrations
+
+
+class TestMigrationRunner(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = JsonFileStore(Path(self._tmp.name) / "opportunities")
+        self.context = {"default_sales_rep": "默认销售"}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_recorder_migrated_once(self):
+        """
+        [测试场景] 旧数据迁移
+        预期：
+        1. recorder 被迁移到 sales_rep 并删除
+        2. 缺失 sales_rep 的商机被补全默认值
+        3. 修改时间保持不变 (临时 ID 顺序不受影响)
+        """
+        k1 = self.store.key_for("旧项目")
+        k2 = self.store.key_for("无销售项目")
+        self.store.write(k1, {"id": "1", "recorder": "李四"}, mtime=1000)
+        self.store.write(k2, {"id": "2"}, mtime=2000)
+
+        result = MigrationRunner(self.store, self.context).run_pending(max_workers=2)
+
+        self.assertEqual(result["migrated"], 2)
+        self.assertEqual(self.store.load(k1), {"id": "1", "sales_rep": "李四"})
+        self.assertEqual(self.store.load(k2)["sales_rep"], "默认销售")
+        self.assertEqual(self.store.keys(), [k2, k1])
+
+        with open(self.store.state_path("migrations"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.assertEqual(state["schema_version"], get_migrations()[-1].version)
+
+    def test_fully_migrated_store_skips_scan(self):
+        """[测试场景] 全部迁移完成后，新的 Runner 不再枚举或读取任何商机"""
+        self.store.write(self.store.key_for("项目"), {"id": "1", "recorder": "李四"})
+        MigrationRunner(self.store, self.context).run_pending()
+
+        with patch.object(self.store, "keys", side_effect=AssertionError("不应扫描存储")):
+            runner = MigrationRunner(self.store, self.context)
+            self.assertEqual(runner.pending(), [])
+            self.assertEqual(runner.run_pending(), {"applied": [], "migrated": 0})
+
+    def test_failed_record_keeps_migration_pending(self):
+        """[测试场景] 有商机迁移失败时不记录完成状态，下次启动重试并补齐"""
+        k1 = self.store.key_for("正常项目")
+        k2 = self.store.key_for("失败项目")
+        self.store.write(k1, {"id": "1", "recorder": "李四"}, mtime=1000)
+        self.store.write(k2, {"id": "2", "recorder": "王五"}, mtime=2000)
+
+        real_load = self.store.load
+
+        def flaky_load(key):
+            if key == k2:
+                raise OSError("磁盘读取失败")
+            return real_load(key)
+
+        with patch.object(self.store, "load", side_effect=flaky_load):
+            result = MigrationRunner(self.store, self.context).run_pending()
+        self.assertEqual(result["applied"], [])
+        self.assertEqual(result["failed"], [k2])
+
+        runner = MigrationRunner(self.store, self.context)
+        self.assertEqual(len(runner.pending()), len(get_migrations()))
+        result = runner.run_pending()
+        self.assertEqual(result["failed"], [])
+        self.assertEqual(self.store.load(k2), {"id": "2", "sales_rep": "王五"})
+        self.assertEqual(MigrationRunner(self.store, self.context).pending(), [])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+LinkSell 字段规范化单元测试 (Normalization Tests)
+
+职责：
+- 验证金额 (万/亿/k/中文数字) 与时间节点 (绝对/相对) 的解析
+- 验证写入时规范化的基准日锚定：原文不变时重复保存结果稳定
+- 验证存量数据的一次性回填迁移
+
+特点：
+- **Pure**: 除回填用例使用临时目录外，不依赖存储与外部服务
+"""
+
+import sys
+import os
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.normalization import parse_amount, parse_date, normalize_record
+from src.core.migrations import MigrationRunner
+from src.services.storage_service import JsonFileStore
+
+REF = datetime.date(2024, 5, 15)  # 周三
+
+
+class TestParsing(unittest.TestCase):
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount("50万"), 500000)
+        self.assertEqual(parse_amount("1.2亿元"), 1.2e8)
+        self.assertEqual(parse_amount("80K"), 80000)
+        self.assertEqual(parse_amount("50-80万"), 500000)
+        self.assertEqual(parse_amount("¥1,000,000"), 1000000)
+        self.assertEqual(parse_amount("第2期 50万"), 500000)
+        self.assertEqual(parse_amount("约五十万"), 500000)
+        self.assertEqual(parse_amount("一期五十万"), 500000)
+        self.assertEqual(parse_amount("两千万"), 2e7)
+        self.assertEqual(parse_amount("3千万"), 3e7)
+        self.assertIsNone(parse_amount("待定"))
+        # 没有金额单位/货币标记的裸数字不当作预算
+        self.assertIsNone(parse_amount("5个"))
+        self.assertIsNone(parse_amount("500"))
+
+    def test_parse_absolute_date(self):
+        self.assertEqual(parse_date("2024-6-30"), "2024-06-30")
+        self.assertEqual(parse_date("预计2024年9月上线"), "2024-09-01")
+        self.assertEqual(parse_date("2025年底验收"), "2025-12-31")
+        self.assertEqual(parse_date("2024年6月底"), "2024-06-30")
+        self.assertEqual(parse_date("2024年2月末上线"), "2024-02-29")
+        self.assertEqual(parse_date("2024年6月初"), "2024-06-01")
+        self.assertIsNone(parse_date("下个月上线"))  # 没有基准日时不解析相对表达
+
+    def test_parse_relative_date(self):
+        cases = {
+            "下个月上线": "2024-06-01",
+            "下月底签约": "2024-06-30",
+            "月底前": "2024-05-31",
+            "年底前完成": "2024-12-31",
+            "三个月内": "2024-08-15",
+            "2周后": "2024-05-29",
+            "下周": "2024-05-20",
+            "Q3 招标": "2024-07-01",
+            "下季度": "2024-07-01",
+            "Q1上线": "2025-01-01",  # 已过去的季度视为明年
+            "第二季度": "2024-04-01",  # 当前季度保持今年
+            "明年Q1": "2025-01-01",
+            "明年初": "2025-01-01",
+            "8月底": "2024-08-31",
+            "3月份": "2025-03-01",
+            "尽快": None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_date(text, REF), expected, text)
+
+
+class TestNormalizeRecord(unittest.TestCase):
+    def test_fields_alongside_originals_and_stable_anchor(self):
+        """[测试场景] 原文保留；相对时间锚定首次出现的日期，之后重复保存不漂移"""
+        record = {"project_opportunity": {"budget": "50万", "timeline": "下个月上线"}}
+        self.assertTrue(normalize_record(record, today=REF))
+        opp = record["project_opportunity"]
+        self.assertEqual((opp["budget"], opp["budget_value"]), ("50万", 500000))
+        self.assertEqual(opp["timeline_date"], "2024-06-01")
+
+        self.assertFalse(normalize_record(record, today=datetime.date(2024, 9, 1)))
+        self.assertEqual(opp["timeline_date"], "2024-06-01")
+
+        opp["timeline"] = "2024-10-01"
+        self.assertTrue(normalize_record(record, today=datetime.date(2024, 9, 1)))
+        self.assertEqual(opp["timeline_date"], "2024-10-01")
+        self.assertNotIn("timeline_anchor", opp)
+
+
+class TestBackfillMigration(unittest.TestCase):
+    def test_existing_records_backfilled(self):
+        """[测试场景] 存量商机以 updated_at 为基准回填，回填后清单可直接提供规范化取值"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = JsonFileStore(Path(tmp) / "opportunities")
+            key = store.key_for("沈阳机床")
+            store.write(key, {"id": "1", "sales_rep": "张三", "updated_at": "2024-05-15T10:00:00",
+                              "project_opportunity": {"project_name": "沈阳机床", "budget": "1.2亿",
+                                                      "timeline": "下个月"}})
+            MigrationRunner(store).run_pending()
+
+            opp = store.load(key)["project_opportunity"]
+            self.assertEqual((opp["budget_value"], opp["timeline_date"]), (1.2e8, "2024-06-01"))
+            summary = store.summaries()[0]
+            self.assertEqual((summary["budget_value"], summary["timeline_date"]), (1.2e8, "2024-06-01"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+LinkSell 检索索引单元测试 (Search Index Tests)
+
+职责：
+- 验证关键字索引的结果集与旧版"双向包含"线性扫描完全一致
+- 验证增量同步只重新切分变化的条目
+- 验证排序：精确匹配优先，其次长度接近度
+- 验证全文索引命中集与旧版 json.dumps 子串过滤一致，并按 BM25 排序
+
+特点：
+- **Pure**: 不依赖存储与向量库，直接构造清单条目
+"""
+
+import sys
+import os
+import random
+import unittest
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.search_index import NgramIndex, FullTextIndex, document_blob
+
+
+def make_entry(i, name, mtime=None, customer="", company=""):
+    return {"file_path": f"data/opportunities/{i}.json", "id": str(i), "mtime": mtime or i,
+            "project_name": name, "sales_rep": "张三", "customer_name": customer, "company": company}
+
+
+def linear_scan(entries, keyword):
+    """旧版 search_opportunities 的判定规则"""
+    k_low = keyword.lower()
+    return {e["id"] for e in entries
+            if k_low in e["project_name"].lower() or (len(e["project_name"]) > 2 and e["project_name"].lower() in k_low)}
+
+
+class TestNgramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = NgramIndex()
+
+    def test_matches_linear_scan(self):
+        """[测试场景] 随机名称 + 随机关键词下，结果集与线性扫描一致"""
+        rng = random.Random(7)
+        chars = "沈阳大连机床轴承港口二期AB"
+        entries = [make_entry(i, "".join(rng.choice(chars) for _ in range(rng.randint(1, 6)))) for i in range(300)]
+        self.index.sync(entries)
+
+        keywords = ["", "a", "沈", "沈阳机床项目"] + \
+                   ["".join(rng.choice(chars) for _ in range(rng.randint(1, 8))) for _ in range(200)]
+        for kw in keywords:
+            got = {e["id"] for e in self.index.match(kw)}
+            self.assertEqual(got, linear_scan(entries, kw), kw)
+
+    def test_ranking(self):
+        """[测试场景] 精确匹配排第一，其余按长度接近度排序"""
+        self.index.sync([
+            make_entry(1, "沈阳机床厂改造二期工程", mtime=300),
+            make_entry(2, "沈阳机床", mtime=100),
+            make_entry(3, "沈阳机床厂", mtime=200),
+        ])
+        self.assertEqual([e["id"] for e in self.index.match("沈阳机床")], ["2", "3", "1"])
+
+    def test_incremental_sync(self):
+        """[测试场景] 同步时只重新切分变化的条目，删除的条目被移除"""
+        entries = [make_entry(i, f"项目{i}") for i in range(10)]
+        self.assertEqual(self.index.sync(entries), 10)
+
+        entries[3] = make_entry(3, "大连港口", mtime=99)
+        del entries[5]
+        with patch.object(self.index, "add", wraps=self.index.add) as add:
+            self.assertEqual(self.index.sync(entries), 2)
+            self.assertEqual(add.call_count, 1)
+
+        self.assertEqual([e["id"] for e in self.index.match("大连")], ["3"])
+        self.assertEqual(self.index.match("项目5"), [])
+        self.assertEqual(len(self.index), 9)
+
+    def test_customer_and_company_fields(self):
+        """[测试场景] 客户姓名与公司单独建索引"""
+        self.index.sync([make_entry(1, "港口项目", customer="王经理", company="大连港集团")])
+        self.assertEqual([e["id"] for e in self.index.match("大连港", field="company")], ["1"])
+        self.assertEqual([e["id"] for e in self.index.match("找王经理聊聊", field="customer_name")], ["1"])
+        self.assertEqual(self.index.match("大连港"), [])
+
+
+class TestFullTextIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = FullTextIndex()
+        self.docs = {
+            "a": {"id": "a", "project_opportunity": {"project_name": "沈阳机床", "budget": "50万"},
+                  "record_logs": [{"content": "客户关注数控机床交期，机床数量 20 台"}]},
+            "b": {"id": "b", "project_opportunity": {"project_name": "大连港口", "budget": "120万"},
+                  "record_logs": [{"content": "讨论了机床配件"}]},
+            "c": {"id": "c", "project_opportunity": {"project_name": "Project Alpha", "budget": "5k"}},
+        }
+        self.index.sync({k: 1 for k in self.docs}, self.docs.get)
+
+    def test_matches_substring_filter(self):
+        """[测试场景] 命中集与 `term in json.dumps(data).lower()` 完全一致 (含单词片段与数字)"""
+        for term in ["机床", "数控机床", "50万", "0万", "alpha", "proj", "ject alp", "万", "港口", "不存在", "", "\""]:
+            expected = {k for k, d in self.docs.items() if term.lower() in document_blob(d)}
+            self.assertEqual({k for k, _ in self.index.search(term)}, expected, term)
+
+    def test_bm25_ranking_and_sync(self):
+        """[测试场景] 词频高者排前；改写后只重新加载变化的商机"""
+        self.assertEqual([k for k, _ in self.index.search("机床")], ["a", "b"])
+
+        self.docs["b"] = {"id": "b", "project_opportunity": {"project_name": "大连港口"}}
+        loads = []
+        changed = self.index.sync({"a": 1, "b": 2, "c": 1}, lambda k: loads.append(k) or self.docs[k])
+        self.assertEqual((changed, loads), (1, ["b"]))
+        self.assertEqual([k for k, _ in self.index.search("机床")], ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
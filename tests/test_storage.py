@@ -0,0 +1,315 @@
+"""
+LinkSell 存储后端单元测试 (Storage Tests)
+
+职责：
+- 验证 JSON 文件后端与 SQLite 后端的读写/删除/枚举语义一致
+- 验证旧版 JSON 目录到 SQLite 的一次性导入
+- 验证 Controller 在 SQLite 后端下的 CRUD 行为 (临时 ID、真实 ID、重命名)
+
+特点：
+- **Isolated**: 所有数据写入临时目录，不污染 data/
+- **No Network**: Mock 掉 VectorService，不加载 Embedding 模型
+"""
+
+import sys
+import os
+import tempfile
+import unittest
+import configparser
+from pathlib import Path
+from unittest.mock import patch
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.storage_service import JsonFileStore, SQLiteStore, import_json_directory
+
+
+class StoreContractMixin:
+    """[通用用例] 两种后端共享的契约测试"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.store = self.make_store()
+
+    def tearDown(self):
+        self.store.close()
+        self._tmp.cleanup()
+
+    def test_write_and_load(self):
+        """[测试场景] 写入后可按 Key 读回，且 Key 由项目名安全转换而来"""
+        key = self.store.key_for("沈阳/机床")
+        self.assertTrue(key.endswith("沈阳_机床.json"))
+        self.store.write(key, {"id": "1", "project_name": "沈阳/机床"})
+
+        self.assertTrue(self.store.exists(key))
+        self.assertEqual(self.store.load(key)["id"], "1")
+        self.assertIsNotNone(self.store.stamp(key))
+
+    def test_keys_ordered_by_mtime(self):
+        """[测试场景] 枚举顺序为最近修改在前 (临时 ID 依赖此顺序)"""
+        self.store.write(self.store.key_for("A"), {"id": "a"}, mtime=1000)
+        self.store.write(self.store.key_for("B"), {"id": "b"}, mtime=3000)
+        self.store.write(self.store.key_for("C"), {"id": "c"}, mtime=2000)
+
+        names = [Path(k).stem for k in self.store.keys()]
+        self.assertEqual(names, ["B", "C", "A"])
+
+    def test_find_key_and_remove(self):
+        """[测试场景] 真实 ID 查找与删除"""
+        key = self.store.key_for("沈阳项目")
+        self.store.write(key, {"id": "123"})
+
+        self.assertEqual(self.store.find_key("123"), key)
+        self.assertIsNone(self.store.find_key("404"))
+        self.assertTrue(self.store.remove(key))
+        self.assertFalse(self.store.exists(key))
+        self.assertFalse(self.store.remove(key))
+
+    def test_record_logs_roundtrip(self):
+        """[测试场景] 追加、改写小记后读回的仍是完整合并视图"""
+        key = self.store.key_for("沈阳项目")
+        logs = [{"time": "2024-01-01 10:00:00", "content": "首次拜访"}]
+        self.store.write(key, {"id": "1", "record_logs": logs})
+
+        logs = logs + [{"time": "2024-01-02 10:00:00", "content": "报价"}]
+        self.store.write(key, {"id": "1", "record_logs": logs})
+        self.assertEqual(self.store.load(key)["record_logs"], logs)
+
+        # 改写历史 (删除第一条) 同样正确反映
+        self.store.write(key, {"id": "1", "record_logs": logs[1:]})
+        self.assertEqual(self.store.load(key)["record_logs"], logs[1:])
+
+
+class TestJsonFileStore(StoreContractMixin, unittest.TestCase):
+    def make_store(self):
+        return JsonFileStore(self.tmp / "opportunities")
+
+    def test_log_append_is_single_line(self):
+        """[测试场景] 追加一条小记只向日志段追加一行，主文档不含 record_logs"""
+        key = self.store.key_for("沈阳项目")
+        logs = [{"content": f"第{i}次沟通"} for i in range(50)]
+        self.store.write(key, {"id": "1", "record_logs": logs})
+        segment = Path(key).with_suffix(".logs.jsonl")
+        size_before = segment.stat().st_size
+
+        self.store.write(key, {"id": "1", "record_logs": logs + [{"content": "新进展"}]})
+
+        appended = segment.read_bytes()[size_before:]
+        self.assertEqual(appended.count(b"\n"), 1)
+        self.assertNotIn("record_logs", Path(key).read_text(encoding="utf-8"))
+
+    def test_legacy_inline_logs_and_compaction(self):
+        """[测试场景] 兼容旧版内嵌 record_logs；反复改写后日志段会被压缩"""
+        key = self.store.key_for("旧项目")
+        Path(key).write_text('{"id": "1", "record_logs": [{"content": "旧小记"}]}', encoding="utf-8")
+        self.assertEqual(self.store.load(key)["record_logs"], [{"content": "旧小记"}])
+
+        for i in range(40):
+            self.store.write(key, {"id": "1", "record_logs": [{"content": f"改写{i}"}]})
+        segment = Path(key).with_suffix(".logs.jsonl")
+        self.assertLess(len(segment.read_text(encoding="utf-8").splitlines()), JsonFileStore.COMPACT_MIN_LINES)
+        self.assertEqual(self.store.load(key)["record_logs"], [{"content": "改写39"}])
+
+    def test_manifest_reused_on_startup(self):
+        """[测试场景] 重启时清单有效，则不重新解析任何商机文件"""
+        key = self.store.key_for("沈阳项目")
+        self.store.write(key, {"id": "1", "sales_rep": "张三",
+                               "project_opportunity": {"project_name": "沈阳项目", "opportunity_stage": 2}})
+
+        with patch.object(JsonFileStore, "load", side_effect=AssertionError("不应读取正文")):
+            reopened = JsonFileStore(self.tmp / "opportunities")
+            summary = reopened.summaries()[0]
+            self.assertEqual(reopened.find_key("1"), key)
+
+        self.assertEqual(summary["project_name"], "沈阳项目")
+        self.assertEqual(summary["stage"], "2")
+        self.assertEqual(summary["sales_rep"], "张三")
+
+    def test_manifest_detects_external_changes(self):
+        """[测试场景] 其他进程新增/删除文件后，清单通过 stat 校验自动修正"""
+        self.store.write(self.store.key_for("A"), {"id": "a"}, mtime=1000)
+        external = self.tmp / "opportunities" / "B.json"
+        external.write_text('{"id": "b"}', encoding="utf-8")
+        os.utime(self.tmp / "opportunities", (5000, 5000))
+
+        self.assertEqual(self.store.find_key("b"), str(external))
+        os.remove(external)
+        os.utime(self.tmp / "opportunities", (6000, 6000))
+        self.assertIsNone(self.store.find_key("b"))
+
+    def test_two_instances_append_without_duplicates(self):
+        """[测试场景] 两个进程共用目录：基于对方写入后的内容追加，日志段不重复"""
+        other = JsonFileStore(self.tmp / "opportunities")
+        key = self.store.key_for("沈阳项目")
+        log = lambda i: {"content": f"小记{i}"}
+        self.store.write(key, {"id": "1", "record_logs": [log(1)]})
+        other.write(key, {"id": "1", "record_logs": [log(1), log(2)]})
+
+        data = self.store.load(key)
+        self.assertEqual(data["record_logs"], [log(1), log(2)])
+        self.store.write(key, dict(data, record_logs=data["record_logs"] + [log(3)]))
+
+        self.assertEqual(other.load(key)["record_logs"], [log(1), log(2), log(3)])
+        other.close()
+
+    def test_in_place_rewrite_by_other_instance(self):
+        """[测试场景] 另一进程原地改写已有商机 (目录 mtime 不变)：摘要与 generation 随之更新"""
+        other = JsonFileStore(self.tmp / "opportunities")
+        key = self.store.key_for("沈阳项目")
+        self.store.write(key, {"id": "1", "project_opportunity": {"project_name": "沈阳项目"}})
+        self.assertEqual(self.store.summaries()[0]["stage"], "")
+        generation = self.store.generation()
+
+        other.write(key, {"id": "1", "project_opportunity": {"project_name": "沈阳项目", "opportunity_stage": 4}})
+
+        self.assertEqual(self.store.summaries()[0]["stage"], "4")
+        self.assertNotEqual(self.store.generation(), generation)
+        other.close()
+
+
+class TestSQLiteStore(StoreContractMixin, unittest.TestCase):
+    def make_store(self):
+        return SQLiteStore(db_path=self.tmp / "linksell.db", data_dir=self.tmp / "opportunities")
+
+    def test_import_preserves_order(self):
+        """[测试场景] 从 JSON 目录导入后，条数与顺序保持不变"""
+        legacy = JsonFileStore(self.tmp / "legacy")
+        legacy.write(legacy.key_for("旧项目"), {"id": "old"}, mtime=1000)
+        legacy.write(legacy.key_for("新项目"), {"id": "new"}, mtime=2000)
+
+        self.assertEqual(import_json_directory(self.tmp / "legacy", self.store), 2)
+        self.assertEqual([Path(k).stem for k in self.store.keys()], ["新项目", "旧项目"])
+        self.assertEqual(self.store.load(self.store.find_key("old"))["id"], "old")
+
+
+class TestControllerOnSQLite(unittest.TestCase):
+    """[集成测试] Controller 在 SQLite 后端上的 CRUD 语义"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+
+        config = configparser.ConfigParser()
+        config["storage"] = {"backend": "sqlite", "sqlite_path": "data/linksell.db"}
+        Path("config").mkdir()
+        with open("config/config.ini", "w", encoding="utf-8") as f:
+            config.write(f)
+
+        with patch("src.core.controller.VectorService", side_effect=RuntimeError("offline")):
+            from src.core.controller import LinkSellController
+            self.ctrl = LinkSellController()
+
+    def tearDown(self):
+        self.ctrl.store.close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_overwrite_get_delete(self):
+        """[测试场景] 覆盖保存 -> 临时/真实 ID 查询 -> 重命名 -> 删除"""
+        self.assertIsInstance(self.ctrl.store, SQLiteStore)
+        opp = {"id": "u-1", "sales_rep": "张三", "project_opportunity": {"project_name": "沈阳项目"}}
+        self.assertTrue(self.ctrl.overwrite_opportunity(opp))
+
+        by_temp = self.ctrl.get_opportunity_by_id("1")
+        by_real = self.ctrl.get_opportunity_by_id("u-1")
+        self.assertEqual(by_temp["id"], "u-1")
+        self.assertEqual(by_real["_temp_id"], "1")
+
+        # 改名：旧 Key 被移除，只保留新 Key
+        by_real["project_opportunity"]["project_name"] = "沈阳二期"
+        self.assertTrue(self.ctrl.overwrite_opportunity(by_real))
+        self.assertEqual([Path(k).stem for k in self.ctrl.store.keys()], ["沈阳二期"])
+
+        self.assertTrue(self.ctrl.delete_opportunity("u-1"))
+        self.assertEqual(self.ctrl.list_opportunities(), [])
+
+    def test_projection_skips_bodies(self):
+        """[测试场景] 投影列表与关键字搜索只读摘要表，不加载商机正文"""
+        opp = {"id": "u-2", "sales_rep": "李四", "record_logs": [{"content": "很长的历史"}],
+               "project_opportunity": {"project_name": "大连港口", "opportunity_stage": 3}}
+        self.assertTrue(self.ctrl.overwrite_opportunity(opp))
+
+        with patch.object(self.ctrl.store, "load", side_effect=AssertionError("不应读取正文")):
+            rows = self.ctrl.list_opportunities(fields=("id", "project_name", "stage", "sales_rep"))
+            matches = self.ctrl.search_opportunities("大连")
+
+        self.assertEqual(rows, [{"id": "u-2", "project_name": "大连港口", "stage": "3", "sales_rep": "李四"}])
+        self.assertEqual(matches, [{"name": "大连港口", "sales_rep": "李四", "id": "u-2"}])
+        with self.assertRaises(ValueError):
+            self.ctrl.list_opportunities(fields=("record_logs",))
+
+    def test_filtered_list_uses_fulltext_index(self):
+        """[测试场景] 带条件的 LIST 走全文索引：按相关度排序，写入后自动更新"""
+        self.ctrl.overwrite_opportunity({"id": "u-3", "sales_rep": "张三", "record_logs": [{"content": "机床"}],
+                                         "project_opportunity": {"project_name": "沈阳机床"}})
+        self.ctrl.overwrite_opportunity({"id": "u-4", "sales_rep": "李四",
+                                         "project_opportunity": {"project_name": "大连港口"}})
+
+        with patch.object(self.ctrl, "extract_search_term", return_value="机床"):
+            result = self.ctrl.process_list_request("找一下机床相关的")
+        self.assertEqual([r["id"] for r in result["results"]], ["u-3"])
+
+        self.ctrl.overwrite_opportunity({"id": "u-4", "sales_rep": "李四", "record_logs": [{"content": "采购机床"}],
+                                         "project_opportunity": {"project_name": "大连港口"}})
+        self.assertEqual([r["id"] for r in self.ctrl.search_fulltext("机床")], ["u-3", "u-4"])
+
+    def test_structured_query(self):
+        """[测试场景] 结构化查询：等值 + 范围过滤，按预算降序，缺失预算的排在最后"""
+        for i, (rep, stage, budget) in enumerate([("张三", 3, "80万"), ("张三", 3, "待定"),
+                                                   ("张三", 3, "120万"), ("李四", 3, "200万")]):
+            self.ctrl.overwrite_opportunity({"id": f"q-{i}", "sales_rep": rep, "project_opportunity": {
+                "project_name": f"项目{i}", "opportunity_stage": stage, "budget": budget}})
+
+        rows = self.ctrl.query_opportunities({"stage": "3", "sales_rep": "张三"}, sort_by="budget", descending=True)
+        self.assertEqual([r["id"] for r in rows], ["q-2", "q-0", "q-1"])
+
+        filters = self.ctrl.parse_list_filters("张三P3阶段超过100万的")
+        self.assertEqual([r["id"] for r in self.ctrl.process_structured_list(filters)["results"]], ["q-2"])
+
+        # 条件 + 关键字：只返回同时命中关键字的商机
+        self.ctrl.overwrite_opportunity({"id": "q-9", "sales_rep": "李四", "project_opportunity": {
+            "project_name": "铁西医院", "opportunity_stage": 3, "budget": "50万"}})
+        filters, keyword = self.ctrl.parse_list_filters("P3阶段的医院项目", with_rest=True)
+        result = self.ctrl.process_structured_list(filters, keyword=keyword)
+        self.assertEqual([r["id"] for r in result["results"]], ["q-9"])
+        self.ctrl.delete_opportunity("q-9")
+
+        # 规则未识别的残留词在全部商机中都没有命中时忽略，不把正确的条件结果清空
+        result = self.ctrl.process_structured_list({"stage": "3", "sales_rep": "张三"}, keyword="有几个")
+        self.assertEqual({r["id"] for r in result["results"]}, {"q-0", "q-1", "q-2"})
+        for text in ("销售张三的P3商机", "张三跟进的P3项目", "负责人张三P3阶段的单子"):
+            filters, keyword = self.ctrl.parse_list_filters(text, with_rest=True)
+            result = self.ctrl.process_structured_list(filters, keyword=keyword or None)
+            self.assertEqual({r["id"] for r in result["results"]}, {"q-0", "q-1", "q-2"}, text)
+
+        # 写入时已规范化预算，阶段汇总直接做数值运算
+        self.assertEqual(self.ctrl.pipeline_summary()["3"],
+                         {"count": 4, "budget_total": 4000000.0, "budget_missing": 1})
+        self.assertEqual(self.ctrl.get_opportunity_by_id("q-0")["project_opportunity"]["budget_value"], 800000)
+
+    def test_fused_nlu_normalizes_filters_only_for_list(self):
+        """[测试场景] 融合 NLU：非 LIST 意图不触发二级索引构建，LIST 的过滤条件按索引规范化"""
+        self.ctrl.overwrite_opportunity({"id": "n-1", "sales_rep": "张三", "project_opportunity": {
+            "project_name": "沈阳机床", "opportunity_stage": 3}})
+        self.ctrl.api_key, self.ctrl.endpoint_id = "key", "ep-test"
+
+        record = {"intent": "RECORD", "content": "张三今天去了沈阳", "search_term": "", "filters": {}}
+        with patch("src.core.controller.understand_input", return_value=record), \
+             patch.object(self.ctrl, "_ensure_index", side_effect=AssertionError("不应构建索引")):
+            self.assertEqual(self.ctrl.understand("张三今天去了沈阳")["filters"], {})
+
+        listing = {"intent": "LIST", "content": "张三的P3单子", "search_term": "",
+                   "filters": {"stage": ["P3"], "sales_rep": ["张三"]}}
+        with patch("src.core.controller.understand_input", return_value=listing):
+            self.assertEqual(self.ctrl.understand("张三的P3单子")["filters"],
+                             {"stage": ["3"], "sales_rep": ["张三"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
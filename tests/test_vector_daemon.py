@@ -0,0 +1,129 @@
+"""
+LinkSell 向量守护进程单元测试 (Vector Daemon Tests)
+
+职责：
+- 验证并发的单条查询编码被合并成批，结果与请求一一对应
+- 验证 RemoteVectorService 经 Unix Socket 调用守护进程：写入、检索、片段正文在客户端还原、错误透传
+- 验证守护进程未运行时 connect 返回 None (调用方回退为进程内加载)
+
+特点：
+- **Offline**: 哈希向量替代 Embedding 模型，向量存储使用内置平铺索引，不依赖 ChromaDB
+"""
+
+import sys
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.vector_daemon import MicroBatcher, RemoteVectorService, VectorDaemon
+from tests.test_vector_service import HashEncoder
+
+
+class SlowEncoder(HashEncoder):
+    """[测试替身] 每次前向耗时 20ms，便于观察并发请求的合并"""
+
+    def encode(self, texts, **kwargs):
+        time.sleep(0.02)
+        return super().encode(texts, **kwargs)
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "需要 Unix Socket")
+class TestVectorDaemon(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self._tmp.name, "v.sock")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_micro_batching(self):
+        """[测试场景] 16 个线程同时编码单条文本：合并为少量批次，每个线程拿到自己文本的向量"""
+        model = SlowEncoder()
+        batcher = MicroBatcher(model, max_batch=8, max_wait_ms=20)
+        texts = [f"查询{i}" for i in range(16)]
+        results = {}
+
+        def worker(t):
+            results[t] = batcher.encode(t)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in texts]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+        for t in texts:
+            np.testing.assert_array_equal(results[t], HashEncoder().encode(t))
+        self.assertLess(len(model.calls), 16)
+        self.assertEqual(sum(model.calls), 16)
+        self.assertEqual(batcher.encode(["a", "b"]).shape[0], 2)  # 批量输入直接转交模型
+
+    def test_remote_client_round_trip(self):
+        """[测试场景] 客户端经守护进程写入与检索；hydrate 在客户端执行；守护进程停止后 connect 返回 None"""
+        self.assertIsNone(RemoteVectorService.connect(self.socket_path))
+
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            service = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"), store="flat")
+            service._ensure_initialized()
+        daemon = VectorDaemon(service, self.socket_path)
+        daemon.start()
+        try:
+            with self.assertRaises(RuntimeError):
+                VectorDaemon(service, self.socket_path).start()  # 同一 Socket 不允许启动第二个
+
+            client = RemoteVectorService.connect(self.socket_path)
+            self.assertIsNotNone(client)
+            client._ensure_initialized(timeout=30)
+            rec = {"id": "7", "sales_rep": "李四", "project_opportunity": {"project_name": "智慧园区"},
+                   "record_logs": [{"time": "2024-05-01", "content": "客户关注夜间监控"}]}
+            client.add_record("7", rec)
+
+            self.assertEqual(client.search_projects("智慧园区", threshold=0.99)[0]["id"], "7")
+            self.assertEqual(client.search("智慧园区", top_k=1, hydrate=lambda rid: rec), [rec])
+            hits = client.search_chunks("客户关注夜间监控", top_k=1, hydrate=lambda rid: rec)
+            self.assertIn("客户关注夜间监控", hits[0]["text"])
+            self.assertEqual(client.chunked_record_ids(), {"7"})
+            self.assertEqual(client.status(), "Ready")
+
+            with self.assertRaises(RuntimeError):
+                client._call("model")  # 非白名单方法
+            client.delete_records(["7"])
+            self.assertEqual(client.search_projects("智慧园区", threshold=0.99), [])
+        finally:
+            daemon.stop()
+        self.assertIsNone(RemoteVectorService.connect(self.socket_path))
+
+    def test_mutations_are_serialized(self):
+        """[测试场景] 多个客户端线程同时写入：改写向量库的调用串行执行"""
+        active, overlaps = [0], []
+
+        class RecordingService:
+            def add_records(self, records, **kwargs):
+                active[0] += 1
+                overlaps.append(active[0])
+                time.sleep(0.01)
+                active[0] -= 1
+                return len(records)
+
+        daemon = VectorDaemon(RecordingService(), self.socket_path)
+        threads = [threading.Thread(target=daemon.dispatch, args=({"method": "add_records", "args": [[{"id": i}]]},))
+                   for i in range(8)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+        self.assertEqual(max(overlaps), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
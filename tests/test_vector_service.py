@@ -0,0 +1,561 @@
+"""
+LinkSell 向量服务单元测试 (Vector Service Tests)
+
+职责：
+- 验证批量写入 add_records 与逐条 add_record 的结果一致
+- 验证批量删除 delete_records 与同批重复 ID 的处理
+- 验证向量编码缓存：文本未变时跳过编码，文本变化/删除后清理旧向量
+- 验证精简元数据：检索结果按 ID 还原、旧版集合 (内嵌 json_data) 的迁移
+- 验证项目名索引：别名匹配、别名变更/删除时的维护与旧库回填
+- 验证检索片段索引：小记逐条增量编码、片段检索按 ID 还原正文
+- 验证查询向量 LRU 缓存：归一化后相同的查询只编码一次、按条数淘汰
+- 验证 ONNX 后端的 mean pooling (忽略 padding、批内按长度排序后结果顺序不变)
+- 验证内置平铺索引：精确距离、墓碑删除、日志重放与压缩，以及 store = flat 时的完整检索链路
+- 验证存储 <-> 向量库一致性比对、增量修复与可续跑的全量重建
+
+特点：
+- **Offline**: 用哈希向量替代 Embedding 模型，ChromaDB 写入临时目录
+"""
+
+import sys
+import os
+import hashlib
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# [环境配置] 确保可以导入 src 模块
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import chromadb  # noqa: F401
+    HAS_CHROMA = True
+except ImportError:
+    HAS_CHROMA = False
+
+
+class HashEncoder:
+    """[测试替身] 以文本哈希生成 384 维向量，并记录每次 encode 的输入条数"""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        self.calls.append(len(texts))
+        rows = [np.frombuffer(hashlib.sha512(t.encode("utf-8")).digest() * 6, dtype=np.uint8)[:384]
+                .astype(np.float32) / 255 for t in texts]
+        return rows[0] if single else np.stack(rows)
+
+
+@unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+class TestBatchUpsert(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            self.svc = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"))
+            self.svc._ensure_initialized()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def records(self, n, prefix="项目"):
+        return [{"id": str(i), "sales_rep": "张三", "project_opportunity": {"project_name": f"{prefix}{i}"}}
+                for i in range(n)]
+
+    def test_add_records_batches_encoding(self):
+        """[测试场景] 2500 条分块写入：每块只调用一次内容编码 + 一次项目名编码，结果与逐条写入一致"""
+        self.svc.UPSERT_BATCH = 1000
+        progress = []
+        written = self.svc.add_records(self.records(2500), batch_size=128,
+                                       progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(written, 2500)
+        self.assertEqual(self.svc.collection.count(), 2500)
+        self.assertEqual(self.svc.model.calls, [1000, 1000, 1000, 1000, 500, 500])
+        self.assertEqual(self.svc.names.count(), 2500)
+        self.assertEqual(progress[-1], (2500, 2500))
+
+        single = self.records(1)[0]
+        batched = self.svc.collection.get(ids=["0"], include=["embeddings", "metadatas"])
+        self.svc.add_record("0", single)
+        looped = self.svc.collection.get(ids=["0"], include=["embeddings", "metadatas"])
+        self.assertEqual(batched["metadatas"], looped["metadatas"])
+        np.testing.assert_allclose(batched["embeddings"], looped["embeddings"])
+
+    def test_duplicates_and_delete_records(self):
+        """[测试场景] 同批重复 ID 保留最后一条；批量删除后只剩未删除的记录"""
+        recs = self.records(10) + [{"id": "3", "project_opportunity": {"project_name": "改名项目"}}]
+        self.assertEqual(self.svc.add_records(recs), 10)
+        meta = self.svc.collection.get(ids=["3"])["metadatas"][0]
+        self.assertEqual(meta["project_name"], "改名项目")
+
+        self.assertEqual(self.svc.delete_records([str(i) for i in range(8)] + ["404"]), 9)
+        self.assertEqual(sorted(self.svc.collection.get()["ids"]), ["8", "9"])
+
+
+@unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+class TestSlimMetadata(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "vector_db")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def open_service(self):
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            svc = VectorService(db_path=self.db_path)
+            svc._ensure_initialized()
+        return svc
+
+    def test_search_hydrates_by_id(self):
+        """[测试场景] 元数据不含正文；search 通过回调还原商机并跳过已删除的命中"""
+        svc = self.open_service()
+        recs = {str(i): {"id": str(i), "sales_rep": "张三", "record_logs": [{"content": "x" * 200}],
+                         "project_opportunity": {"project_name": f"项目{i}"}} for i in range(3)}
+        svc.add_records(list(recs.values()))
+        meta = svc.collection.get(ids=["0"])["metadatas"][0]
+        self.assertEqual(set(meta), {"sales_rep", "project_name", "stage", "content_hash"})
+
+        hydrated = svc.search("项目", top_k=3, hydrate=lambda rid: recs.get(rid) if rid != "2" else None)
+        self.assertEqual(sorted(r["id"] for r in hydrated), ["0", "1"])
+        self.assertEqual(svc.search_projects("项目1", threshold=-1)[0]["sales_rep"], "张三")
+
+    def test_legacy_collection_is_migrated(self):
+        """[测试场景] 旧版集合 (元数据内嵌 json_data) 重新打开时被改写为精简元数据，指纹保持可比对"""
+        import chromadb
+        from src.services.vector_service import content_hash
+
+        rec = {"id": "7", "sales_rep": "李四", "project_opportunity": {"project_name": "旧项目"}}
+        client = chromadb.PersistentClient(path=self.db_path)
+        legacy = client.get_or_create_collection(name="sales_knowledge")
+        legacy.upsert(ids=["7"], embeddings=[[0.5] * 384], documents=["旧文本"], metadatas=[{
+            "json_data": json.dumps(rec, ensure_ascii=False), "sales_rep": "李四",
+            "record_type": "商机", "project_name": "旧项目", "stage": ""}])
+        del legacy, client
+
+        svc = self.open_service()
+        meta = svc.collection.get(ids=["7"])["metadatas"][0]
+        self.assertNotIn("json_data", meta)
+        self.assertEqual(meta["content_hash"], content_hash(rec))
+        self.assertEqual(svc.collection.metadata["schema_version"], svc.SCHEMA_VERSION)
+        self.assertEqual(svc._migrate_metadata(), 0)
+
+
+@unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+class TestNameIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmp.name, "vector_db")
+        self.svc = self.open_service()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def open_service(self):
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            svc = VectorService(db_path=self.db_path)
+            svc._ensure_initialized()
+        return svc
+
+    def test_alias_lookup_and_maintenance(self):
+        """[测试场景] 别名经归一化后命中并返回正式项目名；同一商机只返回一次；删别名/删商机后索引同步"""
+        rec = {"id": "9", "sales_rep": "王五",
+               "project_opportunity": {"project_name": "数据中台", "aliases": ["DMP平台", "数据 中台"]}}
+        self.svc.add_record("9", rec)
+        self.assertEqual(self.svc.names.count(), 2)  # "数据 中台" 归一化后与项目名重复
+
+        hits = self.svc.search_projects("dmp 平台", threshold=0.99)
+        self.assertEqual([(h["id"], h["project_name"], h["sales_rep"]) for h in hits], [("9", "数据中台", "王五")])
+        self.assertAlmostEqual(hits[0]["score"], 1.0, places=4)
+
+        rec["project_opportunity"]["aliases"] = []
+        self.svc.add_record("9", rec)
+        self.assertEqual(self.svc.search_projects("DMP平台", threshold=0.99), [])
+        self.svc.delete_record("9")
+        self.assertEqual(self.svc.names.count(), 0)
+
+    def test_backfill_from_existing_collection(self):
+        """[测试场景] 早期版本没有项目名集合：重新打开时按主集合元数据回填"""
+        self.svc.add_records([{"id": str(i), "project_opportunity": {"project_name": f"项目{i}"}} for i in range(5)])
+        self.svc.client.delete_collection(self.svc.NAMES_COLLECTION)
+
+        svc = self.open_service()
+        self.assertEqual(svc.names.count(), 5)
+        self.assertEqual(svc.search_projects("项目3", threshold=0.99)[0]["id"], "3")
+
+
+@unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+class TestChunkIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            self.svc = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"))
+            self.svc._ensure_initialized()
+        self.rec = {"id": "5", "sales_rep": "赵六",
+                    "project_opportunity": {"project_name": "园区安防", "key_points": ["预算已批"]},
+                    "record_logs": [{"time": "2024-05-01", "sales_rep": "赵六", "content": "首次拜访，客户关注夜间监控"},
+                                    {"time": "2024-05-08", "sales_rep": "赵六", "content": "演示后客户要求报价"}]}
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_appended_log_encodes_one_chunk(self):
+        """[测试场景] 首次写入每条小记/关键点各一段；追加小记只编码新片段；删减小记后多余片段被删除"""
+        self.svc.add_record("5", self.rec)
+        self.assertEqual(self.svc.chunks.count(), 3)
+        self.assertEqual(self.svc.model.calls[-1], 3)
+
+        self.rec["record_logs"].append({"time": "2024-05-15", "sales_rep": "赵六", "content": "客户确认签约时间"})
+        self.svc.add_record("5", self.rec)
+        self.assertEqual(self.svc.model.calls[-1], 1)
+        self.assertEqual(self.svc.chunks.count(), 4)
+
+        self.rec["record_logs"] = self.rec["record_logs"][:1]
+        self.svc.add_record("5", self.rec)
+        self.assertEqual(sorted(self.svc.chunks.get()["ids"]), ["5:key_points", "5:log:0"])
+        self.svc.delete_record("5")
+        self.assertEqual(self.svc.chunks.count(), 0)
+
+    def test_search_chunks_returns_parent_and_text(self):
+        """[测试场景] 片段检索返回所属商机 ID 与片段正文；商机已删除的命中被跳过"""
+        from src.services.vector_service import record_chunks
+
+        self.svc.add_record("5", self.rec)
+        target = record_chunks("5", self.rec)[1]
+        hits = self.svc.search_chunks(target[3], top_k=2, hydrate=lambda rid: self.rec)
+        self.assertEqual((hits[0]["record_id"], hits[0]["kind"], hits[0]["seq"]), ("5", "log", 1))
+        self.assertIn("演示后客户要求报价", hits[0]["text"])
+        self.assertEqual(self.svc.search_chunks(target[3], hydrate=lambda rid: None), [])
+
+
+@unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            self.svc = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"),
+                                     cache_path=os.path.join(self._tmp.name, "embedding_cache.db"))
+            self.svc._ensure_initialized()
+
+    def tearDown(self):
+        self.svc.embedding_cache.close()
+        self._tmp.cleanup()
+
+    def test_unchanged_text_skips_encoding(self):
+        """[测试场景] 只追加小记时内容向量命中缓存，只编码新小记片段；摘要变化才重新编码内容，旧向量被清理；删除后缓存清空"""
+        rec = {"id": "1", "summary": "首次拜访", "project_opportunity": {"project_name": "缓存项目"}}
+        self.svc.add_record("1", rec)
+        first = self.svc.collection.get(ids=["1"], include=["embeddings"])["embeddings"][0]
+
+        old_hash = self.svc.collection.get(ids=["1"])["metadatas"][0]["content_hash"]
+        rec["record_logs"] = [{"content": "电话跟进"}]
+        self.svc.add_record("1", rec)
+        self.assertEqual(self.svc.model.calls, [1, 1, 1])  # 首次: 内容 + 项目名；追加后: 仅新小记片段
+        stats = self.svc.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 3, 3))
+        again = self.svc.collection.get(ids=["1"], include=["embeddings", "metadatas"])
+        np.testing.assert_allclose(again["embeddings"][0], first)
+        self.assertNotEqual(again["metadatas"][0]["content_hash"], old_hash)
+
+        rec["summary"] = "二次拜访，确认预算"
+        self.svc.add_record("1", rec)
+        self.assertEqual(self.svc.model.calls, [1, 1, 1, 1])
+        self.assertEqual(self.svc.cache_stats()["entries"], 3)
+
+        self.svc.delete_record("1")
+        self.assertEqual(self.svc.cache_stats()["entries"], 0)
+
+    def test_shared_text_survives_partial_delete(self):
+        """[测试场景] 两条商机向量文本相同只编码一次；删除其中一条不影响另一条的缓存"""
+        recs = [{"id": str(i), "project_opportunity": {"project_name": "同名项目"}} for i in range(2)]
+        self.svc.add_records(recs)
+        self.assertEqual(self.svc.model.calls, [1, 1])
+        self.svc.delete_records(["0"])
+        self.assertEqual(self.svc.cache_stats()["entries"], 2)
+        self.svc.delete_records(["1"])
+        self.assertEqual(self.svc.cache_stats()["entries"], 0)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def test_lru_eviction_and_stats(self):
+        """[测试场景] 超出条数上限时淘汰最久未用的查询；命中刷新使用顺序"""
+        from src.services.embedding_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache(max_entries=2)
+        encoded = []
+        encode = lambda t: encoded.append(t) or [len(t)]
+        cache.get_or_encode("a", encode)
+        cache.get_or_encode("bb", encode)
+        cache.get_or_encode("a", encode)      # 命中，"a" 变为最近使用
+        cache.get_or_encode("ccc", encode)    # 淘汰 "bb"
+        cache.get_or_encode("bb", encode)
+        self.assertEqual(encoded, ["a", "bb", "ccc", "bb"])
+        stats = cache.stats()
+        self.assertEqual((stats["query_cache_hits"], stats["query_cache_misses"], stats["query_cache_evictions"]),
+                         (1, 4, 2))
+
+    @unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+    def test_repeated_queries_skip_model(self):
+        """[测试场景] search / search_projects 重复查询 (含全半角、多余空白差异) 不再调用模型"""
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+                from src.services.vector_service import VectorService
+                svc = VectorService(db_path=os.path.join(tmp, "vector_db"))
+                svc._ensure_initialized()
+            svc.add_record("1", {"id": "1", "project_opportunity": {"project_name": "沈阳 ERP 项目"}})
+            before = len(svc.model.calls)
+
+            svc.search("沈阳  ERP 进展", hydrate=lambda rid: None)
+            svc.search(" 沈阳 ＥＲＰ 进展", hydrate=lambda rid: None)
+            svc.search_projects("沈阳ERP项目")
+            svc.search_projects("沈阳 erp 项目")
+            self.assertEqual(len(svc.model.calls) - before, 2)
+            self.assertEqual(svc.query_cache_stats()["query_cache_hits"], 2)
+
+
+class _EchoSession:
+    """[测试替身] 只实现 InferenceSession.run：第 t 个 token 的隐状态 = [token_id, 1]"""
+
+    def get_inputs(self):
+        return []
+
+    def run(self, _, feeds):
+        ids = feeds["input_ids"].astype(np.float32)
+        return [np.stack([ids, np.ones_like(ids)], axis=-1)]
+
+
+class TestOnnxEncoder(unittest.TestCase):
+    def setUp(self):
+        try:
+            from tokenizers import Tokenizer, models, pre_tokenizers
+        except ImportError:
+            self.skipTest("tokenizers 未安装")
+        from src.services.embedding_backends import OnnxEncoder
+
+        vocab = {"[PAD]": 0, "[UNK]": 1, "甲": 2, "乙": 3, "丙": 4}
+        tokenizer = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Split("", "isolated")
+        self.encoder = OnnxEncoder.__new__(OnnxEncoder)
+        self.encoder.tokenizer = tokenizer
+        self.encoder.pad_id = 0
+        self.encoder.session = _EchoSession()
+        self.encoder._inputs = set()
+
+    def test_mean_pooling_ignores_padding(self):
+        """[测试场景] 长短文本同批：padding 不参与平均；输出顺序与输入一致；单条返回一维向量"""
+        out = self.encoder.encode(["丙丙丙", "甲", "乙丙"], batch_size=2)
+        np.testing.assert_allclose(out, [[4, 1], [2, 1], [3.5, 1]])
+        np.testing.assert_allclose(self.encoder.encode("乙"), [3, 1])
+
+    @unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+    def test_vector_service_rejects_bad_backend(self):
+        """[测试场景] 未知后端或缺少导出目录时在构造阶段报错，而不是在后台线程中静默失败"""
+        from src.services.vector_service import VectorService
+
+        with self.assertRaises(ValueError):
+            VectorService(backend="tensorrt")
+        with self.assertRaises(ValueError):
+            VectorService(backend="onnx")
+
+
+class TestFlatIndex(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.rng = np.random.default_rng(3)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_exact_distances_and_tombstones(self):
+        """[测试场景] l2 / cosine 距离与暴力计算一致；覆盖写入与删除只打墓碑，where 过滤生效"""
+        from src.services.flat_index import FlatClient
+
+        client = FlatClient(self._tmp.name)
+        vecs = self.rng.normal(size=(50, 8)).astype(np.float32)
+        q = self.rng.normal(size=8).astype(np.float32)
+        for space in ("l2", "cosine"):
+            col = client.get_or_create_collection(space, configuration={"hnsw": {"space": space}})
+            col.upsert(ids=[str(i) for i in range(50)], embeddings=vecs,
+                       metadatas=[{"group": i % 2} for i in range(50)])
+            res = col.query(query_embeddings=[q], n_results=5, include=["metadatas", "distances"])
+            if space == "l2":
+                expected = ((vecs - q) ** 2).sum(axis=1)
+            else:
+                expected = 1 - (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)) @ (q / np.linalg.norm(q))
+            self.assertEqual(res["ids"][0], [str(i) for i in np.argsort(expected)[:5]])
+            np.testing.assert_allclose(res["distances"][0], np.sort(expected)[:5], rtol=1e-4, atol=1e-5)
+
+        col = client.get_or_create_collection("l2")
+        best = col.query(query_embeddings=[q], n_results=1)["ids"][0][0]
+        col.delete(ids=[best])
+        col.upsert(ids=["1"], embeddings=[q + 100], metadatas=[{"group": 9}])
+        self.assertEqual(col.count(), 49 if best != "1" else 50)
+        self.assertNotIn(best, col.query(query_embeddings=[q], n_results=49)["ids"][0])
+        hits = col.query(query_embeddings=[q], n_results=10, where={"group": {"$in": [9]}}, include=["metadatas"])
+        self.assertEqual(hits["ids"][0], ["1"])
+        col.update(ids=["1"], metadatas=[{"group": None, "tag": "x"}])
+        self.assertEqual(col.get(ids=["1"], include=["metadatas"])["metadatas"], [{"tag": "x"}])
+
+    def test_reopen_replays_log_and_compacts(self):
+        """[测试场景] 重新打开时按日志恢复 ID/元数据/墓碑；墓碑过多时自动压缩，float16 矩阵检索结果不变"""
+        from src.services.flat_index import FlatCollection
+
+        path = os.path.join(self._tmp.name, "c")
+        vecs = self.rng.normal(size=(3000, 16)).astype(np.float32)
+        col = FlatCollection(path, "c", dtype="float16", metadata={"schema_version": 2})
+        for start in range(0, 3000, 1000):
+            col.upsert(ids=[str(i) for i in range(start, start + 1000)], embeddings=vecs[start:start + 1000])
+        col.delete(ids=[str(i) for i in range(2000)])
+        before = col.query(query_embeddings=[vecs[2500]], n_results=3)["ids"][0]
+
+        FlatCollection.COMPACT_MIN_DEAD, saved = 100, FlatCollection.COMPACT_MIN_DEAD
+        try:
+            reopened = FlatCollection(path, "c")
+        finally:
+            FlatCollection.COMPACT_MIN_DEAD = saved
+        self.assertEqual(reopened.count(), 1000)
+        self.assertEqual(len(reopened._ids), 1000)  # 墓碑行已压缩掉
+        self.assertEqual(reopened.metadata, {"schema_version": 2})
+        self.assertEqual(reopened.query(query_embeddings=[vecs[2500]], n_results=3)["ids"][0], before)
+        self.assertEqual(before[0], "2500")
+
+    def test_vector_service_on_flat_store(self):
+        """[测试场景] store = flat 时写入、语义检索、项目名查重、片段检索与删除全部可用"""
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            svc = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"), store="flat")
+            svc._ensure_initialized()
+        self.assertEqual(svc.store_kind, "flat")
+        rec = {"id": "7", "sales_rep": "李四", "project_opportunity": {"project_name": "智慧园区"},
+               "record_logs": [{"time": "2024-05-01", "content": "客户关注夜间监控"}]}
+        svc.add_records([rec] + [{"id": str(i), "project_opportunity": {"project_name": f"项目{i}"}}
+                                 for i in range(5)])
+
+        self.assertEqual(svc.search_projects("智慧园区", threshold=0.99)[0]["id"], "7")
+        self.assertEqual(svc.search(svc._format_record(rec), top_k=1)[0]["id"], "7")
+        hits = svc.search_chunks("客户关注夜间监控", top_k=1, hydrate=lambda rid: rec)
+        self.assertEqual(hits[0]["record_id"], "7")
+        self.assertEqual(svc.indexed_hashes()["7"], svc.collection.get(ids=["7"])["metadatas"][0]["content_hash"])
+
+        svc.delete_record("7")
+        self.assertEqual(svc.search_projects("智慧园区", threshold=0.99), [])
+        self.assertEqual(svc.chunks.count(), 0)
+
+    def test_startup_report_phases(self):
+        """[测试场景] 就绪后各启动阶段均有耗时；首次查询耗时只记录一次"""
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            svc = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"), store="flat")
+            svc._ensure_initialized()
+        self.assertTrue(svc.is_ready())
+        report = svc.startup_report()
+        for key in ("model_load_s", "store_open_s", "indexes_s", "ready_s"):
+            self.assertGreaterEqual(report[key], 0)
+        self.assertIsNone(report["first_query_ms"])
+        svc.search_projects("数据中台")
+        first = svc.startup_report()["first_query_ms"]
+        svc.search("数据中台")
+        self.assertEqual(svc.startup_report()["first_query_ms"], first)
+
+    @unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+    def test_auto_store_falls_back_when_chroma_fails(self):
+        """[测试场景] store = auto 且 ChromaDB 无法打开时自动改用平铺索引，而不是整个向量服务不可用"""
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder), \
+                patch("chromadb.PersistentClient", side_effect=RuntimeError("broken")):
+            from src.services.vector_service import VectorService
+            svc = VectorService(db_path=os.path.join(self._tmp.name, "vector_db"))
+            svc._ensure_initialized()
+        self.assertEqual(svc.store_kind, "flat")
+        svc.add_record("1", {"id": "1", "project_opportunity": {"project_name": "数据中台"}})
+        self.assertEqual(svc.search_projects("数据中台", threshold=0.99)[0]["id"], "1")
+
+
+@unittest.skipUnless(HAS_CHROMA, "chromadb 未安装")
+class TestVectorSync(unittest.TestCase):
+    def setUp(self):
+        from src.services.storage_service import JsonFileStore
+        from src.core.vector_sync import VectorSyncer
+
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        with patch("src.services.vector_service.SentenceTransformer", HashEncoder):
+            from src.services.vector_service import VectorService
+            self.svc = VectorService(db_path=str(tmp / "vector_db"))
+            self.svc._ensure_initialized()
+        self.store = JsonFileStore(tmp / "opportunities")
+        self.records = {}
+        for i in range(6):
+            rec = {"id": f"r{i}", "sales_rep": "张三", "project_opportunity": {"project_name": f"项目{i}"}}
+            self.store.write(self.store.key_for(f"项目{i}"), rec, mtime=1000 + i)
+            self.records[rec["id"]] = rec
+        self.syncer = VectorSyncer(self.store, self.svc, chunk_size=2)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_diff_and_repair(self):
+        """[测试场景] 缺失/过期/孤儿被识别；修复后只重新向量化差异部分，再次比对一致"""
+        self.svc.add_records([self.records["r0"], self.records["r1"],
+                              {"id": "ghost", "project_opportunity": {"project_name": "已删除"}}])
+        changed = dict(self.records["r2"], sales_rep="李四")
+        self.svc.add_records([self.records["r3"], changed])
+
+        report = self.syncer.diff()
+        self.assertEqual((report.missing, report.stale, report.orphans), (["r4", "r5"], ["r2"], ["ghost"]))
+
+        result = self.syncer.repair(report)
+        self.assertEqual(result, {"embedded": 3, "purged": 1})
+        self.assertTrue(self.syncer.diff().in_sync)
+
+    def test_repair_on_fresh_syncer(self):
+        """[测试场景] 用其他实例的报告或手工构造的报告修复，不依赖本实例先执行 diff"""
+        from src.core.vector_sync import SyncReport, VectorSyncer
+        report = VectorSyncer(self.store, self.svc).diff()
+        self.assertEqual(self.syncer.repair(report), {"embedded": 6, "purged": 0})
+
+        self.svc.delete_records(["r1"])
+        fresh = VectorSyncer(self.store, self.svc)
+        self.assertEqual(fresh.repair(SyncReport(["r1", "gone"], [], [], 6, 5)), {"embedded": 1, "purged": 0})
+        self.assertTrue(fresh.diff().in_sync)
+
+    def test_full_rebuild_resumes_after_interruption(self):
+        """[测试场景] 全量重建中途失败，再次执行只处理检查点中剩余的商机"""
+        original = self.svc.add_records
+        calls = []
+        fail_on = [2]
+
+        def flaky(records, **kwargs):
+            calls.append([r["id"] for r in records])
+            if len(calls) in fail_on:
+                raise RuntimeError("进程被中断")
+            return original(records, **kwargs)
+
+        with patch.object(self.svc, "add_records", side_effect=flaky):
+            with self.assertRaises(RuntimeError):
+                self.syncer.rebuild(workers=1)
+        self.assertTrue(self.syncer.has_checkpoint())
+
+        calls.clear()
+        fail_on.clear()
+        with patch.object(self.svc, "add_records", side_effect=flaky):
+            result = self.syncer.rebuild(workers=1)
+        self.assertTrue(result["resumed"])
+        self.assertEqual(sum(len(c) for c in calls), 4)
+        self.assertFalse(self.syncer.has_checkpoint())
+        self.assertTrue(self.syncer.diff().in_sync)
+
+
+if __name__ == '__main__':
+    unittest.main()